@@ -1,6 +1,13 @@
 import heapq
-from typing import Tuple, List, Dict, Optional
+import threading
+from array import array
+from typing import Callable, Tuple, List, Dict, Optional
 from grid_map import GridMap
+from flat_grid import (CANCEL_CHECK_INTERVAL, DIAGONAL_COST, DIAGONAL_STEPS, diagonal_moves,
+                       neighbor_offsets, octile, padded_passable, to_flat, reconstruct_flat_path)
+from landmarks import LandmarkTable
+from search_variants import bidirectional_a_star_search, jps_search
+from anytime import ara_star_search
 import math
 
 
@@ -9,10 +16,18 @@ def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
     return math.hypot(b[0] - a[0], b[1] - a[1])
 
 
-def get_neighbors(pos: Tuple[int, int]) -> List[Tuple[int, int]]:
+def octile_heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
+    # Admissible for 8-connected moves with DIAGONAL_COST diagonals
+    return octile(b[0] - a[0], b[1] - a[1])
+
+
+def get_neighbors(pos: Tuple[int, int], diagonal: bool = False) -> List[Tuple[int, int]]:
     x, y = pos
-    # 4-connected grid (no diagonals)
-    return [(x + dx, y + dy) for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]]
+    # 4-connected grid, plus diagonals in 8-connected mode
+    neighbors = [(x + dx, y + dy) for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]]
+    if diagonal:
+        neighbors += [(x + dx, y + dy) for dx, dy in DIAGONAL_STEPS]
+    return neighbors
 
 
 def reconstruct_path(came_from: Dict[Tuple[int, int], Tuple[int, int]],
@@ -24,41 +39,274 @@ def reconstruct_path(came_from: Dict[Tuple[int, int], Tuple[int, int]],
     return path[::-1]  # reverse the path
 
 
+def record_search_counters(counters: Optional[Dict[str, int]], explored: int, pushes: int):
+    """Add one search's expanded nodes and heap pushes to a counters dict (if any)."""
+    if counters is not None:
+        counters["expanded"] = counters.get("expanded", 0) + explored
+        counters["heap_pushes"] = counters.get("heap_pushes", 0) + pushes
+
+
 def a_star_search(grid: GridMap,
                   start: Tuple[int, int],
-                  goal: Tuple[int, int]) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+                  goal: Tuple[int, int],
+                  cancel: Optional[threading.Event] = None,
+                  diagonal: bool = False,
+                  heuristic_fn: Optional[Callable[[Tuple[int, int], Tuple[int, int]], float]] = None,
+                  counters: Optional[Dict[str, int]] = None
+                  ) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+    # With diagonal=True moves are 8-connected (cost DIAGONAL_COST, no corner cutting);
+    # heuristic_fn replaces the default distance estimate (e.g. LandmarkTable.heuristic).
+    # A `counters` dict receives expanded and heap_pushes (see instrumentation.Tracer).
+    h = heuristic_fn or (octile_heuristic if diagonal else heuristic)
     open_set = []
     heapq.heappush(open_set, (0, start))
 
     came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
     g_score = {start: 0}
-    f_score = {start: heuristic(start, goal)}
+    f_score = {start: h(start, goal)}
 
     visited = set()
     explored_nodes = 0
+    stale = 0  # popped entries already expanded; pushes = pops + what is left in the heap
 
     while open_set:
         _, current = heapq.heappop(open_set)
 
         if current == goal:
+            record_search_counters(counters, explored_nodes, explored_nodes + stale + len(open_set) + 1)
             return reconstruct_path(came_from, current), explored_nodes
 
         if current in visited:
+            stale += 1
             continue
         visited.add(current)
         explored_nodes += 1
+        if cancel is not None and explored_nodes % CANCEL_CHECK_INTERVAL == 0 and cancel.is_set():
+            record_search_counters(counters, explored_nodes, explored_nodes + stale + len(open_set))
+            return None, explored_nodes
 
-        for neighbor in get_neighbors(current):
+        for neighbor in get_neighbors(current, diagonal):
             if not grid.in_bounds(*neighbor) or grid.is_occupied(*neighbor):
                 continue
 
-            tentative_g = g_score[current] + 1  # constant cost
+            if neighbor[0] != current[0] and neighbor[1] != current[1]:
+                # Diagonal step: no squeezing between two blocked corners
+                if grid.is_occupied(neighbor[0], current[1]) or grid.is_occupied(current[0], neighbor[1]):
+                    continue
+                tentative_g = g_score[current] + DIAGONAL_COST
+            else:
+                tentative_g = g_score[current] + 1  # constant cost
 
             if neighbor not in g_score or tentative_g < g_score[neighbor]:
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g
-                f_score[neighbor] = tentative_g + heuristic(neighbor, goal)
+                f_score[neighbor] = tentative_g + h(neighbor, goal)
                 if neighbor not in visited:
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
 
+    record_search_counters(counters, explored_nodes, explored_nodes + stale)
     return None, explored_nodes  # No path found
+
+
+# -------------------------
+# Array-backed engine
+# -------------------------
+# See flat_grid for the flat cell indexing used below.
+
+class SearchContext:
+    """
+    Reusable buffers for array_a_star_search, bound to one GridMap.
+
+    Buffers are never cleared between searches: every g-cost/parent write and
+    every closed mark is stamped with the current generation, and bumping the
+    generation invalidates all of them at once. The free-space mask is rebuilt
+    only when the grid changes (tracked through GridMap.version).
+    """
+
+    def __init__(self, grid: GridMap):
+        self.grid = grid
+        self.generation = 0
+        self.searches = 0
+        self.rebuilds = 0
+        self.bytes_saved = 0
+        self._grid_key = None
+        self.stride = 0
+        self.passable = bytearray()
+        self.offsets: Tuple[int, ...] = ()
+        self.g_cost = array('d')
+        self.parent = array('q')
+        self.touched = array('I')  # generation that last wrote g_cost/parent
+        self.closed = array('I')   # generation in which the cell was expanded
+        self.open_set: List[Tuple[float, int]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.passable)
+
+    @property
+    def buffer_bytes(self) -> int:
+        return (len(self.passable) + self.g_cost.itemsize * len(self.g_cost) +
+                self.parent.itemsize * len(self.parent) +
+                self.touched.itemsize * len(self.touched) +
+                self.closed.itemsize * len(self.closed))
+
+    def _rebuild(self):
+        grid = self.grid
+        self.stride = grid.height + 2
+        self.passable = padded_passable(grid)
+        self.offsets = neighbor_offsets(self.stride)
+        size = len(self.passable)
+        if len(self.g_cost) != size:
+            self.g_cost = array('d', [0.0]) * size
+            self.parent = array('q', [-1]) * size
+            self.touched = array('I', [0]) * size
+            self.closed = array('I', [0]) * size
+            self.generation = 0
+        self._grid_key = (id(grid.grid), grid.version)
+        self.rebuilds += 1
+
+    def begin(self) -> int:
+        """Start a new search and return its generation stamp."""
+        if self._grid_key != (id(self.grid.grid), self.grid.version):
+            self._rebuild()
+        else:
+            self.bytes_saved += self.buffer_bytes
+        if self.generation >= 0xFFFFFFFF:
+            # Stamps would wrap around; start over from clean buffers.
+            self.touched = array('I', [0]) * self.size
+            self.closed = array('I', [0]) * self.size
+            self.generation = 0
+        self.generation += 1
+        self.searches += 1
+        self.open_set.clear()
+        return self.generation
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "searches": self.searches,
+            "rebuilds": self.rebuilds,
+            "buffer_bytes": self.buffer_bytes,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def array_a_star_search(grid: GridMap,
+                        start: Tuple[int, int],
+                        goal: Tuple[int, int],
+                        context: Optional[SearchContext] = None,
+                        cancel: Optional[threading.Event] = None,
+                        diagonal: bool = False,
+                        landmarks: Optional[LandmarkTable] = None,
+                        counters: Optional[Dict[str, int]] = None) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+    """
+    Drop-in replacement for a_star_search backed by flat preallocated buffers.
+    Expands nodes in the same order and returns the same (path, explored_nodes),
+    except that out-of-bounds endpoints are rejected up front.
+
+    Pass a SearchContext to reuse its buffers across many searches on the same grid.
+    Setting `cancel` makes the search give up and return (None, explored_nodes).
+    `diagonal` enables 8-connected moves as in a_star_search.
+    `landmarks` switches to the (4-connected) ALT heuristic of a LandmarkTable.
+    A `counters` dict receives expanded and heap_pushes, as in a_star_search.
+    """
+    if start == goal:
+        return [start], 0
+    if not grid.in_bounds(*start) or not grid.in_bounds(*goal):
+        return None, 0
+    if context is None:
+        context = SearchContext(grid)
+    elif context.grid is not grid:
+        raise ValueError("SearchContext is bound to a different GridMap")
+
+    generation = context.begin()
+    stride = context.stride
+    passable = context.passable
+    offsets = context.offsets
+    g_cost, parent = context.g_cost, context.parent
+    touched, closed = context.touched, context.closed
+    open_set = context.open_set
+
+    source = to_flat(grid, start, stride)
+    target = to_flat(grid, goal, stride)
+    gx, gy = divmod(target, stride)
+    h = octile if diagonal else math.hypot
+    diagonals = diagonal_moves(stride) if diagonal else ()
+    if landmarks is not None:
+        if diagonal:
+            raise ValueError("Landmark distances are 4-connected; they are not admissible with diagonal=True")
+        h = landmarks.padded_heuristic(goal, stride)
+    push, pop = heapq.heappush, heapq.heappop
+
+    g_cost[source] = 0.0
+    parent[source] = -1
+    touched[source] = generation
+    open_set.append((0.0, source))
+    explored_nodes = 0
+    stale = 0  # popped entries already expanded; pushes = pops + what is left in the heap
+
+    while open_set:
+        _, current = pop(open_set)
+
+        if current == target:
+            record_search_counters(counters, explored_nodes, explored_nodes + stale + len(open_set) + 1)
+            return reconstruct_flat_path(grid, parent, current, stride), explored_nodes
+
+        if closed[current] == generation:
+            stale += 1
+            continue
+        closed[current] = generation
+        explored_nodes += 1
+        if cancel is not None and explored_nodes % CANCEL_CHECK_INTERVAL == 0 and cancel.is_set():
+            record_search_counters(counters, explored_nodes, explored_nodes + stale + len(open_set))
+            return None, explored_nodes
+
+        tentative_g = g_cost[current] + 1.0  # constant cost
+        for offset in offsets:
+            neighbor = current + offset
+            if not passable[neighbor]:
+                continue
+            if touched[neighbor] == generation and tentative_g >= g_cost[neighbor]:
+                continue
+            touched[neighbor] = generation
+            parent[neighbor] = current
+            g_cost[neighbor] = tentative_g
+            if closed[neighbor] != generation:
+                nx, ny = divmod(neighbor, stride)
+                push(open_set, (tentative_g + h(gx - nx, gy - ny), neighbor))
+
+        if diagonals:
+            tentative_g = g_cost[current] + DIAGONAL_COST
+            for offset, side_a, side_b in diagonals:
+                neighbor = current + offset
+                # Diagonal step: no squeezing between two blocked corners
+                if not passable[neighbor] or not passable[current + side_a] \
+                        or not passable[current + side_b]:
+                    continue
+                if touched[neighbor] == generation and tentative_g >= g_cost[neighbor]:
+                    continue
+                touched[neighbor] = generation
+                parent[neighbor] = current
+                g_cost[neighbor] = tentative_g
+                if closed[neighbor] != generation:
+                    nx, ny = divmod(neighbor, stride)
+                    push(open_set, (tentative_g + h(gx - nx, gy - ny), neighbor))
+
+    record_search_counters(counters, explored_nodes, explored_nodes + stale)
+    return None, explored_nodes  # No path found
+
+
+SEARCH_ENGINES: Dict[str, Callable[..., Tuple[Optional[List[Tuple[int, int]]], int]]] = {
+    "classic": a_star_search,
+    "array": array_a_star_search,
+    "bidirectional": bidirectional_a_star_search,
+    "jps": jps_search,
+    "ara": ara_star_search,  # weighted by GridMap.costs; the others count steps
+}
+
+
+def get_search_engine(name: str) -> Callable[..., Tuple[Optional[List[Tuple[int, int]]], int]]:
+    try:
+        return SEARCH_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown search engine '{name}'. "
+                         f"Choose from: {', '.join(SEARCH_ENGINES)}") from None
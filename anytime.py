@@ -0,0 +1,175 @@
+"""
+Anytime planning on weighted grids with ARA* (Anytime Repairing A*).
+
+ARA* runs weighted A* with an inflated heuristic (f = g + epsilon * h), which
+finds a path costing at most epsilon times the optimum after far fewer
+expansions than plain A*. It then lowers epsilon and repairs the previous
+search instead of starting over: only cells whose cost improved are
+re-expanded. Each search yields a path that is no worse than the last, until
+epsilon reaches 1 (optimal) or the deadline passes.
+
+Step costs follow GridMap's cost layer: a step costs its length (1 or
+DIAGONAL_COST) times the mean cost of the two cells it joins. The heuristic is
+the Manhattan / octile distance times the cheapest cell cost, so it stays
+admissible under any layer.
+
+Example:
+    grid.set_cost_zone(10, 30, 0, 20, 5.0)            # congestion zone
+    solutions, explored = ara_star(grid, start, goal, deadline=0.05)
+    best = solutions[-1]                              # best.cost <= best.bound * optimal
+"""
+import heapq
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from grid_map import GridMap
+from flat_grid import (CANCEL_CHECK_INTERVAL, flat_moves, octile, padded_costs, padded_passable, path_cost,
+                       reconstruct_flat_path, to_flat)
+
+Path = List[Tuple[int, int]]
+
+
+@dataclass
+class AnytimeSolution:
+    path: Path
+    cost: float  # weighted path cost (flat_grid.path_cost with the grid)
+    bound: float  # suboptimality bound: cost <= bound * optimal cost
+    epsilon: float  # heuristic inflation of the search that found the path
+    elapsed: float  # seconds since the planner started
+    explored_nodes: int  # expansions so far, over all searches
+
+
+def ara_star(grid: GridMap,
+             start: Tuple[int, int],
+             goal: Tuple[int, int],
+             deadline: Optional[float] = None,
+             epsilon: float = 2.5,
+             epsilon_step: float = 0.5,
+             diagonal: bool = False,
+             cancel: Optional[threading.Event] = None,
+             on_solution: Optional[Callable[[AnytimeSolution], None]] = None
+             ) -> Tuple[List[AnytimeSolution], int]:
+    """
+    ARA* from `start` to `goal`, starting at `epsilon` and lowering it by
+    `epsilon_step` after each search. Stops once a path is proven optimal, at
+    `deadline` seconds after the call, or when `cancel` is set (both are polled
+    every CANCEL_CHECK_INTERVAL expansions).
+
+    Returns (solutions, explored_nodes): every improved path in the order found,
+    so solutions[-1] is the best one, and all expansions. The list is empty if
+    there is no path or the first search did not finish in time. `on_solution`
+    is called with each solution as soon as it is found.
+    """
+    t0 = time.perf_counter()
+    if not grid.in_bounds(*start) or grid.is_occupied(*start) or grid.is_occupied(*goal):
+        return [], 0
+    if start == goal:
+        solution = AnytimeSolution([start], 0.0, 1.0, epsilon, time.perf_counter() - t0, 0)
+        if on_solution is not None:
+            on_solution(solution)
+        return [solution], 0
+
+    stride = grid.height + 2
+    passable = padded_passable(grid)
+    costs = padded_costs(grid)
+    size = len(passable)
+    moves = flat_moves(stride, diagonal)
+    distance = octile if diagonal else (lambda dx, dy: abs(dx) + abs(dy))
+    min_cost = 1.0 if grid.costs is None else float(grid.costs.min())
+    end = None if deadline is None else t0 + deadline
+    inf = float("inf")
+
+    source, target = to_flat(grid, start, stride), to_flat(grid, goal, stride)
+    gx, gy = divmod(target, stride)
+
+    def h(index: int) -> float:
+        nx, ny = divmod(index, stride)
+        return min_cost * distance(gx - nx, gy - ny)
+
+    g_cost = array('d', [inf]) * size
+    parent = array('q', [-1]) * size
+    closed = array('l', [0]) * size  # search number that expanded the cell
+    g_cost[source] = 0.0
+    open_set = [(epsilon * h(source), source)]
+    incons = set()  # improved after being expanded in the current search
+    solutions: List[AnytimeSolution] = []
+    explored_nodes = 0
+    search = 0
+    push, pop = heapq.heappush, heapq.heappop
+
+    while True:
+        search += 1
+        # Improve path: weighted A* until the goal's f is no larger than any open f
+        while open_set:
+            key, current = open_set[0]
+            if closed[current] == search:
+                pop(open_set)
+                continue
+            if g_cost[target] <= key:
+                break
+            pop(open_set)
+            closed[current] = search
+            explored_nodes += 1
+            if explored_nodes % CANCEL_CHECK_INTERVAL == 0 and (
+                    (cancel is not None and cancel.is_set()) or (end is not None and time.perf_counter() > end)):
+                return solutions, explored_nodes
+
+            g_current, cost_current = g_cost[current], costs[current]
+            for offset, length, side_a, side_b in moves:
+                neighbor = current + offset
+                # Diagonal step: no squeezing between two blocked corners
+                if not passable[neighbor] or not passable[current + side_a] \
+                        or not passable[current + side_b]:
+                    continue
+                tentative_g = g_current + length * (cost_current + costs[neighbor]) * 0.5
+                if tentative_g >= g_cost[neighbor]:
+                    continue
+                g_cost[neighbor] = tentative_g
+                parent[neighbor] = current
+                if closed[neighbor] == search:
+                    incons.add(neighbor)
+                else:
+                    push(open_set, (tentative_g + epsilon * h(neighbor), neighbor))
+
+        if g_cost[target] == inf:
+            return solutions, explored_nodes  # open set exhausted: no path
+
+        # Cells still open or inconsistent bound the optimal cost from below
+        frontier = {node for _, node in open_set if closed[node] != search} | incons
+        lower = min((g_cost[node] + h(node) for node in frontier), default=inf)
+        bound = max(1.0, min(epsilon, g_cost[target] / lower)) if lower < inf else 1.0
+        path = reconstruct_flat_path(grid, parent, target, stride)
+        cost = path_cost(path, grid)
+        if solutions and cost >= solutions[-1].cost - 1e-9:
+            solutions[-1].bound = min(solutions[-1].bound, bound)  # no better path, only a tighter bound
+        else:
+            solution = AnytimeSolution(path, cost, bound, epsilon, time.perf_counter() - t0, explored_nodes)
+            solutions.append(solution)
+            if on_solution is not None:
+                on_solution(solution)
+        if solutions[-1].bound <= 1.0 or (end is not None and time.perf_counter() > end):
+            return solutions, explored_nodes
+
+        # Next search: lower epsilon, reopen inconsistent cells, re-key the open set
+        epsilon = max(1.0, epsilon - epsilon_step)
+        open_set = [(g_cost[node] + epsilon * h(node), node) for node in frontier]
+        heapq.heapify(open_set)
+        incons = set()
+
+
+def ara_star_search(grid: GridMap,
+                    start: Tuple[int, int],
+                    goal: Tuple[int, int],
+                    cancel: Optional[threading.Event] = None,
+                    diagonal: bool = False,
+                    deadline: Optional[float] = None,
+                    epsilon: float = 2.5) -> Tuple[Optional[Path], int]:
+    """
+    ara_star behind the (path, explored_nodes) contract of the search engines:
+    the best path found by `deadline` (optimal under the cost layer without one).
+    """
+    solutions, explored_nodes = ara_star(grid, start, goal, deadline, epsilon,
+                                         diagonal=diagonal, cancel=cancel)
+    return (solutions[-1].path if solutions else None), explored_nodes
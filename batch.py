@@ -0,0 +1,358 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+from a_star import SearchContext, a_star_search, array_a_star_search, get_search_engine
+
+Query = Tuple[Tuple[int, int], Tuple[int, int]]
+
+CANCEL_SLOTS = 1024  # cancel flags per GridWorkerPool, one per batch in flight
+SHARED_POOL_LIMIT = 4  # pools kept alive by shared_pool
+
+# Per-process state set up by _init_worker
+_worker_grid: Optional[GridMap] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_context: Optional[SearchContext] = None
+_worker_flags_shm: Optional[shared_memory.SharedMemory] = None
+_worker_costs_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def worker_context():
+    """
+    Multiprocessing context for helper processes: forkserver, or spawn where
+    that is unavailable. Forking would copy the caller's threads' state and
+    inherit its open sockets and files.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+class SharedGrid:
+    """
+    A GridMap's occupancy array copied once into shared memory.
+
+    `spec` is a small picklable description that worker processes turn back
+    into a GridMap viewing the same pages (attach_shared_grid), so the array
+    is never pickled per task. The cost layer, once the grid has one, gets
+    its own shared pages named by spec["costs"] (see write_costs). Use as a
+    context manager or call close().
+    """
+
+    def __init__(self, grid: GridMap):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, grid.grid.nbytes))
+        self.view = np.ndarray(grid.grid.shape, dtype=np.int8, buffer=self.shm.buf)
+        self.view[:] = grid.grid
+        self.spec = {
+            "name": self.shm.name,
+            "shape": grid.grid.shape,
+            "x_min": grid.x_min,
+            "y_min": grid.y_min,
+            "horizontal_barriers": grid.horizontal_barriers,
+            "vertical_barriers": grid.vertical_barriers,
+            "costs": None,
+        }
+        self.costs_shm: Optional[shared_memory.SharedMemory] = None
+        self.costs_view: Optional[np.ndarray] = None
+        self.write_costs(grid.costs)
+
+    def write_costs(self, costs: Optional[np.ndarray]):
+        """Copy a cost layer to the shared cost pages (allocated on first use); None = uniform costs."""
+        if costs is None:
+            self.spec["costs"] = None
+            return
+        if self.costs_shm is None:
+            self.costs_shm = shared_memory.SharedMemory(create=True, size=max(1, self.view.size * 8))
+            self.costs_view = np.ndarray(self.view.shape, dtype=np.float64, buffer=self.costs_shm.buf)
+        self.costs_view[:] = costs
+        self.spec["costs"] = self.costs_shm.name
+
+    def close(self):
+        self.view = self.costs_view = None  # release the exported buffers before closing the mappings
+        for shm in (self.shm, self.costs_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def __enter__(self) -> "SharedGrid":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared_grid(spec: Dict) -> Tuple[GridMap, shared_memory.SharedMemory]:
+    """
+    Rebuild a read-only GridMap over the shared occupancy pages described by `spec`
+    (without the cost layer, which workers attach in _sync_worker).
+    """
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    occupancy = np.ndarray(spec["shape"], dtype=np.int8, buffer=shm.buf)
+    occupancy.flags.writeable = False
+    grid = GridMap.from_occupancy(occupancy, spec["x_min"], spec["y_min"], copy=False)
+    grid.horizontal_barriers = spec["horizontal_barriers"]
+    grid.vertical_barriers = spec["vertical_barriers"]
+    return grid, shm  # the caller keeps `shm` alive as long as `grid` is used
+
+
+class CancelFlag:
+    """
+    One byte of a GridWorkerPool's shared cancel array, with the is_set()/set()
+    of a threading.Event so the search engines poll it like their `cancel`.
+    Setting it in the parent stops searches already running in the workers.
+    """
+
+    def __init__(self, flags, slot: int):
+        self.flags = flags
+        self.slot = slot
+
+    def is_set(self) -> bool:
+        return self.flags[self.slot] != 0
+
+    def set(self):
+        self.flags[self.slot] = 1
+
+
+def _init_worker(spec: Dict, flags_name: str):
+    global _worker_grid, _worker_shm, _worker_context, _worker_flags_shm
+    _worker_grid, _worker_shm = attach_shared_grid(spec)
+    _worker_context = SearchContext(_worker_grid)
+    _worker_flags_shm = shared_memory.SharedMemory(name=flags_name)
+
+
+def _sync_worker(version: int, costs: Optional[str]):
+    global _worker_costs_shm
+    # The parent rewrote the shared pages; drop anything derived from the old grid
+    if _worker_grid.version != version:
+        _worker_grid.version = version
+        _worker_grid._labels = None
+    # Cost values live in the shared pages (named by spec["costs"], allocated once per
+    # pool); only whether the grid has a layer changes here
+    if costs is None:
+        _worker_grid.costs = None
+    elif _worker_grid.costs is None:
+        if _worker_costs_shm is None:
+            _worker_costs_shm = shared_memory.SharedMemory(name=costs)
+        view = np.ndarray(_worker_grid.grid.shape, dtype=np.float64, buffer=_worker_costs_shm.buf)
+        view.flags.writeable = False
+        _worker_grid.costs = view
+
+
+class GridWorkerPool:
+    """
+    Process pool whose workers all view one GridMap through shared memory.
+
+    Call sync() after editing the grid to push the new occupancy and cost
+    layer to the workers (done automatically by submit_search). Use as a context manager
+    or call close().
+
+    Workers start from a forkserver (spawn where that is unavailable) rather
+    than by forking the caller: the executor starts them lazily on the first
+    submit, and a forked worker would inherit whatever sockets and files the
+    caller has open at that moment (e.g. a client connection in service.py).
+
+    Searches submitted with a cancel_flag() stop as soon as the flag is set,
+    including ones already running in a worker.
+    """
+
+    def __init__(self, grid: GridMap, workers: int, mp_context=None):
+        self.grid = grid
+        self.workers = workers
+        self.shared = SharedGrid(grid)
+        self.version = grid.version
+        self.flags_shm = shared_memory.SharedMemory(create=True, size=CANCEL_SLOTS)
+        self.flags_shm.buf[:CANCEL_SLOTS] = bytes(CANCEL_SLOTS)
+        self._free_slots = list(range(CANCEL_SLOTS - 1, -1, -1))
+        self._slots_lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context or worker_context(),
+                                            initializer=_init_worker,
+                                            initargs=(self.shared.spec, self.flags_shm.name))
+
+    def sync(self):
+        if self.grid.version != self.version:
+            if self.grid.grid.shape != self.shared.view.shape:
+                raise ValueError("GridWorkerPool cannot follow a grid that changed shape")
+            self.shared.view[:] = self.grid.grid
+            self.shared.write_costs(self.grid.costs)
+            self.version = self.grid.version
+
+    def cancel_flag(self) -> Optional[CancelFlag]:
+        """A cleared flag for one batch of searches, or None if every slot is in use."""
+        with self._slots_lock:
+            if not self._free_slots:
+                return None
+            slot = self._free_slots.pop()
+        self.flags_shm.buf[slot] = 0
+        return CancelFlag(self.flags_shm.buf, slot)
+
+    def release_cancel_flag(self, flag: CancelFlag, futures: Iterable[Future] = ()):
+        """Give the flag's slot back once every future submitted with it has finished."""
+        remaining = [future for future in futures if not future.done()]
+        left = [len(remaining)]
+
+        def finished(_future: Future):
+            with self._slots_lock:
+                left[0] -= 1
+                if left[0] == 0:
+                    self._free_slots.append(flag.slot)
+
+        if not remaining:
+            with self._slots_lock:
+                self._free_slots.append(flag.slot)
+        for future in remaining:
+            future.add_done_callback(finished)
+
+    def submit_search(self, start: Tuple[int, int], goal: Tuple[int, int],
+                      engine: str = "array", cancel_flag: Optional[CancelFlag] = None,
+                      counters: bool = False, **options) -> Future:
+        """
+        Run one search in a worker; the future resolves to (path, explored_nodes),
+        or with `counters` to (path, explored_nodes, counters dict) as filled by
+        the classic and array engines. `options` are passed to the engine
+        (e.g. diagonal=True) and `cancel_flag` becomes its `cancel`.
+        """
+        self.sync()
+        slot = -1 if cancel_flag is None else cancel_flag.slot
+        return self.executor.submit(_search_in_worker, start, goal, engine, self.version,
+                                    self.shared.spec["costs"], options, slot, counters)
+
+    def close(self, wait: bool = True):
+        """Cancel queued work and release the pool; wait=False does not wait for running tasks."""
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.shared.close()
+        self.flags_shm.close()
+        self.flags_shm.unlink()
+
+    def __enter__(self) -> "GridWorkerPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_pools: "OrderedDict[Tuple[int, int], GridWorkerPool]" = OrderedDict()
+_shared_pools_lock = threading.Lock()
+
+
+def shared_pool(grid: GridMap, workers: int) -> GridWorkerPool:
+    """
+    A GridWorkerPool for `grid` that is reused across calls instead of starting
+    processes and copying the grid each time. Pools are keyed by grid identity
+    and worker count and follow grid edits through sync(); a grid that changed
+    shape gets a new pool. The least recently used pool is closed beyond
+    SHARED_POOL_LIMIT, and all of them at interpreter exit.
+    """
+    key = (id(grid), workers)
+    with _shared_pools_lock:
+        pool = _shared_pools.get(key)
+        # The pool holds the grid, so its id cannot be reused while cached
+        if pool is not None and pool.grid.grid.shape != pool.shared.view.shape:
+            del _shared_pools[key]
+            pool.close(wait=False)
+            pool = None
+        if pool is None:
+            pool = GridWorkerPool(grid, workers)
+            _shared_pools[key] = pool
+            while len(_shared_pools) > SHARED_POOL_LIMIT:
+                _, oldest = _shared_pools.popitem(last=False)
+                oldest.close(wait=False)
+        _shared_pools.move_to_end(key)
+        return pool
+
+
+@atexit.register
+def close_shared_pools(wait: bool = False):
+    """Close every pool handed out by shared_pool; wait=True also waits for their workers to exit."""
+    with _shared_pools_lock:
+        while _shared_pools:
+            _, pool = _shared_pools.popitem()
+            pool.close(wait=wait)
+
+
+def _search_in_worker(start: Tuple[int, int], goal: Tuple[int, int], engine: str, version: int,
+                      costs: Optional[str], options: Dict, slot: int = -1, counters: bool = False) -> Tuple:
+    _sync_worker(version, costs)
+    if slot >= 0:
+        options = dict(options, cancel=CancelFlag(_worker_flags_shm.buf, slot))
+    search = get_search_engine(engine)
+    counted: Dict[str, int] = {}
+    if counters and search in (a_star_search, array_a_star_search):
+        options = dict(options, counters=counted)
+    if search is array_a_star_search:
+        options = dict(options, context=_worker_context)
+    path, explored = search(_worker_grid, start, goal, **options)
+    return (path, explored, counted) if counters else (path, explored)
+
+
+def plan_query(grid: GridMap, index: int, start: Tuple[int, int], goal: Tuple[int, int],
+               planner: str, options: Dict) -> Dict:
+    t0 = time.perf_counter()
+    if planner == "astar":
+        path, explored = get_search_engine(options.get("engine", "array"))(
+            grid, start, goal, diagonal=options.get("diagonal", False))
+        waypoints: List[Tuple[int, int]] = []
+    elif planner == "llm_astar":
+        from llm_astar import llm_astar
+        stats: Dict = {}
+        path, waypoints = llm_astar(grid, start, goal, stats=stats, **options)
+        explored = stats["explored_nodes"]
+    else:
+        raise ValueError(f"Unknown planner '{planner}'. Choose 'astar' or 'llm_astar'.")
+    return {
+        "index": index,
+        "start": start,
+        "goal": goal,
+        "path": path,
+        "waypoints": waypoints,
+        "explored_nodes": explored,
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def _plan_in_worker(index: int, start: Tuple[int, int], goal: Tuple[int, int],
+                    planner: str, options: Dict, version: int, costs: Optional[str]) -> Dict:
+    _sync_worker(version, costs)
+    return plan_query(_worker_grid, index, start, goal, planner, options)
+
+
+def plan_many(grid: GridMap,
+              queries: Iterable[Query],
+              planner: str = "astar",
+              workers: int = 1,
+              max_pending: Optional[int] = None,
+              **options) -> Iterator[Dict]:
+    """
+    Plan many (start, goal) queries on one map and yield results as they complete.
+
+    Each result is a dict with index (position in `queries`), start, goal,
+    path, waypoints, explored_nodes and elapsed seconds.
+    With workers > 1 the occupancy grid is placed in shared memory once and
+    queries fan out over a process pool; at most `max_pending` (default
+    4 * workers) are submitted ahead of the consumer. Extra keyword arguments
+    go to the planner (`engine`/`diagonal` for astar, llm_astar's options otherwise).
+    """
+    if workers <= 1:
+        for index, (start, goal) in enumerate(queries):
+            yield plan_query(grid, index, start, goal, planner, options)
+        return
+
+    max_pending = max_pending or 4 * workers
+    with GridWorkerPool(grid, workers) as pool:
+        pending = set()
+        for index, (start, goal) in enumerate(queries):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(pool.executor.submit(_plan_in_worker, index, start, goal,
+                                             planner, options, pool.version,
+                                             pool.shared.spec["costs"]))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
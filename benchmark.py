@@ -0,0 +1,266 @@
+"""
+Reproducible A* vs LLM-A* benchmark on seeded synthetic maps.
+
+Example:
+    python benchmark.py --sizes 20 100 500 --kinds maze random --out results.json
+    python benchmark.py --sizes 20 100 500 --baseline results.json --threshold 0.25
+
+The LLM is replaced by MockOllamaClient, so runs need no Ollama server and
+always see the same waypoints.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import re
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+from a_star import get_search_engine
+from flat_grid import path_cost
+from instrumentation import Tracer
+from llm_astar import llm_astar
+
+# Metrics checked against a stored baseline; wall time also gets an absolute slack
+REGRESSION_METRICS = ("wall_time", "explored_nodes", "heap_pushes", "peak_memory_kb", "path_cost")
+MIN_TIME_SLACK = 0.005
+
+
+def generate_maze(size: int, seed: int, braid: float = 0.0) -> GridMap:
+    """
+    Perfect maze (randomized depth-first search) on a size × size grid.
+    `braid` knocks out that fraction of the remaining inner walls to add loops.
+    """
+    rng = np.random.default_rng(seed)
+    cells_x = cells_y = max(1, (size - 1) // 2)
+    occupancy = np.ones((size, size), dtype=np.int8)
+    visited = bytearray(cells_x * cells_y)
+    draws = rng.random(2 * cells_x * cells_y)
+    draw = 0
+    directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+    visited[0] = 1
+    occupancy[1, 1] = 0
+    stack = [(0, 0)]
+    while stack:
+        cx, cy = stack[-1]
+        options = [(cx + dx, cy + dy) for dx, dy in directions
+                   if 0 <= cx + dx < cells_x and 0 <= cy + dy < cells_y
+                   and not visited[(cx + dx) * cells_y + cy + dy]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = options[int(draws[draw % len(draws)] * len(options))]
+        draw += 1
+        visited[nx * cells_y + ny] = 1
+        occupancy[cx + nx + 1, cy + ny + 1] = 0  # wall between the two cells
+        occupancy[2 * nx + 1, 2 * ny + 1] = 0
+        stack.append((nx, ny))
+
+    if braid > 0:
+        inner = occupancy[1:2 * cells_x, 1:2 * cells_y]
+        xs, ys = np.nonzero(inner)
+        between = (xs % 2) != (ys % 2)  # walls separating two cells, not pillars
+        xs, ys = xs[between], ys[between]
+        pick = rng.random(len(xs)) < braid
+        inner[xs[pick], ys[pick]] = 0
+    return GridMap.from_occupancy(occupancy, copy=False)
+
+
+def generate_random_map(size: int, density: float, seed: int) -> GridMap:
+    """Uniformly scattered obstacles covering roughly `density` of the cells."""
+    rng = np.random.default_rng(seed)
+    return GridMap.from_occupancy((rng.random((size, size)) < density).astype(np.int8), copy=False)
+
+
+def pick_query(grid: GridMap) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Opposite-corner endpoints inside the largest free component."""
+    labels = grid.component_labels()
+    counts = np.bincount(labels.ravel())
+    if len(counts) < 2:
+        return None
+    xs, ys = np.nonzero(labels == int(np.argmax(counts[1:]) + 1))
+    corner = xs + ys
+    start = (int(xs[np.argmin(corner)]) + grid.x_min, int(ys[np.argmin(corner)]) + grid.y_min)
+    goal = (int(xs[np.argmax(corner)]) + grid.x_min, int(ys[np.argmax(corner)]) + grid.y_min)
+    return start, goal
+
+
+class MockOllamaClient:
+    """
+    Deterministic stand-in for OllamaClient.
+
+    Reads the start and goal from the prompt and proposes `num_waypoints`
+    evenly spaced points on the straight line between them, each snapped to
+    the nearest free cell connected to the start.
+    """
+
+    def __init__(self, grid: GridMap, num_waypoints: int = 5):
+        self.grid = grid
+        self.num_waypoints = num_waypoints
+        self.calls = 0
+
+    def generate(self, prompt: str, model: str = "mistral", **kwargs) -> str:
+        self.calls += 1
+        start = np.array([int(v) for v in
+                          re.search(r"Start Point: \[(-?\d+), (-?\d+)\]", prompt).groups()])
+        goal = np.array([int(v) for v in
+                         re.search(r"Goal Point: \[(-?\d+), (-?\d+)\]", prompt).groups()])
+        label = self.grid.component_of(*start)
+        if label == 0:
+            return "Generated Path: []"
+        cells = np.argwhere(self.grid.component_labels() == label) + [self.grid.x_min, self.grid.y_min]
+
+        waypoints = []
+        for k in range(1, self.num_waypoints + 1):
+            target = start + (goal - start) * k / (self.num_waypoints + 1)
+            nearest = cells[np.argmin(((cells - target) ** 2).sum(axis=1))]
+            waypoints.append([int(nearest[0]), int(nearest[1])])
+        return f"Generated Path: {waypoints}"
+
+
+def run_planner(grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int],
+                planner: str, engine: str, diagonal: bool = False) -> Dict:
+    tracer = Tracer(quiet=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        if planner == "astar":
+            search = get_search_engine(engine)
+            if engine in ("classic", "array"):
+                path, explored = search(grid, start, goal, diagonal=diagonal, counters=tracer.counters)
+            else:
+                path, explored = search(grid, start, goal, diagonal=diagonal)
+            fallback = False
+        else:
+            stats: Dict = {}
+            path, _ = llm_astar(grid, start, goal, engine=engine, diagonal=diagonal,
+                                client=MockOllamaClient(grid), stats=stats, tracer=tracer)
+            explored, fallback = stats["explored_nodes"], stats["fallback"]
+        elapsed = time.perf_counter() - t0
+    return {
+        "wall_time": elapsed,
+        "explored_nodes": explored,
+        "heap_pushes": tracer.counters.get("heap_pushes"),
+        "path_cost": round(path_cost(path, grid), 6) if path else None,
+        "path_found": path is not None,
+        "fallback": fallback,
+    }
+
+
+def peak_memory_kb(grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int],
+                   planner: str, engine: str, diagonal: bool = False) -> float:
+    # Separate traced run: tracemalloc slows Python down too much to time the same run
+    tracemalloc.start()
+    try:
+        run_planner(grid, start, goal, planner, engine, diagonal)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(sizes: List[int], kinds: List[str], densities: List[float],
+                  seeds: List[int], planners: List[str], engine: str = "array",
+                  measure_memory: bool = True, diagonal: bool = False) -> List[Dict]:
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            for density in (densities if kind == "random" else [0.0]):
+                for seed in seeds:
+                    grid = (generate_random_map(size, density, seed) if kind == "random"
+                            else generate_maze(size, seed, braid=density))
+                    query = pick_query(grid)
+                    if query is None:
+                        continue
+                    start, goal = query
+                    for planner in planners:
+                        record = {"planner": planner, "engine": engine, "diagonal": diagonal,
+                                  "kind": kind, "size": size, "density": density, "seed": seed,
+                                  "start": list(start), "goal": list(goal)}
+                        record.update(run_planner(grid, start, goal, planner, engine, diagonal))
+                        record["peak_memory_kb"] = (
+                            peak_memory_kb(grid, start, goal, planner, engine, diagonal)
+                            if measure_memory else None)
+                        results.append(record)
+                        print(f"⏱️ {planner:9s} {kind:6s} {size:5d}² d={density:.2f} seed={seed}: "
+                              f"{record['wall_time']:.3f}s, {record['explored_nodes']} nodes, "
+                              f"cost {record['path_cost']}")
+    return results
+
+
+def _result_key(record: Dict) -> Tuple:
+    return (record["planner"], record["engine"], record.get("diagonal", False), record["kind"],
+            record["size"], record["density"], record["seed"])
+
+
+def find_regressions(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than `threshold`."""
+    previous = {_result_key(r): r for r in baseline}
+    regressions = []
+    for record in results:
+        old = previous.get(_result_key(record))
+        if old is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            new_value, old_value = record.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            limit = old_value * (1 + threshold)
+            if metric == "wall_time":
+                limit += MIN_TIME_SLACK
+            if new_value > limit:
+                regressions.append(f"{_result_key(record)} {metric}: {old_value:.4g} → {new_value:.4g}")
+    return regressions
+
+
+def write_csv(results: List[Dict], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark A* and LLM-A* with a mock LLM")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--kinds", nargs="+", choices=["maze", "random"], default=["maze", "random"])
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.1, 0.25],
+                        help="obstacle density for random maps (mazes use it as braid fraction)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--planners", nargs="+", choices=["astar", "llm_astar"],
+                        default=["astar", "llm_astar"])
+    parser.add_argument("--engine", default="array")
+    parser.add_argument("--diagonal", action="store_true", help="8-connected moves")
+    parser.add_argument("--skip-memory", action="store_true")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--csv", help="write results as CSV")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.kinds, args.densities, args.seeds,
+                            args.planners, args.engine, not args.skip_memory, args.diagonal)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.csv and results:
+        write_csv(results, args.csv)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        if regressions:
+            print("❌ Regressions beyond threshold:")
+            for line in regressions:
+                print("   " + line)
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Vectorized breadth-first wavefronts over a GridMap.
+
+Each BFS level is expanded for the whole frontier at once with NumPy,
+over the same padded flat layout as flat_grid, so the cost is a handful of
+array operations per level and no Python work per cell.
+
+dijkstra_field generalises this to 8-connected moves: step costs become
+integers (1 and DIAGONAL_COST as 5 and 7), and cells are settled one cost
+bucket at a time, which is Dial's algorithm with whole buckets expanded at
+once. one_to_many / distance_matrix run one such wavefront per source and
+stop as soon as every requested target is settled.
+"""
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from grid_map import GridMap
+from flat_grid import DIAGONAL_COST, diagonal_moves, from_flat, neighbor_offsets, to_flat
+
+UNREACHABLE = -1
+
+# Integer step costs of the 8-connected wavefront; DIAGONAL_COST is 7 / 5
+CARDINAL_UNITS = 5
+DIAGONAL_UNITS = round(DIAGONAL_COST * CARDINAL_UNITS)
+UNSETTLED = np.iinfo(np.int64).max
+
+Path = List[Tuple[int, int]]
+
+
+def padded_free_mask(grid: GridMap) -> np.ndarray:
+    """Flattened free-space mask (True = free) with a blocked one-cell border."""
+    return np.pad(grid.grid == 0, 1, mode="constant", constant_values=False).ravel()
+
+
+def unpad(grid: GridMap, field: np.ndarray) -> np.ndarray:
+    """Padded flat field back to GridMap layout (indexed [x, y])."""
+    return field.reshape(grid.width + 2, grid.height + 2)[1:-1, 1:-1]
+
+
+def bfs_distance_field(grid: GridMap, source: Tuple[int, int]) -> np.ndarray:
+    """
+    4-connected step distance from `source` to every cell, in GridMap layout.
+    Obstacles and cells cut off from the source hold UNREACHABLE.
+    """
+    stride = grid.height + 2
+    free = padded_free_mask(grid)
+    dist = np.full(free.size, UNREACHABLE, dtype=np.int32)
+    if not grid.in_bounds(*source):
+        return unpad(grid, dist)
+
+    offsets = np.array(neighbor_offsets(stride), dtype=np.int64)
+    seen = ~free
+    frontier = np.array([to_flat(grid, source, stride)], dtype=np.int64)
+    seen[frontier] = True
+    dist[frontier] = 0
+    level = 0
+    while frontier.size:
+        level += 1
+        candidates = (frontier[:, None] + offsets).ravel()
+        candidates = np.unique(candidates[~seen[candidates]])
+        seen[candidates] = True
+        dist[candidates] = level
+        frontier = candidates
+    return unpad(grid, dist)
+
+
+def bfs_distance_stack(free: np.ndarray, sources: np.ndarray) -> np.ndarray:
+    """
+    Independent 4-connected BFS per source over a stack of small free masks.
+
+    `free` is (B, w, h) bool and `sources` is (K, 3) rows of (mask index, x, y).
+    Every source gets its own padded copy of its mask, so all K wavefronts
+    advance together in one set of array operations per level.
+    Returns (K, w, h) int32 step distances, UNREACHABLE where not reached.
+    """
+    _, w, h = free.shape
+    stride = h + 2
+    cell_count = (w + 2) * stride
+    padded = np.pad(free, ((0, 0), (1, 1), (1, 1)), mode="constant", constant_values=False)
+    tiled = padded.reshape(len(free), -1)[sources[:, 0]].ravel()
+    dist = np.full(tiled.size, UNREACHABLE, dtype=np.int32)
+
+    offsets = np.array(neighbor_offsets(stride), dtype=np.int64)
+    # Deduplicates each new frontier without np.unique's sort: the last writer wins
+    owner = np.empty(tiled.size, dtype=np.int32)
+    seen = ~tiled
+    frontier = (np.arange(len(sources), dtype=np.int64) * cell_count +
+                (sources[:, 1] + 1) * stride + sources[:, 2] + 1)
+    frontier = frontier[tiled[frontier]]
+    seen[frontier] = True
+    dist[frontier] = 0
+    level = 0
+    while frontier.size:
+        level += 1
+        candidates = (frontier[:, None] + offsets).ravel()
+        candidates = candidates[~seen[candidates]]
+        order = np.arange(candidates.size, dtype=np.int32)
+        owner[candidates] = order
+        candidates = candidates[owner[candidates] == order]
+        seen[candidates] = True
+        dist[candidates] = level
+        frontier = candidates
+    return dist.reshape(len(sources), w + 2, h + 2)[:, 1:-1, 1:-1]
+
+
+def _moves(stride: int, diagonal: bool) -> List[Tuple[int, int, int, int]]:
+    """(offset, cost units, corner offset a, corner offset b); corners are 0 for straight moves."""
+    unit = CARDINAL_UNITS if diagonal else 1
+    moves = [(offset, unit, 0, 0) for offset in neighbor_offsets(stride)]
+    if diagonal:
+        moves += [(offset, DIAGONAL_UNITS, a, b) for offset, a, b in diagonal_moves(stride)]
+    return moves
+
+
+def dijkstra_field(grid: GridMap, source: Tuple[int, int],
+                   targets: Optional[Sequence[Tuple[int, int]]] = None,
+                   diagonal: bool = False,
+                   free: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Padded flat cost field from `source`, in integer units (1 per step, or
+    CARDINAL_UNITS / DIAGONAL_UNITS with diagonal=True, no corner cutting).
+    With `targets` the expansion stops once all of them are settled; cells not
+    settled by then hold UNSETTLED. Pass `free` (padded_free_mask) to reuse it.
+    """
+    stride = grid.height + 2
+    if free is None:
+        free = padded_free_mask(grid)
+    dist = np.full(free.size, UNSETTLED, dtype=np.int64)
+    if not grid.in_bounds(*source) or grid.is_occupied(*source):
+        return dist
+    # Moves of equal cost are expanded together: (offsets, cost, corner offsets a/b or None)
+    straight = np.array(neighbor_offsets(stride), dtype=np.int64)
+    groups = [(straight, CARDINAL_UNITS if diagonal else 1, None, None)]
+    if diagonal:
+        diagonals = np.array(diagonal_moves(stride), dtype=np.int64)
+        groups.append((diagonals[:, 0], DIAGONAL_UNITS, diagonals[:, 1], diagonals[:, 2]))
+    settled = np.zeros(free.size, dtype=bool)
+    owner = np.empty(free.size, dtype=np.int32)  # dedupes buckets without np.unique's sort
+    wanted = None
+    if targets is not None:
+        wanted = np.array([to_flat(grid, t, stride) for t in targets if grid.in_bounds(*t)], dtype=np.int64)
+        wanted = wanted[free[wanted]] if wanted.size else wanted
+
+    start = to_flat(grid, source, stride)
+    dist[start] = 0
+    buckets = {0: [np.array([start], dtype=np.int64)]}
+    while buckets:
+        d = min(buckets)
+        cells = buckets.pop(d)
+        cells = cells[0] if len(cells) == 1 else np.concatenate(cells)
+        cells = cells[(dist[cells] == d) & ~settled[cells]]
+        if not cells.size:
+            continue
+        order = np.arange(cells.size, dtype=np.int32)
+        owner[cells] = order
+        cells = cells[owner[cells] == order]
+        settled[cells] = True
+        if wanted is not None and settled[wanted].all():
+            break
+        for offsets, cost, sides_a, sides_b in groups:
+            neighbors = cells[:, None] + offsets
+            ok = free[neighbors] & ~settled[neighbors]
+            if sides_a is not None:
+                # Diagonal step: no squeezing between two blocked corners
+                ok &= free[cells[:, None] + sides_a] & free[cells[:, None] + sides_b]
+            neighbors = neighbors[ok]
+            neighbors = neighbors[dist[neighbors] > d + cost]
+            if neighbors.size:
+                dist[neighbors] = d + cost
+                buckets.setdefault(d + cost, []).append(neighbors)
+    dist[~settled] = UNSETTLED
+    return dist
+
+
+def trace_path(grid: GridMap, field: np.ndarray, target: Tuple[int, int],
+               diagonal: bool = False, free: Optional[np.ndarray] = None) -> Optional[Path]:
+    """Optimal path from the source of a dijkstra_field to `target`, or None if not settled."""
+    if not grid.in_bounds(*target):
+        return None
+    stride = grid.height + 2
+    current = to_flat(grid, target, stride)
+    if field[current] == UNSETTLED:
+        return None
+    if diagonal and free is None:
+        free = padded_free_mask(grid)
+    moves = _moves(stride, diagonal)
+    path = [target]
+    while field[current] > 0:
+        d = field[current]
+        for offset, cost, side_a, side_b in moves:
+            previous = current - offset
+            if field[previous] != d - cost:
+                continue
+            # Diagonal corners seen from `previous`; the same two cells as seen from `current`
+            if side_a and not (free[previous + side_a] and free[previous + side_b]):
+                continue
+            break
+        current = previous
+        path.append(from_flat(grid, current, stride))
+    return path[::-1]
+
+
+def one_to_many(grid: GridMap, source: Tuple[int, int], targets: Sequence[Tuple[int, int]],
+                diagonal: bool = False, return_paths: bool = False,
+                free: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[List[Optional[Path]]]]:
+    """
+    Path costs (1 per step, DIAGONAL_COST per diagonal) from `source` to each
+    target, from a single wavefront that stops once all targets are settled.
+    Unreachable targets get np.inf (and a None path).
+    Returns (costs, paths) with paths None unless `return_paths`.
+    """
+    if free is None:
+        free = padded_free_mask(grid)
+    field = dijkstra_field(grid, source, targets, diagonal, free)
+    stride = grid.height + 2
+    unit = CARDINAL_UNITS if diagonal else 1
+    costs = np.full(len(targets), np.inf)
+    for i, target in enumerate(targets):
+        if grid.in_bounds(*target) and field[to_flat(grid, target, stride)] != UNSETTLED:
+            costs[i] = field[to_flat(grid, target, stride)] / unit
+    paths = None
+    if return_paths:
+        paths = [trace_path(grid, field, target, diagonal, free) for target in targets]
+    return costs, paths
+
+
+def distance_matrix(grid: GridMap, sources: Sequence[Tuple[int, int]],
+                    targets: Sequence[Tuple[int, int]], diagonal: bool = False,
+                    return_paths: bool = False) -> Tuple[np.ndarray, Optional[List[List[Optional[Path]]]]]:
+    """
+    (len(sources), len(targets)) matrix of path costs, np.inf where unreachable.
+    Moves are symmetric, so the wavefronts start from whichever side has fewer
+    points. paths[i][j] (with `return_paths`) runs from sources[i] to targets[j].
+    """
+    free = padded_free_mask(grid)
+    if len(targets) < len(sources):
+        costs, paths = _distance_matrix_from(grid, targets, sources, diagonal, return_paths, free)
+        if paths is not None:
+            paths = [[paths[j][i][::-1] if paths[j][i] is not None else None for j in range(len(targets))]
+                     for i in range(len(sources))]
+        return costs.T, paths
+    return _distance_matrix_from(grid, sources, targets, diagonal, return_paths, free)
+
+
+def _distance_matrix_from(grid: GridMap, sources: Sequence[Tuple[int, int]],
+                         targets: Sequence[Tuple[int, int]], diagonal: bool,
+                         return_paths: bool, free: np.ndarray
+                         ) -> Tuple[np.ndarray, Optional[List[List[Optional[Path]]]]]:
+    costs = np.full((len(sources), len(targets)), np.inf)
+    paths = [] if return_paths else None
+    for i, source in enumerate(sources):
+        costs[i], row = one_to_many(grid, source, targets, diagonal, return_paths, free)
+        if return_paths:
+            paths.append(row)
+    return costs, paths
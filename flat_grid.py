@@ -0,0 +1,93 @@
+"""
+Flat-index addressing of a GridMap, shared by the array-backed planners.
+
+Cells are addressed by a flat index into the occupancy grid padded with a
+one-cell occupied border, so neighbor lookups never need a bounds check:
+  index = (x - x_min + 1) * stride + (y - y_min + 1),  stride = height + 2
+Flat indices sort like (x, y) tuples, so heap tie-breaking matches a_star_search.
+"""
+from array import array
+from typing import List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+
+NEIGHBOR_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # same order as a_star.get_neighbors
+DIAGONAL_STEPS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+DIAGONAL_COST = 1.4  # as promised to the LLM in llm_interface.COST_RULES
+
+# Searches given a `cancel` event poll it once per this many expansions
+CANCEL_CHECK_INTERVAL = 1024
+
+
+def manhattan(p1: Tuple[int, int], p2: Tuple[int, int]) -> int:
+    """Exact 4-connected distance between two cells on an open grid."""
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+
+def octile(dx: float, dy: float) -> float:
+    """Exact 8-connected distance on an open grid with DIAGONAL_COST diagonals."""
+    dx, dy = abs(dx), abs(dy)
+    return max(dx, dy) + (DIAGONAL_COST - 1) * min(dx, dy)
+
+
+def padded_passable(grid: GridMap) -> bytearray:
+    """Flattened free-space mask (1 = free) with an occupied one-cell border."""
+    padded = np.pad(grid.grid == 0, 1, mode="constant", constant_values=False)
+    return bytearray(padded.astype(np.uint8).tobytes())
+
+
+def padded_costs(grid: GridMap) -> array:
+    """Flattened cell costs (GridMap.costs, 1.0 when there is no layer) with a padded border."""
+    if grid.costs is None:
+        return array('d', [1.0]) * ((grid.width + 2) * (grid.height + 2))
+    return array('d', np.pad(grid.costs, 1, mode="edge").astype(np.float64).tobytes())
+
+
+def neighbor_offsets(stride: int) -> Tuple[int, ...]:
+    return tuple(dx * stride + dy for dx, dy in NEIGHBOR_STEPS)
+
+
+def diagonal_moves(stride: int) -> Tuple[Tuple[int, int, int], ...]:
+    """(offset, first orthogonal offset, second orthogonal offset) per diagonal step."""
+    return tuple((dx * stride + dy, dx * stride, dy) for dx, dy in DIAGONAL_STEPS)
+
+
+def flat_moves(stride: int, diagonal: bool) -> List[Tuple[int, float, int, int]]:
+    """(offset, length, orthogonal a, orthogonal b) per move; straight moves repeat their own offset."""
+    moves = [(offset, 1.0, offset, offset) for offset in neighbor_offsets(stride)]
+    if diagonal:
+        moves += [(offset, DIAGONAL_COST, a, b) for offset, a, b in diagonal_moves(stride)]
+    return moves
+
+
+def to_flat(grid: GridMap, pos: Tuple[int, int], stride: int) -> int:
+    # int(): numpy coordinates (e.g. from np.argwhere) would leak numpy ints into the index math
+    return int((pos[0] - grid.x_min + 1) * stride + (pos[1] - grid.y_min + 1))
+
+
+def from_flat(grid: GridMap, index: int, stride: int) -> Tuple[int, int]:
+    px, py = divmod(index, stride)
+    return int(px + grid.x_min - 1), int(py + grid.y_min - 1)
+
+
+def reconstruct_flat_path(grid: GridMap, parent: array, current: int,
+                          stride: int) -> List[Tuple[int, int]]:
+    path = [from_flat(grid, current, stride)]
+    current = parent[current]
+    while current >= 0:
+        path.append(from_flat(grid, current, stride))
+        current = parent[current]
+    return path[::-1]
+
+
+def path_cost(path: List[Tuple[int, int]], grid: Optional[GridMap] = None) -> float:
+    """
+    Cost of a cell path under the unit/DIAGONAL_COST step model. With a `grid`
+    that has a cost layer, each step is weighted by the mean cost of its two cells.
+    """
+    if grid is None or grid.costs is None:
+        return sum(DIAGONAL_COST if a[0] != b[0] and a[1] != b[1] else 1.0
+                   for a, b in zip(path, path[1:]))
+    return sum((DIAGONAL_COST if a[0] != b[0] and a[1] != b[1] else 1.0) *
+               (grid.cost_at(*a) + grid.cost_at(*b)) / 2
+               for a, b in zip(path, path[1:]))
@@ -1,29 +1,162 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 import cv2
 
 
+def image_to_occupancy(img: np.ndarray, threshold: int = 128,
+                       size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Threshold a grayscale image into an occupancy array in GridMap layout.
+    Pixels darker than `threshold` are obstacles. `size` is (width, height).
+    The result is indexed [x, y] with y pointing up, so the top image row
+    becomes the highest y.
+    """
+    if size is not None:
+        img = cv2.resize(img, size, interpolation=cv2.INTER_NEAREST)
+    return np.ascontiguousarray(np.flipud(img < threshold).T, dtype=np.int8)
+
+
+def find_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Runs of True along axis 1 of a 2D mask as (row, first, last) index arrays."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, firsts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)  # row-major order keeps pairs aligned
+    return rows, firsts, ends - 1
+
+
 class GridMap:
     def __init__(self, x_range: Tuple[int, int], y_range: Tuple[int, int]):
         self.x_min, self.x_max = x_range
         self.y_min, self.y_max = y_range
         self.width = self.x_max - self.x_min
         self.height = self.y_max - self.y_min
-        self.grid = np.zeros((self.width, self.height), dtype=np.int8)
+        self._allocate()
+        # Bumped on every edit so derived data (search buffers, caches) can tell it is stale
+        self.version = 0
+        # Free-space connected components (4-connected), labelled lazily; 0 = occupied
+        self._labels = None
+        # Called with the list of changed (x, y) cells after each edit, or None when
+        # the whole grid was replaced (see add_listener)
+        self._listeners: List[Callable[[Optional[List[Tuple[int, int]]]], None]] = []
+        # Optional soft costs (float per cell, same layout as grid); None = every cell costs 1.0
+        self.costs: Optional[np.ndarray] = None
 
         self.vertical_barriers = []
         self.horizontal_barriers = []
 
+    @classmethod
+    def from_occupancy(cls, occupancy: np.ndarray, x_min: int = 0, y_min: int = 0,
+                       copy: bool = True) -> "GridMap":
+        """Build a map from an occupancy array indexed [x, y] (non-zero = obstacle)."""
+        width, height = occupancy.shape
+        gmap = cls((x_min, x_min + width), (y_min, y_min + height))
+        if copy or occupancy.dtype != np.int8:
+            occupancy = (occupancy != 0).astype(np.int8)
+        gmap.grid = occupancy
+        return gmap
+
+    @classmethod
+    def from_image(cls, image_path: str, threshold: int = 128,
+                   size: Optional[Tuple[int, int]] = None,
+                   derive_barriers: bool = False) -> "GridMap":
+        """Load a maze image at its own resolution (or resized to `size`)."""
+        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError(f"Failed to load image: {image_path}")
+        gmap = cls.from_occupancy(image_to_occupancy(img, threshold, size), copy=False)
+        if derive_barriers:
+            gmap.derive_barriers()
+        return gmap
+
+    def add_listener(self, callback: Callable[[Optional[List[Tuple[int, int]]]], None]):
+        """Register callback(cells) to hear about edits; cells is None after a full reload."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Optional[List[Tuple[int, int]]]], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, cells: Optional[List[Tuple[int, int]]]):
+        for callback in list(self._listeners):
+            callback(cells)
+
+    # Storage primitives, overridden by PackedGridMap
+    def _allocate(self):
+        self.grid = np.zeros((self.width, self.height), dtype=np.int8)
+
+    def _get_cell(self, gx: int, gy: int) -> int:
+        return self.grid[gx, gy]
+
+    def _set_cell(self, gx: int, gy: int, value: int):
+        self.grid[gx, gy] = value
+
+    def _get_block(self, xs: slice, ys: slice) -> np.ndarray:
+        return self.grid[xs, ys]
+
+    def _fill_block(self, xs: slice, ys: slice, value: int):
+        self.grid[xs, ys] = value
+
+    def _occupy_block(self, xs: slice, ys: slice):
+        changed = np.argwhere(self._get_block(xs, ys) == 0) if self._listeners else None
+        self._fill_block(xs, ys, 1)
+        self.version += 1
+        self._labels = None
+        if changed is not None and len(changed):
+            x0, y0 = (xs.start or 0) + self.x_min, (ys.start or 0) + self.y_min
+            self._notify([(int(cx) + x0, int(cy) + y0) for cx, cy in changed])
+
     def add_vertical_barrier(self, x: int, y_start: int, y_end: int):
         self.vertical_barriers.append([x, y_start, y_end])
-        for y in range(y_start, y_end + 1):
-            self.set_occupied(x, y)
+        y_lo, y_hi = max(y_start, self.y_min), min(y_end, self.y_max - 1)
+        if self.x_min <= x < self.x_max and y_lo <= y_hi:
+            gx = x - self.x_min
+            self._occupy_block(slice(gx, gx + 1), slice(y_lo - self.y_min, y_hi - self.y_min + 1))
 
     def add_horizontal_barrier(self, y: int, x_start: int, x_end: int):
         self.horizontal_barriers.append([y, x_start, x_end])
-        for x in range(x_start, x_end + 1):
-            self.set_occupied(x, y)
+        x_lo, x_hi = max(x_start, self.x_min), min(x_end, self.x_max - 1)
+        if self.y_min <= y < self.y_max and x_lo <= x_hi:
+            gy = y - self.y_min
+            self._occupy_block(slice(x_lo - self.x_min, x_hi - self.x_min + 1), slice(gy, gy + 1))
+
+    def derive_barriers(self, min_length: int = 2):
+        """
+        Compress the occupancy grid into the span lists used by the LLM prompt.
+        Straight wall runs of at least `min_length` cells become vertical or
+        horizontal barriers; obstacle cells covered by neither are emitted as
+        single-cell horizontal spans so no obstacle is dropped.
+        """
+        occupied = self.grid != 0
+        covered = np.zeros((self.width + 1, self.height + 1), dtype=np.int32)
+
+        xs, y0, y1 = find_runs(occupied)
+        keep = (y1 - y0 + 1) >= min_length
+        xs, y0, y1 = xs[keep], y0[keep], y1[keep]
+        np.add.at(covered, (xs, y0), 1)
+        np.add.at(covered, (xs, y1 + 1), -1)
+        vertical_cover = np.cumsum(covered, axis=1)[:-1, :-1] > 0
+
+        covered[:] = 0
+        ys, x0, x1 = find_runs(occupied.T)
+        keep = (x1 - x0 + 1) >= min_length
+        ys, x0, x1 = ys[keep], x0[keep], x1[keep]
+        np.add.at(covered, (x0, ys), 1)
+        np.add.at(covered, (x1 + 1, ys), -1)
+        horizontal_cover = np.cumsum(covered, axis=0)[:-1, :-1] > 0
+
+        single_x, single_y = np.nonzero(occupied & ~vertical_cover & ~horizontal_cover)
+        ys = np.concatenate([ys, single_y])
+        x0 = np.concatenate([x0, single_x])
+        x1 = np.concatenate([x1, single_x])
+        order = np.lexsort((x0, ys))
+
+        self.vertical_barriers = np.column_stack(
+            [xs + self.x_min, y0 + self.y_min, y1 + self.y_min]).tolist()
+        self.horizontal_barriers = np.column_stack(
+            [ys[order] + self.y_min, x0[order] + self.x_min, x1[order] + self.x_min]).tolist()
 
     def in_bounds(self, x: int, y: int) -> bool:
         return self.x_min <= x < self.x_max and self.y_min <= y < self.y_max
@@ -35,37 +168,147 @@ class GridMap:
 
     def set_occupied(self, x: int, y: int):
         if self.in_bounds(x, y):
-            self.grid[x - self.x_min, y - self.y_min] = 1
+            gx, gy = x - self.x_min, y - self.y_min
+            was_free = self._get_cell(gx, gy) == 0
+            if self._labels is not None and was_free:
+                if self._is_simple_cell(gx, gy):
+                    self._labels[gx, gy] = 0
+                else:
+                    self._labels = None  # the edit may split a component
+            self._set_cell(gx, gy, 1)
+            self.version += 1
+            if was_free:
+                self._notify([(x, y)])
+
+    def set_free(self, x: int, y: int):
+        """Clear an obstacle cell (e.g. an obstacle that moved away)."""
+        if self.in_bounds(x, y):
+            gx, gy = x - self.x_min, y - self.y_min
+            if self._get_cell(gx, gy) == 0:
+                return
+            if self._labels is not None:
+                around = {int(self._labels[i, j]) for i, j in
+                          ((gx - 1, gy), (gx + 1, gy), (gx, gy - 1), (gx, gy + 1))
+                          if 0 <= i < self.width and 0 <= j < self.height}
+                around.discard(0)
+                if len(around) == 1:
+                    self._labels[gx, gy] = around.pop()
+                elif not around:
+                    self._labels[gx, gy] = self._labels.max() + 1  # isolated new component
+                else:
+                    self._labels = None  # the edit merges components
+            self._set_cell(gx, gy, 0)
+            self.version += 1
+            self._notify([(x, y)])
+
+    def _is_simple_cell(self, gx: int, gy: int) -> bool:
+        """
+        True if occupying free cell (gx, gy) cannot split its component, i.e. its
+        free 4-neighbours are already connected through its 8-neighbourhood.
+        """
+        def free(i, j):
+            return 0 <= i < self.width and 0 <= j < self.height and self._get_cell(i, j) == 0
+
+        # Ring around the cell, orthogonal neighbours at even positions
+        ring = [free(gx, gy + 1), free(gx + 1, gy + 1), free(gx + 1, gy), free(gx + 1, gy - 1),
+                free(gx, gy - 1), free(gx - 1, gy - 1), free(gx - 1, gy), free(gx - 1, gy + 1)]
+        orthogonal = sum(ring[0::2])
+        links = sum(ring[i] and ring[i + 1] and ring[(i + 2) % 8] for i in range(0, 8, 2))
+        if links == 4:
+            return True
+        return orthogonal - links <= 1
+
+    def component_labels(self) -> np.ndarray:
+        """Connected-component label per cell (0 for obstacles), same layout as grid."""
+        if self._labels is None:
+            free = (self.grid == 0).astype(np.uint8)
+            _, self._labels = cv2.connectedComponents(free, connectivity=4, ltype=cv2.CV_32S)
+        return self._labels
+
+    def component_of(self, x: int, y: int) -> int:
+        if not self.in_bounds(x, y):
+            return 0
+        return int(self.component_labels()[x - self.x_min, y - self.y_min])
+
+    def is_reachable(self, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+        """O(1) check (after one labelling pass) that a path between free cells a and b exists."""
+        label = self.component_of(*a)
+        return label != 0 and label == self.component_of(*b)
+
+    # -------------------------
+    # Soft costs
+    # -------------------------
+    # A step between two free cells costs its length (1 or DIAGONAL_COST) times the
+    # mean cost of the two cells, so congestion zones and slow floor areas are
+    # avoided when cheaper detours exist. Only the weighted planner
+    # (anytime.ara_star) reads the layer; the other engines count steps.
+    # Cost edits bump `version` (cached paths go stale) but do not notify listeners.
+    def set_cost_layer(self, costs: Optional[np.ndarray]):
+        """Replace the cost layer (indexed [x, y], finite and > 0), or None for uniform costs."""
+        if costs is not None:
+            costs = np.array(costs, dtype=np.float64)
+            if costs.shape != (self.width, self.height):
+                raise ValueError(f"Cost layer must have shape {(self.width, self.height)}, got {costs.shape}")
+            if not np.isfinite(costs).all() or (costs <= 0).any():
+                raise ValueError("Cell costs must be finite and positive (use obstacles for impassable cells)")
+        self.costs = costs
+        self.version += 1
+
+    def set_cost_zone(self, x_start: int, x_end: int, y_start: int, y_end: int, cost: float):
+        """Set the cost of every cell in [x_start, x_end] x [y_start, y_end] (inclusive, clipped)."""
+        if not np.isfinite(cost) or cost <= 0:
+            raise ValueError("Cell costs must be finite and positive (use obstacles for impassable cells)")
+        x_lo, x_hi = max(x_start, self.x_min), min(x_end, self.x_max - 1)
+        y_lo, y_hi = max(y_start, self.y_min), min(y_end, self.y_max - 1)
+        if x_lo > x_hi or y_lo > y_hi:
+            return
+        if self.costs is None:
+            self.costs = np.ones((self.width, self.height), dtype=np.float64)
+        self.costs[x_lo - self.x_min:x_hi - self.x_min + 1, y_lo - self.y_min:y_hi - self.y_min + 1] = cost
+        self.version += 1
+
+    def set_cost(self, x: int, y: int, cost: float):
+        self.set_cost_zone(x, x, y, y, cost)
 
-    def load_from_image(self, image_path: str, threshold: int = 128):
+    def cost_at(self, x: int, y: int) -> float:
+        if self.costs is None or not self.in_bounds(x, y):
+            return 1.0
+        return float(self.costs[x - self.x_min, y - self.y_min])
+
+    def load_from_image(self, image_path: str, threshold: int = 128,
+                        derive_barriers: bool = False):
         """
         Load a maze image and convert it into an occupancy grid.
         Black (or dark) pixels are considered walls/obstacles.
+        The image is resized to the map and oriented as in image_to_occupancy.
         """
         img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
         if img is None:
             raise ValueError(f"Failed to load image: {image_path}")
-        
-        img = cv2.resize(img, (self.width, self.height), interpolation=cv2.INTER_NEAREST)
-        self.grid = (img < threshold).astype(np.int8)
+
+        self.grid = image_to_occupancy(img, threshold, (self.width, self.height))
+        self.version += 1
+        self._labels = None
+        self._notify(None)
 
         self.vertical_barriers = []
         self.horizontal_barriers = []
+        if derive_barriers:
+            self.derive_barriers()
 
     def visualize(self, start: Tuple[int, int], goal: Tuple[int, int],
                   path: List[Tuple[int, int]] = None,
                   waypoints: List[Tuple[int, int]] = None):
+        # Interactive figure; see rendering.render_file for headless PNG/GIF/MP4 output
+        from rendering import draw_occupancy
         fig, ax = plt.subplots(figsize=(10, 6))
+
+        # Draw obstacles
+        draw_occupancy(ax, self)
         ax.set_aspect('equal')
         ax.set_xlim(self.x_min, self.x_max)
         ax.set_ylim(self.y_min, self.y_max)
 
-        # Draw obstacles
-        for x in range(self.x_min, self.x_max):
-            for y in range(self.y_min, self.y_max):
-                if self.is_occupied(x, y):
-                    ax.add_patch(plt.Rectangle((x, y), 1, 1, color='black'))
-
         # Draw start/goal
         ax.plot(start[0] + 0.5, start[1] + 0.5, 'go', markersize=10, label='Start')
         ax.plot(goal[0] + 0.5, goal[1] + 0.5, 'ro', markersize=10, label='Goal')
@@ -77,11 +320,119 @@ class GridMap:
 
         # Draw waypoints
         if waypoints:
-            for wp in waypoints:
-                ax.plot(wp[0] + 0.5, wp[1] + 0.5, 'y*', markersize=12)
-            ax.plot([], [], 'y*', label='LLM Waypoint')
+            wx, wy = zip(*[(x + 0.5, y + 0.5) for x, y in waypoints])
+            ax.plot(wx, wy, 'y*', linestyle='none', markersize=12, label='LLM Waypoint')
 
         ax.legend()
         plt.grid(True)
         plt.title("LLM-A* Map Environment")
         plt.show()
+
+
+# Set bits per byte value, for counting occupied cells without unpacking
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+class PackedGridMap(GridMap):
+    """
+    GridMap that stores occupancy as bits, 8 cells per byte (np.packbits layout
+    along y, so `bits` has shape (width, ceil(height / 8))).
+
+    in_bounds/is_occupied/set_occupied behave exactly as on GridMap. Reading
+    `grid` still gives the usual int8 [x, y] array for the array engines and
+    image tools. That array is unpacked on demand and cached until the next
+    edit; drop_dense() releases it. `bits` may be an np.memmap (see map_store).
+    """
+
+    def __init__(self, x_range: Tuple[int, int], y_range: Tuple[int, int],
+                 bits: Optional[np.ndarray] = None):
+        self._initial_bits = bits
+        super().__init__(x_range, y_range)
+
+    @classmethod
+    def from_bits(cls, bits: np.ndarray, height: int, x_min: int = 0,
+                  y_min: int = 0) -> "PackedGridMap":
+        """Wrap already packed occupancy bits (not copied)."""
+        return cls((x_min, x_min + bits.shape[0]), (y_min, y_min + height), bits=bits)
+
+    def _allocate(self):
+        bits, self._initial_bits = self._initial_bits, None
+        shape = (self.width, (self.height + 7) // 8)
+        if bits is None:
+            bits = np.zeros(shape, dtype=np.uint8)
+        elif bits.shape != shape or bits.dtype != np.uint8:
+            raise ValueError(f"Packed occupancy must be uint8 of shape {shape}, got {bits.dtype} {bits.shape}")
+        self.bits = bits
+        self._dense = None
+        self._dense_version = -1
+
+    @property
+    def grid(self) -> np.ndarray:
+        if self._dense is None or self._dense_version != self.version:
+            self._dense = np.unpackbits(self.bits, axis=1, count=self.height).view(np.int8)
+            self._dense_version = self.version
+        return self._dense
+
+    @grid.setter
+    def grid(self, occupancy: np.ndarray):
+        self.bits = np.packbits(np.asarray(occupancy) != 0, axis=1)
+        self._dense = None
+
+    def drop_dense(self):
+        """Free the unpacked copy made by reading `grid`."""
+        self._dense = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def _get_cell(self, gx: int, gy: int) -> int:
+        return (int(self.bits[gx, gy >> 3]) >> (7 - (gy & 7))) & 1
+
+    def _set_cell(self, gx: int, gy: int, value: int):
+        byte = int(self.bits[gx, gy >> 3])
+        mask = 0x80 >> (gy & 7)
+        self.bits[gx, gy >> 3] = byte | mask if value else byte & ~mask
+
+    def _byte_columns(self, ys: slice) -> Tuple[slice, int, int]:
+        """Byte columns covering ys, and ys relative to the first of them."""
+        start, stop, _ = ys.indices(self.height)
+        first_bit = start & ~7
+        return slice(start >> 3, (stop + 7) >> 3), start - first_bit, stop - first_bit
+
+    def _get_block(self, xs: slice, ys: slice) -> np.ndarray:
+        columns, lo, hi = self._byte_columns(ys)
+        return np.unpackbits(self.bits[xs, columns], axis=1)[:, lo:hi].view(np.int8)
+
+    def _fill_block(self, xs: slice, ys: slice, value: int):
+        columns, lo, hi = self._byte_columns(ys)
+        block = np.unpackbits(self.bits[xs, columns], axis=1)
+        block[:, lo:hi] = value
+        self.bits[xs, columns] = np.packbits(block, axis=1)
+
+    def is_occupied(self, x: int, y: int) -> bool:
+        if not self.in_bounds(x, y):
+            return True
+        gy = y - self.y_min
+        return (int(self.bits[x - self.x_min, gy >> 3]) >> (7 - (gy & 7))) & 1 == 1
+
+    def row_bits(self, x: int) -> np.ndarray:
+        """Packed occupancy of column x (all y), 8 cells per byte, most significant bit first."""
+        return self.bits[x - self.x_min]
+
+    def any_occupied(self, x: int, y_start: int, y_end: int) -> bool:
+        """True if any cell (x, y_start..y_end) is occupied, checked a byte at a time."""
+        if not self.in_bounds(x, y_start) or not self.in_bounds(x, y_end):
+            return True
+        lo, hi = y_start - self.y_min, y_end - self.y_min + 1
+        row = self.bits[x - self.x_min]
+        first, last = lo >> 3, (hi - 1) >> 3
+        head = 0xFF >> (lo & 7)
+        tail = (0xFF << (7 - ((hi - 1) & 7))) & 0xFF
+        if first == last:
+            return bool(int(row[first]) & head & tail)
+        return bool(int(row[first]) & head or int(row[last]) & tail or row[first + 1:last].any())
+
+    def occupied_count(self) -> int:
+        """Occupied cells, counted on the packed bytes."""
+        return int(_POPCOUNT[self.bits].sum())
@@ -0,0 +1,398 @@
+"""
+Hierarchical path-finding (HPA*) for large maps.
+
+The grid is split into square clusters. Every open stretch of a border
+between two neighbouring clusters is an entrance, with one transition (or
+two, for wide entrances) whose cells become abstract nodes. Distances
+between the nodes of a cluster are precomputed with batched BFS wavefronts.
+A query connects start and goal to the nodes of their clusters, searches
+the small abstract graph, and refines only the chosen corridor with local
+A* inside one cluster at a time. Paths are near-optimal, not optimal.
+
+Edits to the grid (GridMap listeners) mark their clusters dirty. The next
+query rebuilds only the borders and node distances of those clusters and
+their neighbours.
+
+Example:
+    python hierarchy.py maze.png --cluster-size 32 --queries 10
+"""
+import argparse
+import heapq
+import math
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from grid_map import GridMap, find_runs
+from distance_field import UNREACHABLE, bfs_distance_stack
+from flat_grid import manhattan
+from a_star import array_a_star_search
+
+Cell = Tuple[int, int]  # grid index (x - x_min, y - y_min)
+Border = Tuple[str, int, int]  # ("v", cx, cy) joins (cx, cy)-(cx + 1, cy); ("h", cx, cy) joins (cx, cy)-(cx, cy + 1)
+
+# Entrances wider than this get a transition at both ends instead of one in the middle
+MAX_SINGLE_TRANSITION = 6
+# Upper bound on padded cells per batched BFS while (re)building node distances
+BFS_BATCH_CELLS = 1 << 22
+
+
+class HierarchicalMap:
+    """
+    HPA* abstraction of one GridMap (4-connected moves).
+
+    The map registers itself as a grid listener; call close() (or use it as
+    a context manager) to detach it.
+    """
+
+    def __init__(self, grid: GridMap, cluster_size: int = 32):
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2")
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.build_seconds = 0.0
+        self.update_seconds = 0.0
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._dirty: Set[Tuple[int, int]] = set()
+        self._full_rebuild = False
+        self.rebuild()
+        grid.add_listener(self._on_grid_change)
+
+    def __enter__(self) -> "HierarchicalMap":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.grid.remove_listener(self._on_grid_change)
+
+    # -------------------------
+    # Construction and local updates
+    # -------------------------
+    def cluster_of(self, cell: Cell) -> Tuple[int, int]:
+        return cell[0] // self.cluster_size, cell[1] // self.cluster_size
+
+    def _cluster_bounds(self, cluster: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        cs = self.cluster_size
+        cx, cy = cluster
+        return cx * cs, min((cx + 1) * cs, self.grid.width), cy * cs, min((cy + 1) * cs, self.grid.height)
+
+    def _valid_cluster(self, cluster: Tuple[int, int]) -> bool:
+        return 0 <= cluster[0] < self.clusters_x and 0 <= cluster[1] < self.clusters_y
+
+    def _cluster_borders(self, cluster: Tuple[int, int]) -> List[Border]:
+        cx, cy = cluster
+        borders = [("v", cx, cy), ("v", cx - 1, cy), ("h", cx, cy), ("h", cx, cy - 1)]
+        return [b for b in borders if b in self._borders]
+
+    def _border_transitions(self, border: Border) -> List[Tuple[Cell, Cell]]:
+        kind, cx, cy = border
+        occ = self.grid.grid
+        x0, x1, y0, y1 = self._cluster_bounds((cx, cy))
+        if kind == "v":
+            x = x1 - 1
+            open_cells = (occ[x, y0:y1] == 0) & (occ[x + 1, y0:y1] == 0)
+
+            def pair(k: int) -> Tuple[Cell, Cell]:
+                return (x, y0 + k), (x + 1, y0 + k)
+        else:
+            y = y1 - 1
+            open_cells = (occ[x0:x1, y] == 0) & (occ[x0:x1, y + 1] == 0)
+
+            def pair(k: int) -> Tuple[Cell, Cell]:
+                return (x0 + k, y), (x0 + k, y + 1)
+
+        transitions = []
+        _, firsts, lasts = find_runs(open_cells[None, :])
+        for first, last in zip(firsts.tolist(), lasts.tolist()):
+            if last - first + 1 <= MAX_SINGLE_TRANSITION:
+                transitions.append(pair((first + last) // 2))
+            else:
+                transitions += [pair(first), pair(last)]
+        return transitions
+
+    def _set_border(self, border: Border, transitions: List[Tuple[Cell, Cell]]):
+        for a, b in self._borders.get(border, []):
+            self._inter[a].remove(b)
+            self._inter[b].remove(a)
+        self._borders[border] = transitions
+        for a, b in transitions:
+            self._inter.setdefault(a, []).append(b)
+            self._inter.setdefault(b, []).append(a)
+
+    def _cluster_nodes(self, cluster: Tuple[int, int]) -> List[Cell]:
+        nodes = set()
+        for border in self._cluster_borders(cluster):
+            for a, b in self._borders[border]:
+                nodes.add(a if self.cluster_of(a) == cluster else b)
+        return sorted(nodes)
+
+    def _compute_intra(self, clusters: List[Tuple[int, int]]):
+        """Node-to-node distances inside each cluster, BFS batched over many clusters."""
+        cs = self.cluster_size
+        occ = self.grid.grid
+        per_source = (cs + 2) * (cs + 2)
+        batch: List[Tuple[Tuple[int, int], List[Cell]]] = []
+        sources = 0
+
+        def flush():
+            masks = np.zeros((len(batch), cs, cs), dtype=bool)
+            rows = []
+            for i, (cluster, nodes) in enumerate(batch):
+                x0, x1, y0, y1 = self._cluster_bounds(cluster)
+                masks[i, :x1 - x0, :y1 - y0] = occ[x0:x1, y0:y1] == 0
+                rows += [(i, x - x0, y - y0) for x, y in nodes]
+            dist = bfs_distance_stack(masks, np.array(rows, dtype=np.int64).reshape(-1, 3))
+            row = 0
+            for cluster, nodes in batch:
+                x0, _, y0, _ = self._cluster_bounds(cluster)
+                xs = np.array([x - x0 for x, _ in nodes], dtype=np.int64)
+                ys = np.array([y - y0 for _, y in nodes], dtype=np.int64)
+                matrix = dist[row:row + len(nodes)][:, xs, ys]
+                self._intra[cluster] = (nodes, {n: i for i, n in enumerate(nodes)}, matrix)
+                row += len(nodes)
+            batch.clear()
+
+        for cluster in clusters:
+            nodes = self._cluster_nodes(cluster)
+            if not nodes:
+                self._intra[cluster] = ([], {}, np.zeros((0, 0), dtype=np.int32))
+                continue
+            batch.append((cluster, nodes))
+            sources += len(nodes)
+            if sources * per_source >= BFS_BATCH_CELLS:
+                flush()
+                sources = 0
+        if batch:
+            flush()
+
+    def rebuild(self):
+        """Recompute the whole abstraction."""
+        began = time.perf_counter()
+        cs = self.cluster_size
+        self._shape = self.grid.grid.shape
+        self.clusters_x = math.ceil(self.grid.width / cs)
+        self.clusters_y = math.ceil(self.grid.height / cs)
+        self._borders: Dict[Border, List[Tuple[Cell, Cell]]] = {}
+        self._inter: Dict[Cell, List[Cell]] = {}
+        self._intra: Dict[Tuple[int, int], Tuple[List[Cell], Dict[Cell, int], np.ndarray]] = {}
+        for cx in range(self.clusters_x):
+            for cy in range(self.clusters_y):
+                if cx + 1 < self.clusters_x:
+                    self._borders[("v", cx, cy)] = []
+                if cy + 1 < self.clusters_y:
+                    self._borders[("h", cx, cy)] = []
+        for border in list(self._borders):
+            self._set_border(border, self._border_transitions(border))
+        self._compute_intra([(cx, cy) for cx in range(self.clusters_x) for cy in range(self.clusters_y)])
+        self.build_seconds = time.perf_counter() - began
+
+    def _on_grid_change(self, cells: Optional[List[Tuple[int, int]]]):
+        with self._lock:
+            if cells is None:
+                self._full_rebuild = True
+            else:
+                x_min, y_min = self.grid.x_min, self.grid.y_min
+                self._dirty.update(self.cluster_of((x - x_min, y - y_min)) for x, y in cells)
+
+    def _apply_updates(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            full_rebuild, self._full_rebuild = self._full_rebuild, False
+        if full_rebuild or self.grid.grid.shape != self._shape:
+            self.rebuild()
+            return
+        if not dirty:
+            return
+        began = time.perf_counter()
+        borders = set()
+        affected = set()
+        for cx, cy in dirty:
+            borders.update(self._cluster_borders((cx, cy)))
+            affected.update(c for c in ((cx, cy), (cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1))
+                            if self._valid_cluster(c))
+        for border in borders:
+            self._set_border(border, self._border_transitions(border))
+        self._compute_intra(sorted(affected))
+        self.updates += 1
+        self.update_seconds += time.perf_counter() - began
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def _cluster_grid(self, cluster: Tuple[int, int]) -> GridMap:
+        """View of one cluster as its own GridMap (world coordinates, no copy)."""
+        x0, x1, y0, y1 = self._cluster_bounds(cluster)
+        return GridMap.from_occupancy(self.grid.grid[x0:x1, y0:y1], x_min=x0 + self.grid.x_min,
+                                      y_min=y0 + self.grid.y_min, copy=False)
+
+    def _local_links(self, cell: Cell, other: Cell) -> Dict[Cell, int]:
+        """Distances from `cell` to its cluster's nodes (and to `other` if it shares the cluster)."""
+        cluster = self.cluster_of(cell)
+        nodes = self._intra[cluster][0]
+        x0, x1, y0, y1 = self._cluster_bounds(cluster)
+        targets = nodes + ([other] if self.cluster_of(other) == cluster else [])
+        mask = (self.grid.grid[x0:x1, y0:y1] == 0)[None]
+        field = bfs_distance_stack(mask, np.array([[0, cell[0] - x0, cell[1] - y0]], dtype=np.int64))[0]
+        links = {}
+        for target in targets:
+            d = int(field[target[0] - x0, target[1] - y0])
+            if d != UNREACHABLE and target != cell:
+                links[target] = d
+        return links
+
+    def _neighbors(self, u: Cell) -> Iterator[Tuple[Cell, int]]:
+        entry = self._intra[self.cluster_of(u)]
+        i = entry[1].get(u)
+        if i is not None:
+            nodes, row = entry[0], entry[2][i]
+            for j, d in enumerate(row.tolist()):
+                if d > 0:
+                    yield nodes[j], d
+            for partner in self._inter.get(u, ()):
+                yield partner, 1
+
+    def abstract_route(self, start: Tuple[int, int], goal: Tuple[int, int]
+                       ) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        """
+        A* over the abstract graph only.
+        Returns (start, nodes..., goal) in world coordinates and the expansions it took.
+        """
+        self._apply_updates()
+        x_min, y_min = self.grid.x_min, self.grid.y_min
+        s, g = (start[0] - x_min, start[1] - y_min), (goal[0] - x_min, goal[1] - y_min)
+        if s == g:
+            return [start], 0
+        start_links = self._local_links(s, g)
+        goal_links = self._local_links(g, s)
+
+        open_set = [(manhattan(s, g), 0, s)]
+        g_score = {s: 0}
+        came_from: Dict[Cell, Cell] = {}
+        closed = set()
+        expanded = 0
+        while open_set:
+            _, d, u = heapq.heappop(open_set)
+            if u == g:
+                route = [u]
+                while u in came_from:
+                    u = came_from[u]
+                    route.append(u)
+                return [(x + x_min, y + y_min) for x, y in reversed(route)], expanded
+            if u in closed:
+                continue
+            closed.add(u)
+            expanded += 1
+            edges = list(self._neighbors(u))
+            if u == s:
+                edges += list(start_links.items())
+            if u in goal_links:
+                edges.append((g, goal_links[u]))
+            for v, w in edges:
+                nd = d + w
+                if nd < g_score.get(v, math.inf):
+                    g_score[v] = nd
+                    came_from[v] = u
+                    heapq.heappush(open_set, (nd + manhattan(v, g), nd, v))
+        return None, expanded
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]
+                  ) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        """
+        HPA* query with the (path, explored_nodes) contract of the other engines.
+        explored_nodes counts abstract expansions plus the local refinement searches.
+        """
+        if not self.grid.in_bounds(*start) or not self.grid.is_reachable(start, goal):
+            return None, 0
+        route, explored = self.abstract_route(start, goal)
+        if route is None:
+            return None, explored
+        x_min, y_min = self.grid.x_min, self.grid.y_min
+        path = [route[0]]
+        for a, b in zip(route, route[1:]):
+            cluster = self.cluster_of((a[0] - x_min, a[1] - y_min))
+            if cluster != self.cluster_of((b[0] - x_min, b[1] - y_min)):
+                path.append(b)  # border transition
+                continue
+            segment, nodes = array_a_star_search(self._cluster_grid(cluster), a, b)
+            explored += nodes
+            if segment is None:
+                return None, explored
+            path.extend(segment[1:])
+        return path, explored
+
+    def describe(self, start: Tuple[int, int], goal: Tuple[int, int]) -> str:
+        """
+        Short room-and-door map description for the LLM prompt.
+        It replaces the raw barrier lists, which grow with the map.
+        """
+        cs = self.cluster_size
+        x_min, y_min = self.grid.x_min, self.grid.y_min
+        lines = [f"The map ({self.grid.width}x{self.grid.height} cells) is divided into rooms of "
+                 f"{cs}x{cs} cells: room [i, j] spans x {x_min} + {cs}*i to {x_min} + {cs}*i + {cs - 1} "
+                 f"and y {y_min} + {cs}*j to {y_min} + {cs}*j + {cs - 1}."]
+        route, _ = self.abstract_route(start, goal)
+        if route is None:
+            lines.append("No room-to-room route connects START and GOAL.")
+            return "\n".join(lines)
+        rooms, doors = [], []
+        for cell in route:
+            room = list(self.cluster_of((cell[0] - x_min, cell[1] - y_min)))
+            if rooms and room != rooms[-1]:
+                doors.append(list(cell))
+            if not rooms or room != rooms[-1]:
+                rooms.append(room)
+        lines.append(f"Rooms on a short route from START to GOAL: {rooms}")
+        lines.append(f"Doorway cells entered on that route: {doors}")
+        return "\n".join(lines)
+
+    def stats(self) -> Dict[str, float]:
+        nodes = sum(len(entry[0]) for entry in self._intra.values())
+        intra_edges = sum(int((entry[2] > 0).sum()) for entry in self._intra.values()) // 2
+        inter_edges = sum(len(t) for t in self._borders.values())
+        memory = sum(entry[2].nbytes for entry in self._intra.values())
+        return {
+            "clusters": self.clusters_x * self.clusters_y,
+            "nodes": nodes,
+            "intra_edges": intra_edges,
+            "inter_edges": inter_edges,
+            "matrix_bytes": memory,
+            "build_seconds": self.build_seconds,
+            "updates": self.updates,
+            "update_seconds": self.update_seconds,
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build an HPA* abstraction and compare it to flat A*")
+    parser.add_argument("map", help="maze image (dark pixels are walls)")
+    parser.add_argument("--cluster-size", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid = GridMap.from_image(args.map)
+    hierarchy = HierarchicalMap(grid, args.cluster_size)
+    print(f"🧱 Abstraction: {hierarchy.stats()}")
+
+    rng = np.random.default_rng(args.seed)
+    free = np.argwhere(grid.grid == 0) + [grid.x_min, grid.y_min]
+    for _ in range(args.queries):
+        start, goal = (tuple(int(v) for v in free[i]) for i in rng.integers(len(free), size=2))
+        began = time.perf_counter()
+        path, nodes = hierarchy.find_path(start, goal)
+        hpa_time = time.perf_counter() - began
+        began = time.perf_counter()
+        flat, flat_nodes = array_a_star_search(grid, start, goal)
+        flat_time = time.perf_counter() - began
+        if path is None:
+            print(f"❌ {start} → {goal}: no path")
+            continue
+        print(f"🔍 {start} → {goal}: HPA* {len(path)} cells / {nodes} nodes / {hpa_time:.3f}s, "
+              f"A* {len(flat)} cells / {flat_nodes} nodes / {flat_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
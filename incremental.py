@@ -0,0 +1,229 @@
+"""
+Incremental replanning with D* Lite for maps that change while a path is followed.
+
+DStarLite searches backwards from the goal and keeps its g/rhs values between
+calls to plan(). When cells are occupied or freed (GridMap.set_occupied,
+set_free, barrier edits), only the vertices around the edited cells are
+updated. The next plan() then repairs just the part of the search that the
+edit made inconsistent. Moving the robot with move_to() needs no search work
+beyond what the key modifier (km) defers. If start is never moved, this is
+LPA*.
+
+Example:
+    planner = DStarLite(grid, start, goal)
+    path, _ = planner.plan()
+    grid.set_occupied(*path[5])
+    planner.move_to(path[2])
+    path, repaired_nodes = planner.plan()
+"""
+import heapq
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from grid_map import GridMap
+from flat_grid import CANCEL_CHECK_INTERVAL, DIAGONAL_COST
+from a_star import get_neighbors, heuristic, octile_heuristic
+
+INF = float("inf")
+
+Key = Tuple[float, float]
+
+
+class DStarLite:
+    """
+    D* Lite planner bound to one GridMap, start and goal.
+
+    The planner registers itself as a grid listener. Edits are queued and
+    applied at the next plan(), so the grid can be edited from another thread.
+    Call close() (or use it as a context manager) to detach from the grid.
+    """
+
+    def __init__(self, grid: GridMap,
+                 start: Tuple[int, int],
+                 goal: Tuple[int, int],
+                 diagonal: bool = False,
+                 heuristic_fn: Optional[Callable[[Tuple[int, int], Tuple[int, int]], float]] = None):
+        self.grid = grid
+        self.start = start
+        self.goal = goal
+        self.diagonal = diagonal
+        self.h = heuristic_fn or (octile_heuristic if diagonal else heuristic)
+        self.replans = 0
+        self.total_expanded = 0
+        self._lock = threading.Lock()
+        self._pending: Set[Tuple[int, int]] = set()
+        self._full_reset = False
+        self._reset()
+        grid.add_listener(self._on_grid_change)
+
+    def __enter__(self) -> "DStarLite":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.grid.remove_listener(self._on_grid_change)
+
+    def _reset(self):
+        self.g: Dict[Tuple[int, int], float] = {}
+        self.rhs: Dict[Tuple[int, int], float] = {self.goal: 0.0}
+        self.km = 0.0
+        self._last = self.start
+        self._open: List[Tuple[Key, Tuple[int, int]]] = []
+        self._keys: Dict[Tuple[int, int], Key] = {}  # live queue entries; older heap entries are stale
+        self._push(self.goal, (self.h(self.start, self.goal), 0.0))
+
+    def _on_grid_change(self, cells: Optional[List[Tuple[int, int]]]):
+        with self._lock:
+            if cells is None:
+                self._full_reset = True
+            else:
+                self._pending.update(cells)
+
+    def move_to(self, position: Tuple[int, int]):
+        """Advance the start (robot position); the next plan() replans from here."""
+        self.start = position
+
+    # -------------------------
+    # Core D* Lite
+    # -------------------------
+    def cost(self, u: Tuple[int, int], v: Tuple[int, int]) -> float:
+        grid = self.grid
+        if grid.is_occupied(*u) or grid.is_occupied(*v):
+            return INF
+        if u[0] != v[0] and u[1] != v[1]:
+            # Diagonal step: no squeezing between two blocked corners
+            if grid.is_occupied(v[0], u[1]) or grid.is_occupied(u[0], v[1]):
+                return INF
+            return DIAGONAL_COST
+        return 1.0
+
+    def _key(self, u: Tuple[int, int]) -> Key:
+        best = min(self.g.get(u, INF), self.rhs.get(u, INF))
+        # Rounded so that sums of DIAGONAL_COST steps that should tie do tie
+        return round(best + self.h(self.start, u) + self.km, 9), round(best, 9)
+
+    def _push(self, u: Tuple[int, int], key: Key):
+        self._keys[u] = key
+        heapq.heappush(self._open, (key, u))
+
+    def _top(self) -> Optional[Tuple[Key, Tuple[int, int]]]:
+        open_set, keys = self._open, self._keys
+        while open_set and keys.get(open_set[0][1]) != open_set[0][0]:
+            heapq.heappop(open_set)
+        return open_set[0] if open_set else None
+
+    def _update_vertex(self, u: Tuple[int, int]):
+        if not self.grid.in_bounds(*u):
+            return
+        if u != self.goal:
+            best = INF
+            for s in get_neighbors(u, self.diagonal):
+                c = self.cost(u, s)
+                if c < INF:
+                    best = min(best, c + self.g.get(s, INF))
+            self.rhs[u] = best
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u, self._key(u))
+        else:
+            self._keys.pop(u, None)
+
+    def _compute_shortest_path(self, cancel: Optional[threading.Event]) -> Tuple[bool, int]:
+        g, rhs = self.g, self.rhs
+        expanded = 0
+        while True:
+            top = self._top()
+            if top is None:
+                break
+            start = self.start
+            # Ties with the start key are expanded too: an underconsistent state with an
+            # equal key could otherwise still lie on the greedy path
+            if top[0] > self._key(start) and rhs.get(start, INF) == g.get(start, INF):
+                break
+            k_old, u = heapq.heappop(self._open)
+            del self._keys[u]
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u, k_new)
+                continue
+            expanded += 1
+            if g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+            else:
+                g[u] = INF
+                self._update_vertex(u)
+            for s in get_neighbors(u, self.diagonal):
+                self._update_vertex(s)
+            if cancel is not None and expanded % CANCEL_CHECK_INTERVAL == 0 and cancel.is_set():
+                return False, expanded
+        return True, expanded
+
+    def _extract_path(self) -> Optional[List[Tuple[int, int]]]:
+        current = self.start
+        if self.g.get(current, INF) == INF:
+            return None
+        path = [current]
+        limit = self.grid.width * self.grid.height
+        while current != self.goal:
+            best, step = INF, None
+            for s in get_neighbors(current, self.diagonal):
+                c = self.cost(current, s)
+                if c < INF and c + self.g.get(s, INF) < best:
+                    best, step = c + self.g.get(s, INF), s
+            if step is None or len(path) > limit:
+                return None
+            path.append(step)
+            current = step
+        return path
+
+    def plan(self, cancel: Optional[threading.Event] = None
+             ) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        """
+        Apply queued grid edits and (re)plan from the current start.
+        Returns (path, nodes expanded by this call), like the other engines.
+        A cancelled plan returns (None, expanded); its work is kept and resumed next time.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            full_reset, self._full_reset = self._full_reset, False
+        if full_reset:
+            self._reset()
+        elif pending:
+            self.km += self.h(self._last, self.start)
+            self._last = self.start
+            affected = set(pending)
+            for cell in pending:
+                affected.update(get_neighbors(cell, self.diagonal))
+            for u in affected:
+                self._update_vertex(u)
+
+        finished, expanded = self._compute_shortest_path(cancel)
+        self.replans += 1
+        self.total_expanded += expanded
+        if not finished:
+            return None, expanded
+        return self._extract_path(), expanded
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "replans": self.replans,
+            "total_expanded": self.total_expanded,
+            "open_size": len(self._keys),
+            "states": len(self.g),
+        }
+
+
+def path_is_valid(grid: GridMap, path: List[Tuple[int, int]]) -> bool:
+    """True if every cell of `path` is free and every step is a legal 4/8-connected move."""
+    for i, (x, y) in enumerate(path):
+        if grid.is_occupied(x, y):
+            return False
+        if i == 0:
+            continue
+        px, py = path[i - 1]
+        dx, dy = abs(x - px), abs(y - py)
+        if dx > 1 or dy > 1:
+            return False
+        if dx and dy and (grid.is_occupied(x, py) or grid.is_occupied(px, y)):
+            return False
+    return True
@@ -0,0 +1,93 @@
+"""
+Structured instrumentation for the LLM-A* pipeline.
+
+A Tracer collects the wall-clock time spent per stage (prompt build, LLM
+call, parse, filter, prune, each segment, fallback), named counters such as
+node expansions and heap pushes, and an ordered event log. An optional
+callback sees every event as it happens. With quiet=True the progress
+messages that llm_astar and get_llm_waypoints would print are dropped.
+
+Example:
+    tracer = Tracer(quiet=True)
+    path, _ = llm_astar(grid, start, goal, tracer=tracer)
+    print(tracer.metrics()["timings"])
+    tracer.export_json("run_metrics.json")
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# callback(kind, event): kind is "stage", "count" or "log"
+TraceCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class Tracer:
+    """
+    Collects stage timings, counters and events for one or more planning runs.
+
+    Safe to share between threads (waypoint sampling queries the LLM concurrently).
+    The `counters` dict may also be handed to a search engine directly, see
+    a_star_search(counters=...).
+    """
+
+    def __init__(self, quiet: bool = False, callback: Optional[TraceCallback] = None):
+        self.quiet = quiet
+        self.callback = callback
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block as stage `name`. Yields the event's attribute
+        dict, so the block can attach results (e.g. explored nodes) to it.
+        """
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            seconds = time.perf_counter() - started
+            event = {"stage": name, "at": started - self._origin, "seconds": seconds, **attrs}
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + seconds
+                self.calls[name] = self.calls.get(name, 0) + 1
+                self.events.append(event)
+            if self.callback is not None:
+                self.callback("stage", event)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.callback is not None:
+            self.callback("count", {"counter": name, "value": value})
+
+    def log(self, *message):
+        """print() unless quiet; the callback receives the message either way."""
+        if not self.quiet:
+            print(*message)
+        if self.callback is not None:
+            self.callback("log", {"message": " ".join(str(m) for m in message)})
+
+    def metrics(self) -> Dict[str, Any]:
+        """JSON-serialisable snapshot of everything recorded so far."""
+        with self._lock:
+            return {
+                "elapsed": time.perf_counter() - self._origin,
+                "timings": {name: {"seconds": seconds, "calls": self.calls[name]}
+                            for name, seconds in self.timings.items()},
+                "counters": dict(self.counters),
+                "events": list(self.events),
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.metrics(), indent=indent, default=str)
+
+    def export_json(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.to_json())
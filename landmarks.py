@@ -0,0 +1,227 @@
+"""
+Landmark (ALT) heuristics for repeated queries on a fixed map.
+
+A LandmarkTable stores the BFS distance field of a few landmark cells.
+By the triangle inequality, |d(L, goal) - d(L, n)| is a lower bound on
+the distance from n to goal. In mazes this bound is far tighter than
+Euclidean distance, so A* expands much less of the map.
+
+The bound is evaluated per cell as the search reaches it (K lookups and a
+hypot), so a query pays only for the cells it touches, never for a
+full-map field per goal.
+
+Example:
+    python landmarks.py maze.png --landmarks 8 --queries 20
+"""
+import argparse
+import math
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from grid_map import GridMap
+from distance_field import UNREACHABLE, bfs_distance_field
+from llm_cache import map_fingerprint
+
+
+def landmark_path(map_path: str) -> str:
+    """Where the landmark table for a map file is stored."""
+    return map_path + ".landmarks.npz"
+
+
+class LandmarkTable:
+    """
+    Distance fields of landmark cells, stored compactly as one (K, width, height) array.
+
+    Unreachable cells hold the dtype's max value. Distances are 4-connected
+    step counts, so the heuristic is admissible for 4-connected searches
+    (not for diagonal=True).
+    """
+
+    def __init__(self, grid: GridMap, landmarks: List[Tuple[int, int]], distances: np.ndarray,
+                 build_seconds: float = 0.0):
+        self.grid = grid
+        self.landmarks = landmarks
+        self.distances = distances
+        self.unreachable = np.iinfo(distances.dtype).max
+        self.build_seconds = build_seconds
+        self._padded: Optional[List[array]] = None  # distances in flat_grid's padded layout
+        self._version = grid.version
+
+    @classmethod
+    def build(cls, grid: GridMap, num_landmarks: int = 8, seed: int = 0) -> "LandmarkTable":
+        """
+        Pick landmarks by farthest-point selection and store their distance fields.
+        Every new landmark is the free cell farthest from all landmarks chosen so
+        far; cells no landmark reaches count as infinitely far, so every
+        connected component gets landmarks.
+        """
+        t0 = time.perf_counter()
+        free_x, free_y = np.nonzero(grid.grid == 0)
+        if free_x.size == 0:
+            raise ValueError("Cannot place landmarks on a map without free cells")
+        rng = np.random.default_rng(seed)
+        pick = int(rng.integers(free_x.size))
+        seed_cell = (int(free_x[pick]) + grid.x_min, int(free_y[pick]) + grid.y_min)
+
+        # The first landmark is the cell farthest from a random free cell (in its component)
+        nearest = bfs_distance_field(grid, seed_cell).astype(np.float64)
+        nearest[nearest == UNREACHABLE] = 0.0
+        landmarks: List[Tuple[int, int]] = []
+        fields: List[np.ndarray] = []
+        for _ in range(num_landmarks):
+            candidates = np.where(grid.grid == 0, nearest, -1.0)
+            gx, gy = np.unravel_index(int(np.argmax(candidates)), candidates.shape)
+            if candidates[gx, gy] <= 0:
+                break  # every free cell already is a landmark
+            landmark = (int(gx) + grid.x_min, int(gy) + grid.y_min)
+            field = bfs_distance_field(grid, landmark)
+            landmarks.append(landmark)
+            fields.append(field)
+            reached = np.where(field == UNREACHABLE, np.inf, field)
+            nearest = reached if len(fields) == 1 else np.minimum(nearest, reached)
+
+        stacked = np.stack(fields)
+        dtype = np.uint16 if stacked.max() < np.iinfo(np.uint16).max else np.uint32
+        distances = np.where(stacked == UNREACHABLE, np.iinfo(dtype).max, stacked).astype(dtype)
+        return cls(grid, landmarks, distances, time.perf_counter() - t0)
+
+    @property
+    def nbytes(self) -> int:
+        return self.distances.nbytes
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "landmarks": len(self.landmarks),
+            "build_seconds": self.build_seconds,
+            "memory_bytes": self.nbytes,
+            "dtype_bits": self.distances.dtype.itemsize * 8,
+        }
+
+    # -------------------------
+    # Heuristic
+    # -------------------------
+    def _check_version(self):
+        if self.grid.version != self._version:
+            raise ValueError("GridMap changed since the landmark table was built; rebuild it")
+
+    def _to_goal(self, goal: Tuple[int, int]) -> List[int]:
+        """Landmark distances of `goal`, one per landmark (unreachable ones included)."""
+        return [int(d) for d in self.distances[:, goal[0] - self.grid.x_min, goal[1] - self.grid.y_min]]
+
+    def padded_distances(self) -> List[array]:
+        """One flat array per landmark in flat_grid's padded layout, built once per table."""
+        if self._padded is None:
+            typecode = "H" if self.distances.dtype == np.uint16 else "I"
+            self._padded = [array(typecode, np.pad(dist, 1, mode="constant",
+                                                   constant_values=self.unreachable).tobytes())
+                            for dist in self.distances]
+        return self._padded
+
+    def padded_heuristic(self, goal: Tuple[int, int], stride: int) -> Callable[[int, int], float]:
+        """
+        h(dx, dy) for array_a_star_search, where (dx, dy) is the goal minus the
+        cell in padded flat coordinates: the larger of Euclidean distance and the
+        ALT bounds of the landmarks that reach both the cell and the goal.
+        """
+        self._check_version()
+        unreachable = self.unreachable
+        columns = [(column, to_goal) for column, to_goal in zip(self.padded_distances(), self._to_goal(goal))
+                   if to_goal != unreachable]
+        gx, gy = goal[0] - self.grid.x_min + 1, goal[1] - self.grid.y_min + 1
+        hypot = math.hypot
+
+        def h(dx: int, dy: int) -> float:
+            index = (gx - dx) * stride + gy - dy
+            best = hypot(dx, dy)
+            for column, to_goal in columns:
+                d = column[index]
+                if d != unreachable:
+                    bound = d - to_goal if d > to_goal else to_goal - d
+                    if bound > best:
+                        best = bound
+            return best
+        return h
+
+    def heuristic(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        """Same signature as a_star.heuristic; usable as a_star_search's heuristic_fn."""
+        best = math.hypot(b[0] - a[0], b[1] - a[1])
+        if not self.grid.in_bounds(*a) or not self.grid.in_bounds(*b):
+            return best
+        self._check_version()
+        unreachable = self.unreachable
+        at_a = self.distances[:, a[0] - self.grid.x_min, a[1] - self.grid.y_min]
+        for d, to_goal in zip(at_a.tolist(), self._to_goal(b)):
+            if d != unreachable and to_goal != unreachable:
+                best = max(best, abs(d - to_goal))
+        return float(best)
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path: str):
+        np.savez_compressed(path, landmarks=np.array(self.landmarks, dtype=np.int64),
+                            distances=self.distances,
+                            fingerprint=np.array(map_fingerprint(self.grid, [], [])),
+                            build_seconds=np.array(self.build_seconds))
+
+    @classmethod
+    def load(cls, path: str, grid: GridMap) -> "LandmarkTable":
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != map_fingerprint(grid, [], []):
+                raise ValueError(f"Landmark table {path} was built for a different map")
+            landmarks = [tuple(int(v) for v in p) for p in data["landmarks"]]
+            return cls(grid, landmarks, data["distances"], float(data["build_seconds"]))
+
+    @classmethod
+    def load_or_build(cls, map_path: str, grid: GridMap, num_landmarks: int = 8) -> "LandmarkTable":
+        """Load the table stored next to `map_path`, building and saving it if missing or stale."""
+        path = landmark_path(map_path)
+        try:
+            return cls.load(path, grid)
+        except (OSError, ValueError, KeyError):
+            table = cls.build(grid, num_landmarks)
+            table.save(path)
+            return table
+
+
+def measure_speedup(grid: GridMap, table: LandmarkTable,
+                    queries: Sequence[Tuple[Tuple[int, int], Tuple[int, int]]]) -> Dict[str, float]:
+    """Total expansions and time of array A* with and without the landmark heuristic."""
+    from a_star import SearchContext, array_a_star_search
+
+    context = SearchContext(grid)
+    totals = {"plain_nodes": 0, "alt_nodes": 0, "plain_seconds": 0.0, "alt_seconds": 0.0}
+    for start, goal in queries:
+        t0 = time.perf_counter()
+        _, plain = array_a_star_search(grid, start, goal, context=context)
+        t1 = time.perf_counter()
+        _, alt = array_a_star_search(grid, start, goal, context=context, landmarks=table)
+        t2 = time.perf_counter()
+        totals["plain_nodes"] += plain
+        totals["alt_nodes"] += alt
+        totals["plain_seconds"] += t1 - t0
+        totals["alt_seconds"] += t2 - t1
+    totals["node_ratio"] = totals["plain_nodes"] / max(1, totals["alt_nodes"])
+    totals["speedup"] = totals["plain_seconds"] / max(1e-9, totals["alt_seconds"])
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute ALT landmarks for a maze image")
+    parser.add_argument("image")
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    gmap = GridMap.from_image(args.image)
+    table = LandmarkTable.build(gmap, args.landmarks, args.seed)
+    table.save(landmark_path(args.image))
+    print(f"🗺️ Landmarks: {table.report()}")
+
+    rng = np.random.default_rng(args.seed)
+    free = np.argwhere(gmap.grid == 0) + [gmap.x_min, gmap.y_min]
+    picks = rng.integers(len(free), size=(args.queries, 2))
+    sample = [(tuple(map(int, free[i])), tuple(map(int, free[j]))) for i, j in picks]
+    print(f"⚡ Speedup over {args.queries} queries: {measure_speedup(gmap, table, sample)}")
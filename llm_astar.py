@@ -1,10 +1,21 @@
-from typing import List, Tuple, Optional
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Optional
 from grid_map import GridMap
-from a_star import a_star_search
-from llm_interface import get_llm_waypoints
-
-def manhattan(p1: Tuple[int, int], p2: Tuple[int, int]) -> int:
-    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+from a_star import SearchContext, a_star_search, array_a_star_search, get_search_engine
+from flat_grid import manhattan
+from landmarks import LandmarkTable
+from incremental import path_is_valid
+from hierarchy import HierarchicalMap
+from instrumentation import Tracer
+from path_cache import PathCache
+from batch import GridWorkerPool, shared_pool
+from llm_cache import WaypointCache
+from llm_interface import DEFAULT_PROMPT_TOKEN_BUDGET, get_llm_waypoints
+from waypoint_scoring import (CandidateScore, SamplingSpec, exact_leg_costs, sample_waypoint_candidates,
+                              score_candidate)
+from ollama_client import OllamaClient
 
 def filter_dense_waypoints(waypoints: List[Tuple[int, int]], min_dist: int = 3) -> List[Tuple[int, int]]:
     if not waypoints:
@@ -26,7 +37,7 @@ def prune_redundant_waypoints(grid: GridMap,
     i = 0
 
     while i < len(targets) - 2:
-        if a_star_search(grid, targets[i], targets[i + 2])[0] is not None:
+        if grid.is_reachable(targets[i], targets[i + 2]):
             i += 1  # Middle point is redundant
         else:
             pruned.append(targets[i + 1])
@@ -37,65 +48,379 @@ def prune_redundant_waypoints(grid: GridMap,
 
     return pruned
 
+def refine_waypoints(grid: GridMap,
+                     waypoints: List[Tuple[int, int]],
+                     start: Tuple[int, int],
+                     goal: Tuple[int, int],
+                     tracer: Optional[Tracer] = None) -> List[Tuple[int, int]]:
+    """Drop waypoints inside walls / cut off from start, then dense and redundant ones."""
+    tracer = tracer if tracer is not None else Tracer()
+    with tracer.stage("filter"):
+        waypoints = [wp for wp in waypoints if grid.is_reachable(start, wp)]
+        waypoints = filter_dense_waypoints(waypoints, min_dist=3)
+    with tracer.stage("prune"):
+        return prune_redundant_waypoints(grid, waypoints, start, goal)
+
+def plan_segments_parallel(pool: GridWorkerPool,
+                           targets: List[Tuple[int, int]],
+                           engine: str,
+                           cancel: Optional[threading.Event] = None,
+                           path_cache: Optional[PathCache] = None,
+                           counters: Optional[Dict[str, int]] = None,
+                           **search_options
+                           ) -> Tuple[Optional[List[List[Tuple[int, int]]]], int, int]:
+    """
+    Solve every targets[i] → targets[i + 1] segment concurrently on `pool`.
+    Returns (segment paths in order, total explored nodes, -1), or on the first
+    failure (None, nodes so far, index of the failed segment). A failure or
+    `cancel` cancels the queued segments and stops the running ones through a
+    cancel flag shared with the workers.
+    Segments found in `path_cache` are not searched, and searched ones are stored
+    in it; `counters` receives the workers' expanded/heap_pushes counts.
+    """
+    paths: List[Optional[List[Tuple[int, int]]]] = [None] * (len(targets) - 1)
+    if path_cache is not None:
+        for i in range(len(paths)):
+            paths[i] = path_cache.lookup(targets[i], targets[i + 1])
+    flag = pool.cancel_flag()
+    futures = {pool.submit_search(targets[i], targets[i + 1], engine, cancel_flag=flag,
+                                  counters=counters is not None, **search_options): i
+               for i in range(len(paths)) if paths[i] is None}
+    total_nodes = 0
+    pending = set(futures)
+
+    def stop_pending():
+        if flag is not None:
+            flag.set()
+        for future in pending:
+            future.cancel()
+
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=None if cancel is None else 0.05,
+                                 return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                stop_pending()
+                return None, total_nodes, -1
+            for future in done:
+                path, explored, *counted = future.result()
+                total_nodes += explored
+                for name, value in (counted[0] if counted else {}).items():
+                    counters[name] = counters.get(name, 0) + value
+                index = futures[future]
+                if path is None:
+                    stop_pending()
+                    return None, total_nodes, index
+                if path_cache is not None:
+                    path_cache.store(targets[index], targets[index + 1], path)
+                paths[index] = path
+    finally:
+        if flag is not None:
+            pool.release_cancel_flag(flag, futures)
+
+    return paths, total_nodes, -1
+
+def make_search(grid: GridMap,
+                engine: str,
+                context: Optional[SearchContext] = None,
+                cancel: Optional[threading.Event] = None,
+                diagonal: bool = False,
+                landmarks: Optional[LandmarkTable] = None,
+                counters: Optional[Dict[str, int]] = None) -> Tuple[Callable, Optional[SearchContext]]:
+    """
+    Resolve `engine` into a search(grid, start, goal) callable with the options bound.
+    Returns it with the SearchContext it uses ("array" engine only, else None).
+    `counters` (expanded/heap_pushes) is only filled by the classic and array engines.
+    """
+    engine_fn = get_search_engine(engine)
+    search = engine_fn
+    if engine_fn is array_a_star_search:
+        context = context if context is not None else SearchContext(grid)
+        search = partial(array_a_star_search, context=context)
+    else:
+        context = None
+    if landmarks is not None:
+        if engine_fn is a_star_search:
+            search = partial(search, heuristic_fn=landmarks.heuristic)
+        elif engine_fn is array_a_star_search:
+            search = partial(search, landmarks=landmarks)
+        else:
+            raise ValueError("Landmark heuristics need the 'classic' or 'array' engine")
+    search = partial(search, diagonal=diagonal)
+    if counters is not None and engine_fn in (a_star_search, array_a_star_search):
+        search = partial(search, counters=counters)
+    if cancel is not None:
+        search = partial(search, cancel=cancel)
+    return search, context
+
 def llm_astar(grid: GridMap,
               start: Tuple[int, int],
               goal: Tuple[int, int],
-              model: str = "mistral") -> Tuple[Optional[List[Tuple[int, int]]], List[Tuple[int, int]]]:
+              model: str = "mistral",
+              engine: str = "classic",
+              context: Optional[SearchContext] = None,
+              cache: Optional[WaypointCache] = None,
+              client: Optional[OllamaClient] = None,
+              stream: bool = False,
+              fallback: bool = True,
+              cancel: Optional[threading.Event] = None,
+              segment_pool: Optional[GridWorkerPool] = None,
+              segment_workers: int = 0,
+              stats: Optional[Dict] = None,
+              diagonal: bool = False,
+              landmarks: Optional[LandmarkTable] = None,
+              hierarchy: Optional[HierarchicalMap] = None,
+              prompt_token_budget: Optional[int] = DEFAULT_PROMPT_TOKEN_BUDGET,
+              samples: Optional[List[SamplingSpec]] = None,
+              exact_scoring: bool = False,
+              tracer: Optional[Tracer] = None,
+              path_cache: Optional[PathCache] = None) -> Tuple[Optional[List[Tuple[int, int]]], List[Tuple[int, int]]]:
     """
     LLM-A* path planner with:
     - LLM-generated waypoints
     - Filtering and pruning
     - Segment-wise A* fallback
+
+    `engine` selects the grid search used for every A* call (see a_star.SEARCH_ENGINES);
+    `diagonal` switches all of them to 8-connected moves, and `landmarks` to the ALT
+    heuristic (classic/array engines, in-process searches).
+    With the "array" engine all pruning, segment and fallback searches share one
+    SearchContext (pass `context` to keep it across llm_astar calls too).
+    With a `cache`, repeated queries on the same map skip the LLM round trip.
+    `client`/`stream` are passed to ask_ollama.
+    With `fallback=False` a failed plan returns (None, []) instead of running full A*;
+    setting `cancel` abandons the LLM stream and any running search the same way.
+    Segments are solved concurrently on `segment_pool` (built for this grid; it
+    follows grid edits through sync()) or on batch.shared_pool(grid, `segment_workers`),
+    which is reused across calls. The first failed segment cancels the rest, including
+    the ones already running. Worker searches use the `path_cache` and report to the
+    tracer's counters, but cannot take `landmarks`.
+    If a `stats` dict is given it receives explored_nodes (all A* work), fallback,
+    prompt_tokens (estimated size of the LLM prompt) and metrics (Tracer.metrics()).
+    The prompt describes obstacles as rectangles compressed to `prompt_token_budget`
+    tokens (None sends the raw barrier lists); with a `hierarchy` it describes the map
+    by its HPA* rooms and doorways instead.
+    With `samples` (see waypoint_scoring.default_sampling) one waypoint set per spec is
+    requested concurrently, candidates are scored without searching, and only the best
+    is segment-planned; stats then also receives candidates and chosen_candidate.
+    `exact_scoring` ranks them by true route cost (distance_field wavefronts) instead.
+    A `tracer` (see instrumentation) records per-stage timings and search counters;
+    Tracer(quiet=True) also silences the progress output.
+    With a `path_cache` (built for this grid and `diagonal`) in-process segment and
+    fallback searches reuse earlier paths, subpaths and search trees.
     """
+    if stats is None:
+        stats = {}
+    if tracer is None:
+        tracer = Tracer()
+    log = tracer.log
+    stats.update(explored_nodes=0, fallback=False, prompt_tokens=0)
+    search, context = make_search(grid, engine, context, cancel, diagonal, landmarks,
+                                  counters=tracer.counters)
+    if path_cache is not None:
+        if path_cache.grid is not grid or path_cache.diagonal != diagonal:
+            raise ValueError("PathCache is bound to a different GridMap or move model")
+        search = path_cache.cached(search)
+    if segment_pool is not None and segment_pool.grid is not grid:
+        raise ValueError("segment_pool is bound to a different GridMap")
+    if landmarks is not None and (segment_pool is not None or segment_workers > 1):
+        raise ValueError("Landmark heuristics are only available to in-process segment searches")
 
-    print("📤 Querying LLM for waypoints...")
-    waypoints = get_llm_waypoints(
-        start=start,
-        goal=goal,
-        horizontal_barriers=grid.horizontal_barriers,
-        vertical_barriers=grid.vertical_barriers,
-        grid=grid,
-        model=model
-    )
+    def cancelled() -> bool:
+        return cancel is not None and cancel.is_set()
 
-    print(f"📌 Raw LLM Waypoints: {waypoints}")
+    def finish(path: Optional[List[Tuple[int, int]]], waypoints: List[Tuple[int, int]]
+               ) -> Tuple[Optional[List[Tuple[int, int]]], List[Tuple[int, int]]]:
+        stats["metrics"] = tracer.metrics()
+        return path, waypoints
 
-    if not waypoints:
-        print("⚠️ No valid LLM waypoints — defaulting to baseline A*")
-        fallback_path, _ = a_star_search(grid, start, goal)
-        return fallback_path, []
+    def run_fallback() -> Tuple[Optional[List[Tuple[int, int]]], List[Tuple[int, int]]]:
+        if not fallback or cancelled():
+            return finish(None, [])
+        with tracer.stage("fallback") as event:
+            fallback_path, explored = search(grid, start, goal)
+            event["explored"] = explored
+        stats["explored_nodes"] += explored
+        stats["fallback"] = True
+        return finish(fallback_path, [])
 
-    # Step 1: Filter waypoints inside walls / redundant
-    waypoints = [wp for wp in waypoints if grid.in_bounds(*wp) and not grid.is_occupied(*wp)]
-    waypoints = filter_dense_waypoints(waypoints, min_dist=3)
-    waypoints = prune_redundant_waypoints(grid, waypoints, start, goal)
+    with tracer.stage("reachability"):
+        reachable = grid.is_reachable(start, goal)
+    if not reachable:
+        log(f"❌ Goal {goal} is not reachable from {start} — skipping LLM and A*")
+        return finish(None, [])
 
-    print(f"✅ Filtered & Pruned Waypoints: {waypoints}")
+    map_description = hierarchy.describe(start, goal) if hierarchy is not None else None
+    log("📤 Querying LLM for waypoints...")
+    with tracer.stage("waypoints", samples=len(samples) if samples else 1):
+        if samples:
+            candidate_waypoints = sample_waypoint_candidates(
+                start, goal, grid, samples, cache=cache, client=client, stream=stream,
+                cancel=cancel, map_description=map_description,
+                token_budget=prompt_token_budget, stats=stats, tracer=tracer)
+        else:
+            candidate_waypoints = [get_llm_waypoints(
+                start=start,
+                goal=goal,
+                horizontal_barriers=grid.horizontal_barriers,
+                vertical_barriers=grid.vertical_barriers,
+                grid=grid,
+                model=model,
+                cache=cache,
+                client=client,
+                stream=stream,
+                cancel=cancel,
+                map_description=map_description,
+                token_budget=prompt_token_budget,
+                stats=stats,
+                tracer=tracer
+            )]
+    if cancelled():
+        return finish(None, [])
+
+    log(f"📌 Raw LLM Waypoints: {candidate_waypoints if samples else candidate_waypoints[0]}")
+
+    proposals = [(spec, wps) for spec, wps in zip(samples or [None], candidate_waypoints) if wps]
+    if not proposals:
+        log("⚠️ No valid LLM waypoints — defaulting to baseline A*")
+        return run_fallback()
+
+    # Step 1: Filter waypoints inside walls / cut off from start, then redundant ones
+    if samples:
+        candidates = []
+        for spec, raw in proposals:
+            refined = refine_waypoints(grid, raw, start, goal, tracer)
+            unreachable = sum(not grid.is_reachable(start, wp) for wp in raw)
+            candidates.append(CandidateScore(spec, refined, unreachable=unreachable))
+        with tracer.stage("score", exact=exact_scoring):
+            leg_costs = None
+            if exact_scoring:
+                leg_costs = exact_leg_costs(grid, [[start] + c.waypoints + [goal] for c in candidates],
+                                            diagonal)
+            for candidate in candidates:
+                score_candidate(grid, start, goal, candidate, diagonal=diagonal,
+                                heuristic_fn=landmarks.heuristic if landmarks is not None and not diagonal else None,
+                                leg_costs=leg_costs)
+        best = min(range(len(candidates)), key=lambda i: candidates[i].score)
+        stats["candidates"] = [c.as_dict() for c in candidates]
+        stats["chosen_candidate"] = best
+        log(f"🏆 Best of {len(candidates)} candidates: #{best} "
+            f"(score {candidates[best].score:.1f}, temperature {candidates[best].spec.temperature})")
+        waypoints = candidates[best].waypoints
+    else:
+        waypoints = refine_waypoints(grid, proposals[0][1], start, goal, tracer)
+
+    log(f"✅ Filtered & Pruned Waypoints: {waypoints}")
 
     # Step 2: Segment-wise planning
     targets = [start] + waypoints + [goal]
     full_path = []
-    total_nodes = 0
 
-    for i in range(len(targets) - 1):
-        s = targets[i]
-        g = targets[i + 1]
-        print(f"🔄 Planning from {s} → {g}...")
+    pool = segment_pool
+    if pool is None and segment_workers > 1 and len(targets) > 2:
+        pool = shared_pool(grid, segment_workers)
 
-        path, explored = a_star_search(grid, s, g)
+    if pool is not None and len(targets) > 2:
+        log(f"🔀 Planning {len(targets) - 1} segments on {pool.workers} workers...")
+        with tracer.stage("segments_parallel", segments=len(targets) - 1) as event:
+            segment_paths, segment_nodes, failed = plan_segments_parallel(
+                pool, targets, engine, cancel, path_cache, tracer.counters, diagonal=diagonal)
+            event["explored"] = segment_nodes
+        stats["explored_nodes"] += segment_nodes
+        if segment_paths is None:
+            if cancelled():
+                return finish(None, [])
+            log(f"❌ Segment failed: {targets[failed]} → {targets[failed + 1]}. "
+                f"Fallback to full A*.")
+            return run_fallback()
+        for i, path in enumerate(segment_paths):
+            full_path.extend(path if i == 0 else path[1:])
+    else:
+        for i in range(len(targets) - 1):
+            s = targets[i]
+            g = targets[i + 1]
+            log(f"🔄 Planning from {s} → {g}...")
 
-        if path is None:
-            print(f"❌ Segment failed: {s} → {g}. Fallback to full A*.")
-            fallback_path, _ = a_star_search(grid, start, goal)
-            return fallback_path, []
+            with tracer.stage("segment", index=i, start=s, goal=g) as event:
+                path, explored = search(grid, s, g)
+                event["explored"] = explored
+            stats["explored_nodes"] += explored
 
-        # Avoid duplicating nodes
-        if i == 0:
-            full_path.extend(path)
-        else:
-            full_path.extend(path[1:])
+            if path is None:
+                if cancelled():
+                    return finish(None, [])
+                log(f"❌ Segment failed: {s} → {g}. Fallback to full A*.")
+                return run_fallback()
+
+            # Avoid duplicating nodes
+            if i == 0:
+                full_path.extend(path)
+            else:
+                full_path.extend(path[1:])
+
+    log(f"✅ Final LLM-A* Path Length: {len(full_path)}")
+    if context is not None:
+        context_stats = context.stats()
+        log(f"♻️ Search context: {context_stats['searches']} searches, "
+            f"{context_stats['bytes_saved'] / 1024:.1f} KB of buffer allocation saved")
+    return finish(full_path, waypoints)
+
+def repair_llm_path(grid: GridMap,
+                    path: List[Tuple[int, int]],
+                    waypoints: List[Tuple[int, int]],
+                    engine: str = "classic",
+                    context: Optional[SearchContext] = None,
+                    stats: Optional[Dict] = None,
+                    diagonal: bool = False,
+                    tracer: Optional[Tracer] = None) -> Tuple[Optional[List[Tuple[int, int]]], List[Tuple[int, int]]]:
+    """
+    Repair an llm_astar result after the grid changed, without another LLM round trip.
+
+    Waypoints that are still free and reachable are kept. The path is cut at
+    those waypoints; segments that are still valid are reused unchanged and only
+    broken ones are replanned with `engine`. A segment that can no longer be
+    solved falls back to one full search from start to goal.
+    If a `stats` dict is given it receives explored_nodes, replanned_segments and fallback.
+    Progress goes through `tracer.log`, so Tracer(quiet=True) silences it.
+    """
+    if stats is None:
+        stats = {}
+    log = (tracer if tracer is not None else Tracer()).log
+    stats.update(explored_nodes=0, replanned_segments=0, fallback=False)
+    start, goal = path[0], path[-1]
+    if not grid.is_reachable(start, goal):
+        log(f"❌ Goal {goal} is no longer reachable from {start}")
+        return None, []
+
+    # Position of each waypoint along the old path (they were visited in order)
+    cuts = []
+    for i, cell in enumerate(path):
+        if len(cuts) < len(waypoints) and cell == waypoints[len(cuts)]:
+            cuts.append(i)
+    if len(cuts) != len(waypoints):
+        cuts, waypoints = [], []
+
+    kept = [(i, wp) for i, wp in zip(cuts, waypoints) if grid.is_reachable(start, wp)]
+    if len(kept) < len(waypoints):
+        log(f"🧹 Dropped {len(waypoints) - len(kept)} blocked/cut-off waypoints")
+    bounds = [0] + [i for i, _ in kept] + [len(path) - 1]
 
-        total_nodes += explored
+    search, _ = make_search(grid, engine, context, diagonal=diagonal)
+    repaired = [start]
+    for a, b in zip(bounds, bounds[1:]):
+        segment = path[a:b + 1]
+        if not path_is_valid(grid, segment):
+            log(f"🔧 Replanning broken segment {segment[0]} → {segment[-1]}...")
+            segment, explored = search(grid, segment[0], segment[-1])
+            stats["explored_nodes"] += explored
+            stats["replanned_segments"] += 1
+            if segment is None:
+                log("❌ Segment repair failed. Fallback to full A*.")
+                full_path, explored = search(grid, start, goal)
+                stats["explored_nodes"] += explored
+                stats["fallback"] = True
+                return full_path, []
+        repaired.extend(segment[1:])
 
-    print(f"✅ Final LLM-A* Path Length: {len(full_path)}")
-    return full_path, waypoints
+    log(f"✅ Repaired path: {stats['replanned_segments']} of {len(bounds) - 1} segments replanned")
+    return repaired, [wp for _, wp in kept]
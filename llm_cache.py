@@ -0,0 +1,147 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+
+Waypoints = List[Tuple[int, int]]
+
+
+def map_fingerprint(grid: GridMap,
+                    horizontal_barriers: List[List[int]],
+                    vertical_barriers: List[List[int]],
+                    map_description: Optional[str] = None) -> str:
+    """Hash of everything about the map that can change the LLM's answer."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([grid.x_min, grid.x_max, grid.y_min, grid.y_max]).encode())
+    digest.update(np.ascontiguousarray(grid.grid))
+    digest.update(json.dumps([horizontal_barriers, vertical_barriers]).encode())
+    if map_description is not None:
+        digest.update(map_description.encode())
+    return digest.hexdigest()
+
+
+def cache_key(fingerprint: str, start: Tuple[int, int], goal: Tuple[int, int],
+              model: str, prompt_version: int, options: Optional[Dict] = None) -> str:
+    parts = [fingerprint, list(start), list(goal), model, prompt_version]
+    if options:
+        parts.append(options)  # sampling options only join the key when set, so old keys stay valid
+    payload = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class WaypointCache:
+    """
+    LRU cache of raw LLM waypoints with optional TTL and SQLite tier.
+
+    The in-memory tier holds up to `max_entries` keys. When `path` is given,
+    entries are also written to a SQLite file (bounded by `max_disk_entries`,
+    least recently used first) so answers survive restarts; disk hits are
+    promoted back into memory.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[float, Waypoints]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS waypoints ("
+                "key TEXT PRIMARY KEY, created REAL, last_used REAL, waypoints TEXT)")
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[Waypoints]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return list(entry[1])
+                del self._memory[key]
+                self.evictions += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, waypoints FROM waypoints WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    created, payload = row
+                    if not self._expired(created, now):
+                        self._db.execute(
+                            "UPDATE waypoints SET last_used = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        waypoints = [tuple(p) for p in json.loads(payload)]
+                        self._remember(key, created, waypoints)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return list(waypoints)
+                    self._db.execute("DELETE FROM waypoints WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.evictions += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, waypoints: Waypoints):
+        now = time.time()
+        waypoints = [tuple(p) for p in waypoints]
+        with self._lock:
+            self._remember(key, now, waypoints)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO waypoints VALUES (?, ?, ?, ?)",
+                    (key, now, now, json.dumps(waypoints)))
+                overflow = self._db.execute("SELECT COUNT(*) FROM waypoints").fetchone()[0] \
+                    - self.max_disk_entries
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM waypoints WHERE key IN ("
+                        "SELECT key FROM waypoints ORDER BY last_used LIMIT ?)", (overflow,))
+                    self.evictions += overflow
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, waypoints: Waypoints):
+        self._memory[key] = (created, waypoints)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM waypoints")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
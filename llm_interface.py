@@ -1,9 +1,18 @@
-import requests
-import json
 import ast
 import re
-from typing import Tuple, List
+import threading
+from typing import Dict, Tuple, List, Optional
 from grid_map import GridMap
+from instrumentation import Tracer
+from llm_cache import WaypointCache, cache_key, map_fingerprint
+from ollama_client import OllamaClient, get_default_client
+from prompt_compression import compress_map, estimate_tokens
+
+# Bump whenever format_repe_prompt or COST_RULES change so cached answers are not reused
+PROMPT_VERSION = 2
+
+# Default size limit for prompts built by get_llm_waypoints (see prompt_compression)
+DEFAULT_PROMPT_TOKEN_BUDGET = 1500
 
 COST_RULES = """
 Map Cost Rules:
@@ -16,7 +25,13 @@ Map Cost Rules:
 
 def format_repe_prompt(start: Tuple[int, int], goal: Tuple[int, int],
                        horizontal_barriers: List[List[int]],
-                       vertical_barriers: List[List[int]]) -> str:
+                       vertical_barriers: List[List[int]],
+                       map_description: Optional[str] = None) -> str:
+    # A map_description (e.g. HierarchicalMap.describe) replaces the raw barrier lists
+    if map_description is not None:
+        map_text = f"Map Layout:\n{map_description}"
+    else:
+        map_text = f"Horizontal Barriers: {horizontal_barriers}\nVertical Barriers: {vertical_barriers}"
     return f"""
 {COST_RULES}
 
@@ -35,8 +50,7 @@ Generated Path:
 
 Start Point: {list(start)}
 Goal Point: {list(goal)}
-Horizontal Barriers: {horizontal_barriers}
-Vertical Barriers: {vertical_barriers}
+{map_text}
 
 Remember:
 - Max 10 waypoints.
@@ -44,31 +58,40 @@ Remember:
 - Avoid collisions.
 """
 
-def ask_ollama(prompt: str, model: str = "mistral", timeout: int = 30) -> str:
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "stream": False
-    }
+def ask_ollama(prompt: str, model: str = "mistral", timeout: int = 30,
+               stream: bool = False,
+               client: Optional[OllamaClient] = None,
+               cancel: Optional[threading.Event] = None,
+               options: Optional[Dict] = None,
+               tracer: Optional[Tracer] = None) -> str:
+    """
+    Query Ollama through a pooled client (the shared default one unless given).
+    With `stream=True`, generation stops as soon as a complete waypoint list
+    has been parsed from the partial answer, or when `cancel` is set.
+    `options` are Ollama model options such as {"temperature": 0.7}.
+    Errors are reported through `tracer.log` (printed without a tracer).
+    """
+    tracer = tracer if tracer is not None else Tracer()
+    client = client if client is not None else get_default_client()
+    extra = {"options": options} if options else {}
     try:
-        response = requests.post(url, json=payload, timeout=timeout)
-        lines = response.text.strip().split("\n")
-        full_response = ""
-        for line in lines:
-            data = json.loads(line)
-            full_response += data.get("response", "")
-        return full_response
+        if stream:
+            parser = IncrementalWaypointParser(tracer)
+            return client.generate(prompt, model=model, stream=True, timeout=timeout,
+                                   stop_when=parser.feed, cancel=cancel, **extra)
+        return client.generate(prompt, model=model, timeout=timeout, **extra)
     except Exception as e:
-        print(f"❌ Ollama error: {e}")
+        tracer.log(f"❌ Ollama error: {e}")
         return ""
 
-def extract_waypoints_from_response(response: str) -> List[Tuple[int, int]]:
+def extract_waypoints_from_response(response: str, tracer: Optional[Tracer] = None) -> List[Tuple[int, int]]:
     """
     Try to extract a path using multiple strategies:
     1. JSON-style list [[x, y], ...]
     2. Bulleted list: - [x, y]
+    Problems are reported through `tracer.log` (printed without a tracer).
     """
+    log = tracer.log if tracer is not None else print
     # Primary: JSON-style list extraction
     match = re.search(r"Generated Path[:：]?\s*(\[\[.*?\]\])", response, re.DOTALL)
     if match:
@@ -83,11 +106,11 @@ def extract_waypoints_from_response(response: str) -> List[Tuple[int, int]]:
                         y = int(p[1])
                         result.append((x, y))
                     except Exception as e:
-                        print(f"❌ Conversion error: {e} for {p}")
+                        log(f"❌ Conversion error: {e} for {p}")
             if result:
                 return result
         except Exception as e:
-            print(f"❌ Error parsing structured list: {e}")
+            log(f"❌ Error parsing structured list: {e}")
 
     # Fallback: Bulleted format extraction
     bullets = re.findall(r"-\s*\[?(\d+),\s*(\d+)\]?", response)
@@ -99,9 +122,45 @@ def extract_waypoints_from_response(response: str) -> List[Tuple[int, int]]:
     if loose:
         return [(int(x), int(y)) for x, y in loose]
 
-    print("❌ No valid waypoints extracted.")
+    log("❌ No valid waypoints extracted.")
     return []
 
+class IncrementalWaypointParser:
+    """
+    Feed streamed response chunks; `feed` returns the waypoints once a complete
+    `Generated Path` list is available, and None until then.
+    A JSON-style list is complete at its closing `]]`; a bulleted list is
+    complete at the first full non-bullet line after its bullets.
+    Parse problems go to `tracer.log` (printed without a tracer).
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer
+        self.text = ""
+        self.waypoints: Optional[List[Tuple[int, int]]] = None
+
+    def feed(self, chunk: str) -> Optional[List[Tuple[int, int]]]:
+        self.text += chunk
+        if self.waypoints is None and ("]" in chunk or "\n" in chunk) and self._complete():
+            self.waypoints = extract_waypoints_from_response(self.text, self.tracer) or None
+        return self.waypoints
+
+    def _complete(self) -> bool:
+        header = re.search(r"Generated Path[:：]?", self.text)
+        if not header:
+            return False
+        body = self.text[header.end():]
+        if re.match(r"\s*\[\[.*?\]\]", body, re.DOTALL):
+            return True
+        lines = body.split("\n")[:-1]  # only lines that have been fully received
+        seen_bullet = False
+        for line in lines:
+            if re.match(r"\s*-\s*\[?\d+,\s*\d+\]?", line):
+                seen_bullet = True
+            elif seen_bullet:
+                return True
+        return False
+
 def filter_waypoints(waypoints: List[Tuple[int, int]],
                      start: Tuple[int, int],
                      goal: Tuple[int, int],
@@ -124,17 +183,78 @@ def get_llm_waypoints(start: Tuple[int, int], goal: Tuple[int, int],
                       horizontal_barriers: List[List[int]],
                       vertical_barriers: List[List[int]],
                       grid: GridMap,
-                      model: str = "mistral") -> List[Tuple[int, int]]:
-    prompt = format_repe_prompt(start, goal, horizontal_barriers, vertical_barriers)
-    print("📤 Sending prompt to LLM...")
-    response = ask_ollama(prompt, model=model)
-    print("🧠 Mistral Response:\n", response)
-    raw_waypoints = extract_waypoints_from_response(response)
-    valid_waypoints = filter_waypoints(raw_waypoints, start, goal, grid)
+                      model: str = "mistral",
+                      cache: Optional[WaypointCache] = None,
+                      client: Optional[OllamaClient] = None,
+                      stream: bool = False,
+                      cancel: Optional[threading.Event] = None,
+                      map_description: Optional[str] = None,
+                      token_budget: Optional[int] = DEFAULT_PROMPT_TOKEN_BUDGET,
+                      stats: Optional[Dict] = None,
+                      temperature: Optional[float] = None,
+                      tracer: Optional[Tracer] = None) -> List[Tuple[int, int]]:
+    """
+    Ask the LLM for waypoints between start and goal.
+
+    Unless a `map_description` is given, the map is described by obstacle
+    rectangles compressed to fit `token_budget` tokens for the whole prompt
+    (token_budget=None sends the raw barrier lists instead). If a `stats` dict
+    is given it receives prompt_tokens, the estimated size of the prompt sent
+    (0 on a cache hit). `temperature` overrides the model's sampling temperature.
+    A `tracer` times the prompt_build, cache_lookup, llm_call, parse and validate
+    stages, counts llm_calls and cache_hits, and takes over (or silences) logging.
+    """
+    if stats is None:
+        stats = {}
+    if tracer is None:
+        tracer = Tracer()
+    log = tracer.log
+    stats["prompt_tokens"] = 0
+    options = None if temperature is None else {"temperature": temperature}
+    if map_description is None and token_budget is not None:
+        with tracer.stage("prompt_build"):
+            base_tokens = estimate_tokens(format_repe_prompt(start, goal, [], [], ""))
+            compressed = compress_map(grid, start, goal, token_budget - base_tokens)
+            map_description = compressed.description
+        log(f"📏 Map encoded as {len(compressed.rectangles)} rectangles "
+            f"(region {compressed.region}, scale {compressed.scale}, ~{compressed.tokens} tokens)")
+
+    key = None
+    raw_waypoints = None
+    if cache is not None:
+        with tracer.stage("cache_lookup"):
+            fingerprint = map_fingerprint(grid, horizontal_barriers, vertical_barriers, map_description)
+            key = cache_key(fingerprint, start, goal, model, PROMPT_VERSION, options)
+            raw_waypoints = cache.get(key)
+        if raw_waypoints is not None:
+            tracer.count("cache_hits")
+            log(f"💾 Cache hit — reusing {len(raw_waypoints)} LLM waypoints")
+
+    if raw_waypoints is None:
+        with tracer.stage("prompt_build"):
+            prompt = format_repe_prompt(start, goal, horizontal_barriers, vertical_barriers,
+                                        map_description)
+            stats["prompt_tokens"] = estimate_tokens(prompt)
+        log(f"📤 Sending prompt to LLM (~{stats['prompt_tokens']} tokens)...")
+        with tracer.stage("llm_call", model=model, temperature=temperature,
+                          prompt_tokens=stats["prompt_tokens"]):
+            response = ask_ollama(prompt, model=model, stream=stream, client=client,
+                                  cancel=cancel, options=options, tracer=tracer)
+        tracer.count("llm_calls")
+        tracer.count("prompt_tokens", stats["prompt_tokens"])
+        log("🧠 Mistral Response:\n", response)
+        with tracer.stage("parse") as parsed:
+            raw_waypoints = extract_waypoints_from_response(response, tracer)
+            parsed["waypoints"] = len(raw_waypoints)
+        if cache is not None and raw_waypoints:
+            cache.put(key, raw_waypoints)
+
+    with tracer.stage("validate"):
+        valid_waypoints = filter_waypoints(raw_waypoints, start, goal, grid)
     if not valid_waypoints:
-        print("⚠️ No usable waypoints — defaulting to A*")
+        log("⚠️ No usable waypoints — defaulting to A*")
     else:
-        print(f"✅ Parsed {len(valid_waypoints)} LLM waypoints")
+        log(f"✅ Parsed {len(valid_waypoints)} LLM waypoints")
     return valid_waypoints
 
 # Optional test stub
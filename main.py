@@ -1,11 +1,12 @@
 import cv2
 import time
-import numpy as np
 import matplotlib.pyplot as plt
-from typing import Tuple, List
-from grid_map import GridMap
-from a_star import a_star_search
+from typing import Tuple, List, Optional
+from grid_map import GridMap, image_to_occupancy
+from a_star import get_search_engine
 from llm_astar import llm_astar
+from instrumentation import Tracer
+from rendering import draw_occupancy
 from matplotlib.animation import FuncAnimation
 from matplotlib.backend_bases import MouseEvent
 from pathlib import Path
@@ -13,20 +14,17 @@ from pathlib import Path
 # -------------------------
 # Maze image loader
 # -------------------------
-def load_maze_from_image(image_path: str, threshold: int = 127) -> GridMap:
+def load_maze_from_image(image_path: str, threshold: int = 127,
+                         derive_barriers: bool = False) -> GridMap:
     img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
     if img is None:
         raise FileNotFoundError(f"❌ Could not load image: {image_path}")
-    if img.shape[0] > 100 or img.shape[1] > 100:
-        img = cv2.resize(img, (40, 40), interpolation=cv2.INTER_NEAREST)
-    _, binary = cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY)
-    binary = (binary == 0).astype(np.uint8)
-    h, w = binary.shape
-    gmap = GridMap((0, w), (0, h))
-    for y in range(h):
-        for x in range(w):
-            if binary[y, x] == 1:
-                gmap.set_occupied(x, h - y - 1)
+    size = (40, 40) if img.shape[0] > 100 or img.shape[1] > 100 else None
+    # Pixels at or below `threshold` are walls
+    occupancy = image_to_occupancy(img, threshold + 1, size=size)
+    gmap = GridMap.from_occupancy(occupancy, copy=False)
+    if derive_barriers:
+        gmap.derive_barriers()
     return gmap
 
 # -------------------------
@@ -48,17 +46,13 @@ def select_points_interactively(grid: GridMap) -> Tuple[Tuple[int, int], Tuple[i
             plt.close()
 
     fig, ax = plt.subplots(figsize=(8, 8))
+    draw_occupancy(ax, grid)
     ax.set_xlim(grid.x_min, grid.x_max)
     ax.set_ylim(grid.y_min, grid.y_max)
     ax.set_aspect('equal')
     ax.set_title("🖱️ Click Start (Green) and Goal (Red)")
     ax.grid(True)
 
-    for x in range(grid.x_min, grid.x_max):
-        for y in range(grid.y_min, grid.y_max):
-            if grid.is_occupied(x, y):
-                ax.add_patch(plt.Rectangle((x, y), 1, 1, color='black'))
-
     cid = fig.canvas.mpl_connect('button_press_event', onclick)
     plt.show()
     fig.canvas.mpl_disconnect(cid)
@@ -81,16 +75,13 @@ def animate_dual_paths(grid: GridMap,
     fig.suptitle("Simultaneous A* vs LLM-A* Path Simulation")
 
     for ax in axs:
+        draw_occupancy(ax, grid)
         ax.set_xlim(grid.x_min, grid.x_max)
         ax.set_ylim(grid.y_min, grid.y_max)
         ax.set_aspect('equal')
         ax.grid(True)
         ax.plot(start[0] + 0.5, start[1] + 0.5, 'go', label="Start", markersize=8)
         ax.plot(goal[0] + 0.5, goal[1] + 0.5, 'ro', label="Goal", markersize=8)
-        for x in range(grid.x_min, grid.x_max):
-            for y in range(grid.y_min, grid.y_max):
-                if grid.is_occupied(x, y):
-                    ax.add_patch(plt.Rectangle((x, y), 1, 1, color='black'))
         ax.legend(loc="upper left")
 
     # Show full paths
@@ -138,16 +129,25 @@ def animate_dual_paths(grid: GridMap,
 def compare_astar_vs_llmastar(grid: GridMap,
                                start: Tuple[int, int],
                                goal: Tuple[int, int],
-                               model: str = "mistral"):
-
-    print("\n🔵 Running baseline A*...")
+                               model: str = "mistral",
+                               engine: str = "classic",
+                               diagonal: bool = False,
+                               quiet: bool = False,
+                               metrics_path: Optional[str] = None):
+    # quiet=True drops the progress output (only the summary is printed); metrics_path saves
+    # the stage timings as JSON
+    search = get_search_engine(engine)
+    tracer = Tracer(quiet=quiet)
+
+    tracer.log("\n🔵 Running baseline A*...")
     t0 = time.time()
-    pure_path, pure_nodes = a_star_search(grid, start, goal)
+    pure_path, pure_nodes = search(grid, start, goal, diagonal=diagonal)
     t1 = time.time()
 
-    print("\n🟡 Running LLM-A*...")
+    tracer.log("\n🟡 Running LLM-A*...")
     t2 = time.time()
-    llm_path, waypoints = llm_astar(grid, start, goal, model=model)
+    llm_path, waypoints = llm_astar(grid, start, goal, model=model, engine=engine,
+                                     diagonal=diagonal, tracer=tracer)
     t3 = time.time()
 
     print("\n📊 Comparison Summary:")
@@ -165,6 +165,12 @@ def compare_astar_vs_llmastar(grid: GridMap,
     else:
         print("❌ LLM-A* failed to find a path.")
 
+    for name, timing in tracer.metrics()["timings"].items():
+        print(f"   {name:18s} {timing['seconds']:.3f}s ({timing['calls']}x)")
+    if metrics_path is not None:
+        tracer.export_json(metrics_path)
+        print(f"📝 Metrics written to {metrics_path}")
+
     if pure_path or llm_path:
         animate_dual_paths(grid, pure_path, llm_path, start, goal)
 
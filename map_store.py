@@ -0,0 +1,75 @@
+"""
+Binary map files that open near-instantly with np.memmap.
+
+Layout: a 64-byte header (magic, format version, x_min, x_max, y_min, y_max
+as little-endian int64), followed by the bit-packed occupancy of a
+PackedGridMap (width rows of ceil(height / 8) bytes). Opening a map only
+maps the file, and worker processes that open the same file read-only share
+its pages.
+
+Example:
+    python map_store.py maze.png maze.map
+"""
+import argparse
+import os
+import struct
+from typing import List, Optional
+import numpy as np
+from grid_map import GridMap, PackedGridMap
+
+MAGIC = b"LLMAMAP\0"
+FORMAT_VERSION = 1
+HEADER_BYTES = 64
+_HEADER = struct.Struct("<8s5q")
+
+
+def save_map(grid: GridMap, path: str):
+    """Write any GridMap in the binary map format."""
+    if isinstance(grid, PackedGridMap):
+        bits = grid.bits
+    else:
+        bits = np.packbits(grid.grid != 0, axis=1)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, grid.x_min, grid.x_max, grid.y_min, grid.y_max)
+    with open(path, "wb") as f:
+        f.write(header.ljust(HEADER_BYTES, b"\0"))
+        f.write(np.ascontiguousarray(bits).tobytes())
+
+
+def open_map(path: str, mode: str = "r") -> PackedGridMap:
+    """
+    Memory-map a map file as a PackedGridMap.
+    `mode` is np.memmap's: "r" read-only (edits raise), "c" copy-on-write
+    (edits stay private to this process), "r+" edits are written to the file.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_BYTES)
+    if len(header) < HEADER_BYTES:
+        raise ValueError(f"Not a map file: {path}")
+    magic, version, x_min, x_max, y_min, y_max = _HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError(f"Not a map file: {path}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported map format version {version} in {path}")
+    width, height = x_max - x_min, y_max - y_min
+    shape = (width, (height + 7) // 8)
+    if os.path.getsize(path) != HEADER_BYTES + shape[0] * shape[1]:
+        raise ValueError(f"Truncated map file: {path}")
+    bits = np.memmap(path, dtype=np.uint8, mode=mode, offset=HEADER_BYTES, shape=shape)
+    return PackedGridMap.from_bits(bits, height, x_min, y_min)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Convert a maze image to a memory-mappable map file")
+    parser.add_argument("image", help="maze image (dark pixels are walls)")
+    parser.add_argument("output", help="map file to write")
+    parser.add_argument("--threshold", type=int, default=128)
+    args = parser.parse_args(argv)
+
+    grid = PackedGridMap.from_image(args.image, threshold=args.threshold)
+    save_map(grid, args.output)
+    print(f"💾 Saved {grid.width}x{grid.height} map ({grid.nbytes / 1024:.1f} KB packed, "
+          f"{grid.width * grid.height / 1024:.1f} KB as int8) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+from typing import Callable, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+class OllamaClient:
+    """
+    Ollama /api/generate client that keeps one pooled HTTP session.
+
+    In streaming mode the response is read chunk by chunk and handed to
+    `stop_when` (e.g. IncrementalWaypointParser.feed); as soon as it returns
+    something truthy the connection is closed, which makes Ollama abort the
+    rest of the generation. A `cancel` event aborts the stream the same way.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_OLLAMA_URL, timeout: float = 30,
+                 pool_size: int = 8):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt: str, model: str = "mistral",
+                 stream: bool = False,
+                 options: Optional[Dict] = None,
+                 timeout: Optional[float] = None,
+                 stop_when: Optional[Callable[[str], object]] = None,
+                 cancel: Optional[threading.Event] = None) -> str:
+        payload = {"model": model, "prompt": prompt, "stream": stream}
+        if options:
+            payload["options"] = options
+        timeout = self.timeout if timeout is None else timeout
+        url = f"{self.base_url}/api/generate"
+
+        if not stream:
+            response = self.session.post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            return "".join(json.loads(line).get("response", "")
+                           for line in response.text.strip().split("\n") if line)
+
+        chunks: List[str] = []
+        with self.session.post(url, json=payload, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    break
+                if not line:
+                    continue
+                data = json.loads(line)
+                chunk = data.get("response", "")
+                chunks.append(chunk)
+                if data.get("done"):
+                    break
+                if stop_when is not None and chunk and stop_when(chunk):
+                    break
+        return "".join(chunks)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOllamaClient:
+    """
+    asyncio front end for OllamaClient.
+
+    Requests run on worker threads over the shared connection pool, and at
+    most `max_concurrency` of them are in flight at once.
+    """
+
+    def __init__(self, client: Optional[OllamaClient] = None, max_concurrency: int = 4):
+        self.client = client if client is not None else OllamaClient(pool_size=max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(self, prompt: str, model: str = "mistral", **kwargs) -> str:
+        async with self._semaphore:
+            return await asyncio.to_thread(self.client.generate, prompt, model, **kwargs)
+
+    async def generate_many(self, prompts: List[str], model: str = "mistral",
+                            **kwargs) -> List[str]:
+        return await asyncio.gather(*(self.generate(p, model, **kwargs) for p in prompts))
+
+
+_default_client: Optional[OllamaClient] = None
+
+
+def get_default_client() -> OllamaClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = OllamaClient()
+    return _default_client
@@ -0,0 +1,125 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+DEFAULT_RESPONSE = "Generated Path: [[5, 5], [10, 10]]\nThis path avoids the barriers."
+
+
+class StubOllamaServer:
+    """
+    Minimal stand-in for Ollama's /api/generate, for local runs without a model.
+
+    `responder(prompt, model)` produces the full answer text. Streaming
+    requests receive it as NDJSON chunks of `chunk_size` characters, sent
+    `chunk_delay` seconds apart; streams the client hangs up on are counted
+    in `aborted`, and accepted TCP connections in `connections`.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 responder: Optional[Callable[[str, str], str]] = None,
+                 latency: float = 0.0, chunk_size: int = 4, chunk_delay: float = 0.0):
+        self.responder = responder or (lambda prompt, model: DEFAULT_RESPONSE)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.aborted = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive + chunked streaming
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                text = stub.responder(body.get("prompt", ""), body.get("model", ""))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                if not body.get("stream", True):
+                    payload = json.dumps({"response": text, "done": True}).encode()
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i in range(0, len(text), stub.chunk_size):
+                        self._write_chunk({"response": text[i:i + stub.chunk_size], "done": False})
+                        if stub.chunk_delay:
+                            time.sleep(stub.chunk_delay)
+                    self._write_chunk({"response": "", "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with stub._lock:
+                        stub.aborted += 1
+
+            def _write_chunk(self, data):
+                line = json.dumps(data).encode() + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned LLM answers on an Ollama-style API")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--response", default=DEFAULT_RESPONSE)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubOllamaServer(port=args.port, responder=lambda p, m: args.response,
+                              latency=args.latency, chunk_delay=args.chunk_delay)
+    print(f"🧪 Stub Ollama listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,240 @@
+"""
+Path cache for repeated queries on a map that rarely changes.
+
+Three tiers answer a (start, goal) query without searching:
+
+  paths     memoized optimal paths, usable in both directions
+  subpaths  any two cells on a cached path are joined optimally by the slice
+            between them (subpaths of shortest paths are shortest paths)
+  trees     full cost fields (distance_field.dijkstra_field) from popular
+            endpoints: a path to or from such a source is traced back through the field
+
+Trees count steps, so they are skipped while the grid has a cost layer
+(GridMap.costs); the path tiers only replay what the wrapped search returned.
+Paths and trees are evicted least recently used first. Every call compares the
+grid's version with the one the cache was filled for, so any edit
+(set_occupied, set_free, load_from_image, ...) empties the cache.
+
+Example:
+    cache = PathCache(grid)
+    path, explored = cache.find_path(start, goal)      # searches, then remembers
+    search = cache.cached(search)                      # wrap any engine callable
+"""
+from collections import Counter, OrderedDict
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+from a_star import SearchContext, array_a_star_search
+from anytime import ara_star_search
+from distance_field import dijkstra_field, padded_free_mask, trace_path
+
+Path = List[Tuple[int, int]]
+
+
+class PathCache:
+    """
+    LRU cache of optimal paths and search trees for one GridMap.
+
+    `diagonal` must match the searches whose results are stored. At most
+    `max_paths` paths totalling `max_cells` cells and `max_trees` distance
+    fields are kept. An endpoint becomes a tree source after `tree_threshold`
+    cache misses involving it (max_trees=0 disables trees; so does a cost layer).
+    Misses default to the array engine, or to ARA* on a map with a cost layer.
+    """
+
+    def __init__(self, grid: GridMap,
+                 diagonal: bool = False,
+                 max_paths: int = 1024,
+                 max_cells: int = 1_000_000,
+                 max_trees: int = 8,
+                 tree_threshold: int = 4):
+        self.grid = grid
+        self.diagonal = diagonal
+        self.max_paths = max_paths
+        self.max_cells = max_cells
+        self.max_trees = max_trees
+        self.tree_threshold = tree_threshold
+        self._paths: "OrderedDict[Tuple, Path]" = OrderedDict()
+        self._positions: Dict[Tuple, Dict[Tuple[int, int], int]] = {}
+        self._on_path: Dict[Tuple[int, int], Dict[Tuple, int]] = {}  # cell -> {path key: index}
+        self._trees: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+        self._popularity: Counter = Counter()
+        self._free: Optional[np.ndarray] = None  # padded free mask shared by the trees
+        self._cells = 0
+        self._grid_key = (id(grid.grid), grid.version)
+        self._context: Optional[SearchContext] = None
+        self.hits = 0
+        self.subpath_hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def clear(self):
+        self._paths.clear()
+        self._positions.clear()
+        self._on_path.clear()
+        self._trees.clear()
+        self._popularity.clear()
+        self._free = None
+        self._cells = 0
+
+    def _check_version(self):
+        key = (id(self.grid.grid), self.grid.version)
+        if key != self._grid_key:
+            self.clear()
+            self._grid_key = key
+            self.invalidations += 1
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+    def lookup(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Path]:
+        """Cached optimal path from start to goal, or None if no tier can answer."""
+        self._check_version()
+        if start == goal:
+            return [start]
+        for key, backwards in (((start, goal), False), ((goal, start), True)):
+            path = self._paths.get(key)
+            if path is not None:
+                self._paths.move_to_end(key)
+                self.hits += 1
+                return path[::-1] if backwards else list(path)
+
+        path = self._subpath(start, goal)
+        if path is not None:
+            self.subpath_hits += 1
+            return path
+
+        if self.grid.costs is not None:
+            return None
+        for source, target, backwards in ((start, goal, False), (goal, start, True)):
+            field = self._trees.get(source)
+            if field is not None:
+                path = trace_path(self.grid, field, target, self.diagonal, self._free)
+                if path is not None:
+                    self._trees.move_to_end(source)
+                    self.tree_hits += 1
+                    return path[::-1] if backwards else path
+        return None
+
+    def _subpath(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Path]:
+        via_start, via_goal = self._on_path.get(start), self._on_path.get(goal)
+        if not via_start or not via_goal:
+            return None
+        if len(via_goal) < len(via_start):
+            via_start, via_goal = via_goal, via_start
+            start, goal = goal, start
+            flip = True
+        else:
+            flip = False
+        for key, i in via_start.items():
+            j = via_goal.get(key)
+            if j is None:
+                continue
+            path = self._paths[key]
+            self._paths.move_to_end(key)
+            segment = path[i:j + 1] if i <= j else path[j:i + 1][::-1]
+            return segment[::-1] if flip else segment
+        return None
+
+    # -------------------------
+    # Storage
+    # -------------------------
+    def store(self, start: Tuple[int, int], goal: Tuple[int, int], path: Optional[Path]):
+        """Remember an optimal path from start to goal (failed searches are not stored)."""
+        self._check_version()
+        if not path or len(path) > self.max_cells or (start, goal) in self._paths:
+            return
+        key = (start, goal)
+        path = [tuple(cell) for cell in path]
+        positions = {}
+        for i, cell in enumerate(path):
+            positions.setdefault(cell, i)
+            self._on_path.setdefault(cell, {}).setdefault(key, i)
+        self._paths[key] = path
+        self._positions[key] = positions
+        self._cells += len(path)
+        while len(self._paths) > self.max_paths or self._cells > self.max_cells:
+            self._evict_path()
+
+    def _evict_path(self):
+        key, path = self._paths.popitem(last=False)
+        for cell in self._positions.pop(key):
+            entries = self._on_path[cell]
+            entries.pop(key, None)
+            if not entries:
+                del self._on_path[cell]
+        self._cells -= len(path)
+        self.evictions += 1
+
+    def add_tree(self, source: Tuple[int, int]):
+        """Expand a full search tree from `source` so every query to or from it is a lookup."""
+        self._check_version()
+        if self.max_trees <= 0 or self.grid.costs is not None or source in self._trees:
+            return
+        if self._free is None:
+            self._free = padded_free_mask(self.grid)
+        self._trees[source] = dijkstra_field(self.grid, source, diagonal=self.diagonal, free=self._free)
+        while len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+            self.evictions += 1
+
+    # -------------------------
+    # Search front ends
+    # -------------------------
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int],
+                  search: Optional[Callable] = None) -> Tuple[Optional[Path], int]:
+        """
+        Like the search engines: (path, explored_nodes), with 0 nodes on a cache hit.
+        Misses run `search(grid, start, goal)` (default: the array engine with a
+        private SearchContext, or ara_star_search under a cost layer) and store its result.
+        """
+        path = self.lookup(start, goal)
+        if path is not None:
+            return path, 0
+        if not self.grid.is_reachable(start, goal):
+            return None, 0
+        self.misses += 1
+        if self.max_trees > 0 and self.grid.costs is None:
+            self._popularity.update((start, goal))
+            for endpoint in (start, goal):
+                if self._popularity[endpoint] >= self.tree_threshold:
+                    del self._popularity[endpoint]
+                    self.add_tree(endpoint)
+                    path = self.lookup(start, goal)
+                    if path is not None:
+                        return path, 0
+            if len(self._popularity) > 4 * self.max_paths:
+                self._popularity.clear()  # keep the counter bounded; hot endpoints come back fast
+        if search is None and self.grid.costs is not None:
+            search = partial(ara_star_search, diagonal=self.diagonal)
+        elif search is None:
+            if self._context is None:
+                self._context = SearchContext(self.grid)
+            search = partial(array_a_star_search, context=self._context, diagonal=self.diagonal)
+        path, explored = search(self.grid, start, goal)
+        self.store(start, goal, path)
+        return path, explored
+
+    def cached(self, search: Callable) -> Callable:
+        """Wrap a search(grid, start, goal) callable so it goes through this cache."""
+        def cached_search(grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int]):
+            if grid is not self.grid:
+                return search(grid, start, goal)
+            return self.find_path(start, goal, search)
+        return cached_search
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "subpath_hits": self.subpath_hits,
+            "tree_hits": self.tree_hits,
+            "misses": self.misses,
+            "paths": len(self._paths),
+            "cells": self._cells,
+            "trees": len(self._trees),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
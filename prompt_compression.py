@@ -0,0 +1,136 @@
+"""
+Token-budgeted map descriptions for the LLM prompt.
+
+The occupancy grid is encoded as obstacle rectangles: wall runs along y are
+merged across neighbouring columns. If the rectangles do not fit the token
+budget, the map is cropped to a corridor around START and GOAL (then to
+their exact bounding box), and finally coarsened in powers of two until it
+fits: each k x k block counts as a wall if any of its cells is a wall, so
+thin maze walls are never erased (narrow gaps may close instead). The prompt
+size therefore follows the complexity of the route region rather than the
+size of the map.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import List, Tuple
+import numpy as np
+from grid_map import GridMap, find_runs
+
+# Rough tokenizer ratio for number-heavy prompt text
+CHARS_PER_TOKEN = 3.0
+# Corridor margin around the start-goal box: a fraction of its span, at least MIN_CORRIDOR_MARGIN cells
+CORRIDOR_MARGIN = 0.25
+MIN_CORRIDOR_MARGIN = 8
+# Shortest possible rendering of one rectangle, "[0, 0, 0, 0], "
+MIN_RECT_CHARS = 14
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer dependency)."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def merge_rectangles(occupied: np.ndarray) -> np.ndarray:
+    """
+    Cover the True cells of an [x, y] mask with rectangles (x0, y0, x1, y1), inclusive.
+    Runs along y become rectangles, and identical runs in consecutive columns merge.
+    """
+    xs, y0, y1 = find_runs(occupied)
+    if not len(xs):
+        return np.zeros((0, 4), dtype=np.int64)
+    order = np.lexsort((xs, y1, y0))
+    xs, y0, y1 = xs[order], y0[order], y1[order]
+    new = np.ones(len(xs), dtype=bool)
+    new[1:] = (y0[1:] != y0[:-1]) | (y1[1:] != y1[:-1]) | (xs[1:] != xs[:-1] + 1)
+    firsts = np.flatnonzero(new)
+    lasts = np.append(firsts[1:], len(xs)) - 1
+    rects = np.column_stack([xs[firsts], y0[firsts], xs[lasts], y1[lasts]])
+    return rects[np.lexsort((rects[:, 1], rects[:, 0]))]
+
+
+def coarsen(occupied: np.ndarray, scale: int) -> np.ndarray:
+    """Downsample an [x, y] mask by `scale`; a block is a wall if any of its cells is."""
+    if scale == 1:
+        return occupied
+    width, height = occupied.shape
+    padded = np.zeros((-(-width // scale) * scale, -(-height // scale) * scale), dtype=bool)
+    padded[:width, :height] = occupied
+    blocks = padded.reshape(padded.shape[0] // scale, scale, padded.shape[1] // scale, scale)
+    return blocks.any(axis=(1, 3))
+
+
+def corridor(grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int],
+             margin_fraction: float = CORRIDOR_MARGIN,
+             min_margin: int = MIN_CORRIDOR_MARGIN) -> Tuple[int, int, int, int]:
+    """
+    Inclusive (x0, y0, x1, y1) box around start and goal, clipped to the map, with a
+    margin of `margin_fraction` of the box span but at least `min_margin` cells
+    (margin_fraction=0, min_margin=0 gives the bounding box).
+    """
+    span = max(abs(goal[0] - start[0]), abs(goal[1] - start[1]))
+    margin = max(min_margin, int(span * margin_fraction))
+    return (max(grid.x_min, min(start[0], goal[0]) - margin),
+            max(grid.y_min, min(start[1], goal[1]) - margin),
+            min(grid.x_max - 1, max(start[0], goal[0]) + margin),
+            min(grid.y_max - 1, max(start[1], goal[1]) + margin))
+
+
+@dataclass
+class CompressedMap:
+    description: str
+    tokens: int  # estimated tokens of `description`
+    region: Tuple[int, int, int, int]  # inclusive (x0, y0, x1, y1) described
+    scale: int = 1  # cells per block edge after coarsening
+    rectangles: List[List[int]] = field(default_factory=list)  # map coordinates, inclusive
+
+
+def _encode(grid: GridMap, region: Tuple[int, int, int, int], scale: int,
+            token_budget: float) -> Tuple[str, int, List[List[int]]]:
+    x0, y0, x1, y1 = region
+    occupied = grid.grid[x0 - grid.x_min:x1 - grid.x_min + 1, y0 - grid.y_min:y1 - grid.y_min + 1] != 0
+    rects = merge_rectangles(coarsen(occupied, scale))
+    lower_bound = math.ceil(len(rects) * MIN_RECT_CHARS / CHARS_PER_TOKEN)
+    if lower_bound > token_budget:
+        return "", lower_bound, []  # hopeless; skip rendering huge lists
+    # Block coordinates back to map coordinates, clipped to the region
+    rects = rects * scale + [x0, y0, x0 + scale - 1, y0 + scale - 1]
+    rects[:, 2] = np.minimum(rects[:, 2], x1)
+    rects[:, 3] = np.minimum(rects[:, 3], y1)
+
+    lines = []
+    if region != (grid.x_min, grid.y_min, grid.x_max - 1, grid.y_max - 1):
+        lines.append(f"Only the area x {x0}..{x1}, y {y0}..{y1} is shown; keep waypoints inside it.")
+    if scale > 1:
+        lines.append(f"Obstacles are approximated on {scale}x{scale} cell blocks "
+                     f"(a block with any obstacle cell is shown as an obstacle).")
+    lines.append(f"Obstacle Rectangles [x_min, y_min, x_max, y_max] (inclusive): {rects.tolist()}")
+    text = "\n".join(lines)
+    return text, estimate_tokens(text), rects.tolist()
+
+
+def compress_map(grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int],
+                 token_budget: int) -> CompressedMap:
+    """
+    Describe the obstacles in about `token_budget` tokens or fewer: the whole map
+    if it fits, else the start-goal corridor or bounding box, coarsened until it fits.
+    If even the coarsest box does not fit, that description is returned anyway.
+    """
+    regions = [(grid.x_min, grid.y_min, grid.x_max - 1, grid.y_max - 1),
+               corridor(grid, start, goal),
+               corridor(grid, start, goal, margin_fraction=0.0, min_margin=0)]
+    for region in dict.fromkeys(regions):
+        text, tokens, rects = _encode(grid, region, 1, token_budget)
+        if tokens <= token_budget:
+            return CompressedMap(text, tokens, region, 1, rects)
+
+    longest = max(region[2] - region[0], region[3] - region[1]) + 1
+    scale = 2
+    while True:
+        text, tokens, rects = _encode(grid, region, scale, token_budget)
+        if tokens <= token_budget:
+            return CompressedMap(text, tokens, region, scale, rects)
+        if scale * 2 >= longest:
+            if not text:
+                text, tokens, rects = _encode(grid, region, scale, math.inf)
+            return CompressedMap(text, tokens, region, scale, rects)
+        scale *= 2
@@ -0,0 +1,255 @@
+"""
+Headless rendering of maps, paths and waypoints.
+
+The occupancy grid is drawn as one raster (one pixel block per cell) instead
+of one matplotlib patch per occupied cell, and paths/waypoints are painted
+with fancy indexing. Nothing here needs a display: PNGs are written with
+OpenCV, GIFs with Pillow and MP4s with cv2.VideoWriter. For interactive
+figures, draw_occupancy puts the same raster on a matplotlib axis (imshow).
+
+Examples:
+    python rendering.py maze.png --queries 1000 --out-dir renders --workers 4
+    python rendering.py maze.png --start 1 1 --goal 39 39 --out route.gif
+"""
+import argparse
+import math
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from grid_map import GridMap
+
+Color = Tuple[int, int, int]
+
+# RGB
+FREE_COLOR: Color = (255, 255, 255)
+WALL_COLOR: Color = (0, 0, 0)
+PATH_COLORS: Tuple[Color, ...] = ((30, 110, 255), (200, 0, 200), (0, 170, 170))
+WAYPOINT_COLOR: Color = (255, 190, 0)
+START_COLOR: Color = (0, 170, 0)
+GOAL_COLOR: Color = (220, 0, 0)
+# Gap between side-by-side animation panels, in pixels
+PANEL_GAP = 4
+
+
+def occupancy_raster(grid: GridMap, scale: int = 4) -> np.ndarray:
+    """RGB image of the grid, `scale` pixels per cell, y pointing up (row 0 is y_max - 1)."""
+    occupied = (grid.grid != 0).T[::-1]
+    image = np.where(occupied[:, :, None], np.array(WALL_COLOR, dtype=np.uint8),
+                     np.array(FREE_COLOR, dtype=np.uint8))
+    if scale > 1:
+        image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+    return np.ascontiguousarray(image)
+
+
+def paint_cells(image: np.ndarray, grid: GridMap, cells: Sequence[Tuple[int, int]],
+                color: Color, scale: int = 4):
+    """Fill the pixel blocks of `cells` (map coordinates) in place; out-of-bounds cells are skipped."""
+    if len(cells) == 0:
+        return
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    cols = cells[:, 0] - grid.x_min
+    rows = grid.height - 1 - (cells[:, 1] - grid.y_min)
+    inside = (cols >= 0) & (cols < grid.width) & (rows >= 0) & (rows < grid.height)
+    offsets = np.arange(scale)
+    pixel_rows = (rows[inside, None] * scale + offsets)[:, :, None]
+    pixel_cols = (cols[inside, None] * scale + offsets)[:, None, :]
+    image[pixel_rows, pixel_cols] = color
+
+
+def render_query(grid: GridMap,
+                 start: Tuple[int, int],
+                 goal: Tuple[int, int],
+                 path: Optional[List[Tuple[int, int]]] = None,
+                 waypoints: Optional[List[Tuple[int, int]]] = None,
+                 scale: int = 4,
+                 base: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    RGB image of one query: path, waypoints, start and goal over the map.
+    Pass `base` (occupancy_raster of the same grid and scale) to skip redrawing the map.
+    """
+    image = (base if base is not None else occupancy_raster(grid, scale)).copy()
+    if path:
+        paint_cells(image, grid, path, PATH_COLORS[0], scale)
+    if waypoints:
+        paint_cells(image, grid, waypoints, WAYPOINT_COLOR, scale)
+    paint_cells(image, grid, [start], START_COLOR, scale)
+    paint_cells(image, grid, [goal], GOAL_COLOR, scale)
+    return image
+
+
+def save_image(image: np.ndarray, filename: str):
+    if not cv2.imwrite(filename, cv2.cvtColor(image, cv2.COLOR_RGB2BGR)):
+        raise RuntimeError(f"❌ Could not write image: {filename}")
+
+
+def _faded(color: Color) -> Color:
+    return tuple(int(c + (255 - c) * 0.6) for c in color)
+
+
+def animation_frames(grid: GridMap,
+                     start: Tuple[int, int],
+                     goal: Tuple[int, int],
+                     paths: Sequence[Optional[List[Tuple[int, int]]]],
+                     scale: int = 4,
+                     max_frames: int = 150,
+                     base: Optional[np.ndarray] = None) -> Iterator[np.ndarray]:
+    """
+    Frames of robots following each of `paths` at the same pace, one panel per
+    path side by side (e.g. A* and LLM-A*). Each panel shows its full path faded
+    and the trail covered so far. Long paths advance several cells per frame so
+    that at most `max_frames` frames are produced.
+    """
+    if base is None:
+        base = occupancy_raster(grid, scale)
+    panels = []
+    for i, path in enumerate(paths):
+        panel = render_query(grid, start, goal, scale=scale, base=base)
+        if path:
+            paint_cells(panel, grid, path, _faded(PATH_COLORS[i % len(PATH_COLORS)]), scale)
+        panels.append(panel)
+    paths = [path or [] for path in paths]
+    length = max((len(path) for path in paths), default=0)
+    step = max(1, math.ceil(length / max_frames))
+    gap = np.full((base.shape[0], PANEL_GAP, 3), 128, dtype=np.uint8)
+
+    drawn = 0
+    for end in list(range(step, length, step)) + [length]:
+        robots = []
+        for i, (panel, path) in enumerate(zip(panels, paths)):
+            # Trails only grow, so each frame paints just the cells added since the last one
+            paint_cells(panel, grid, path[drawn:end], PATH_COLORS[i % len(PATH_COLORS)], scale)
+            robots.append(path[min(end, len(path)) - 1] if path else None)
+        drawn = end
+        pieces = []
+        for panel, robot in zip(panels, robots):
+            frame_panel = panel.copy()
+            paint_cells(frame_panel, grid, [start], START_COLOR, scale)
+            paint_cells(frame_panel, grid, [goal], GOAL_COLOR, scale)
+            if robot is not None:
+                paint_cells(frame_panel, grid, [robot], WALL_COLOR, scale)
+            pieces.extend([frame_panel, gap])
+        yield np.concatenate(pieces[:-1], axis=1)
+
+
+def save_animation(frames: Iterable[np.ndarray], filename: str, fps: int = 10):
+    """Write frames as a GIF (Pillow) or as a video (cv2.VideoWriter, e.g. .mp4 or .avi)."""
+    if filename.lower().endswith(".gif"):
+        from PIL import Image
+        images = [Image.fromarray(frame).convert("P", palette=Image.Palette.ADAPTIVE) for frame in frames]
+        if not images:
+            raise ValueError("No frames to write")
+        images[0].save(filename, save_all=True, append_images=images[1:],
+                       duration=max(1, round(1000 / fps)), loop=0)
+        return
+    writer = None
+    try:
+        for frame in frames:
+            if writer is None:
+                fourcc = cv2.VideoWriter_fourcc(*("mp4v" if filename.lower().endswith(".mp4") else "MJPG"))
+                writer = cv2.VideoWriter(filename, fourcc, fps, (frame.shape[1], frame.shape[0]))
+                if not writer.isOpened():
+                    raise RuntimeError(f"❌ Could not open video writer for {filename}")
+            writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    finally:
+        if writer is not None:
+            writer.release()
+    if writer is None:
+        raise ValueError("No frames to write")
+
+
+def render_file(grid: GridMap,
+                filename: str,
+                start: Tuple[int, int],
+                goal: Tuple[int, int],
+                path: Optional[List[Tuple[int, int]]] = None,
+                waypoints: Optional[List[Tuple[int, int]]] = None,
+                scale: int = 4,
+                fps: int = 10,
+                base: Optional[np.ndarray] = None):
+    """Still image for .png (or any cv2 image format), animation for .gif/.mp4/.avi."""
+    if filename.lower().endswith((".gif", ".mp4", ".avi")):
+        save_animation(animation_frames(grid, start, goal, [path], scale, base=base), filename, fps)
+    else:
+        save_image(render_query(grid, start, goal, path, waypoints, scale, base), filename)
+
+
+def render_results(grid: GridMap,
+                   results: Iterable[Dict],
+                   out_dir: str,
+                   fmt: str = "png",
+                   scale: int = 4,
+                   fps: int = 10) -> List[str]:
+    """
+    Write one file per planning result (dicts with index, start, goal, path and
+    optionally waypoints, as yielded by batch.plan_many) to `out_dir`.
+    `fmt` is "png" for still images, or "gif"/"mp4" for animations.
+    The map raster is drawn once and shared by all results.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    base = occupancy_raster(grid, scale)
+    written = []
+    for result in results:
+        filename = os.path.join(out_dir, f"query_{result['index']:05d}.{fmt}")
+        render_file(grid, filename, tuple(result["start"]), tuple(result["goal"]), result.get("path"),
+                    result.get("waypoints"), scale, fps, base)
+        written.append(filename)
+    return written
+
+
+def draw_occupancy(ax, grid: GridMap, color: str = "black"):
+    """Draw the obstacles on a matplotlib axis as a single image (cell (x, y) covers [x, x+1] x [y, y+1])."""
+    from matplotlib.colors import ListedColormap
+    return ax.imshow((grid.grid != 0).T, cmap=ListedColormap(["white", color]), vmin=0, vmax=1,
+                     origin="lower", interpolation="nearest", zorder=0,
+                     extent=(grid.x_min, grid.x_max, grid.y_min, grid.y_max))
+
+
+def load_map(path: str) -> GridMap:
+    """A map file written by map_store.save_map, or a maze image."""
+    if path.endswith(".map"):
+        from map_store import open_map
+        return open_map(path)
+    return GridMap.from_image(path)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Plan queries on a map and render the results headlessly")
+    parser.add_argument("map", help="maze image (dark pixels are walls) or .map file")
+    parser.add_argument("--start", type=int, nargs=2, metavar=("X", "Y"))
+    parser.add_argument("--goal", type=int, nargs=2, metavar=("X", "Y"))
+    parser.add_argument("--out", help="output file for --start/--goal (.png, .gif or .mp4)")
+    parser.add_argument("--queries", type=int, default=10, help="random queries when no --start/--goal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="renders")
+    parser.add_argument("--format", choices=["png", "gif", "mp4"], default="png")
+    parser.add_argument("--planner", choices=["astar", "llm_astar"], default="astar")
+    parser.add_argument("--engine", default="array")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--scale", type=int, default=4, help="pixels per cell")
+    parser.add_argument("--fps", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    from batch import plan_many
+    grid = load_map(args.map)
+    if args.start and args.goal:
+        result = next(plan_many(grid, [(tuple(args.start), tuple(args.goal))], args.planner,
+                                engine=args.engine))
+        out = args.out or f"route.{args.format}"
+        render_file(grid, out, result["start"], result["goal"], result["path"], result["waypoints"],
+                    args.scale, args.fps)
+        print(f"🖼️ Wrote {out}")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    free = np.argwhere(grid.grid == 0) + [grid.x_min, grid.y_min]
+    queries = [tuple(tuple(int(v) for v in free[i]) for i in rng.integers(len(free), size=2))
+               for _ in range(args.queries)]
+    written = render_results(grid, plan_many(grid, queries, args.planner, workers=args.workers,
+                                             engine=args.engine),
+                             args.out_dir, args.format, args.scale, args.fps)
+    print(f"🖼️ Wrote {len(written)} {args.format} files to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Alternative grid planners sharing a_star_search's (path, explored_nodes) contract.
+
+- bidirectional_a_star_search: A* from both ends, meeting in the middle.
+- jps_search: Jump Point Search for uniform-cost grids. It expands only
+  jump points, so on open floors it skips the long runs of equal-f cells
+  that plain A* expands one by one. explored_nodes counts expanded jump points.
+
+Both support `diagonal=True` (8-connected, DIAGONAL_COST diagonals, no corner
+cutting) and a `cancel` event, like the engines in a_star.py.
+"""
+import heapq
+import threading
+from array import array
+from typing import List, Optional, Tuple
+from grid_map import GridMap
+from flat_grid import (CANCEL_CHECK_INTERVAL, flat_moves, from_flat, octile, padded_passable,
+                       reconstruct_flat_path, to_flat)
+
+Path = Optional[List[Tuple[int, int]]]
+
+
+def _manhattan(dx: float, dy: float) -> float:
+    return abs(dx) + abs(dy)
+
+
+# -------------------------
+# Bidirectional A*
+# -------------------------
+def bidirectional_a_star_search(grid: GridMap,
+                                start: Tuple[int, int],
+                                goal: Tuple[int, int],
+                                cancel: Optional[threading.Event] = None,
+                                diagonal: bool = False) -> Tuple[Path, int]:
+    """
+    Optimal bidirectional A*: the side with the smaller open set is expanded
+    next, and the search stops once either side's best f-value reaches the
+    cheapest meeting cost found so far.
+    """
+    if start == goal:
+        return [start], 0
+    if not grid.in_bounds(*start) or grid.is_occupied(*goal):
+        return None, 0
+
+    stride = grid.height + 2
+    passable = padded_passable(grid)
+    size = len(passable)
+    moves = flat_moves(stride, diagonal)
+    h = octile if diagonal else _manhattan
+    inf = float("inf")
+
+    source, target = to_flat(grid, start, stride), to_flat(grid, goal, stride)
+    # Index 0 is the forward search (towards goal), 1 the backward one (towards start)
+    ends = (divmod(target, stride), divmod(source, stride))
+    g_cost = (array('d', [inf]) * size, array('d', [inf]) * size)
+    parent = (array('q', [-1]) * size, array('q', [-1]) * size)
+    closed = (bytearray(size), bytearray(size))
+    open_sets: Tuple[List, List] = ([(0.0, source)], [(0.0, target)])
+    g_cost[0][source] = 0.0
+    g_cost[1][target] = 0.0
+
+    best, meeting = inf, -1
+    explored_nodes = 0
+    push, pop = heapq.heappush, heapq.heappop
+
+    while open_sets[0] and open_sets[1]:
+        for side in (0, 1):  # drop stale entries so the heap tops are live f-values
+            heap = open_sets[side]
+            while heap and closed[side][heap[0][1]]:
+                pop(heap)
+        if not open_sets[0] or not open_sets[1]:
+            break
+        if open_sets[0][0][0] >= best or open_sets[1][0][0] >= best:
+            break
+
+        side = 0 if len(open_sets[0]) <= len(open_sets[1]) else 1
+        _, current = pop(open_sets[side])
+        closed[side][current] = 1
+        explored_nodes += 1
+        if cancel is not None and explored_nodes % CANCEL_CHECK_INTERVAL == 0 and cancel.is_set():
+            return None, explored_nodes
+
+        g_side, g_other, parent_side = g_cost[side], g_cost[1 - side], parent[side]
+        ex, ey = ends[side]
+        for offset, step, side_a, side_b in moves:
+            neighbor = current + offset
+            if not passable[neighbor] or not passable[current + side_a] \
+                    or not passable[current + side_b]:
+                continue
+            tentative_g = g_side[current] + step
+            if tentative_g >= g_side[neighbor]:
+                continue
+            g_side[neighbor] = tentative_g
+            parent_side[neighbor] = current
+            if tentative_g + g_other[neighbor] < best:
+                best, meeting = tentative_g + g_other[neighbor], neighbor
+            nx, ny = divmod(neighbor, stride)
+            push(open_sets[side], (tentative_g + h(ex - nx, ey - ny), neighbor))
+
+    if meeting < 0:
+        return None, explored_nodes
+    forward = reconstruct_flat_path(grid, parent[0], meeting, stride)
+    backward = reconstruct_flat_path(grid, parent[1], meeting, stride)
+    return forward + backward[::-1][1:], explored_nodes
+
+
+# -------------------------
+# Jump Point Search
+# -------------------------
+class _JumpPointSearch:
+    """
+    Jump Point Search over the padded flat grid (the border is blocked, so
+    scans stop there without bounds checks).
+
+    8-connected (no corner cutting): diagonal scans spawn straight scans,
+    and straight scans stop where a side cell opens up (a forced neighbor).
+    4-connected: horizontal scans stop at forced neighbors; vertical scans
+    also stop wherever a horizontal sub-scan finds a jump point.
+    """
+
+    def __init__(self, grid: GridMap, target: int, diagonal: bool):
+        self.stride = grid.height + 2
+        self.passable = padded_passable(grid)
+        self.target = target
+        self.diagonal = diagonal
+
+    def straight(self, index: int, step: int, side: int) -> int:
+        """Scan from `index` along `step`; `side` is the perpendicular offset."""
+        passable, target = self.passable, self.target
+        while passable[index]:
+            if index == target:
+                return index
+            behind = index - step
+            if (passable[index + side] and not passable[behind + side]) or \
+                    (passable[index - side] and not passable[behind - side]):
+                return index
+            index += step
+        return -1
+
+    def vertical_4(self, index: int, step: int) -> int:
+        passable, stride = self.passable, self.stride
+        while passable[index]:
+            if index == self.target:
+                return index
+            behind = index - step
+            if (passable[index + stride] and not passable[behind + stride]) or \
+                    (passable[index - stride] and not passable[behind - stride]):
+                return index
+            if self.straight(index + stride, stride, 1) >= 0 or \
+                    self.straight(index - stride, -stride, 1) >= 0:
+                return index
+            index += step
+        return -1
+
+    def diagonal_8(self, index: int, step_x: int, step_y: int) -> int:
+        passable = self.passable
+        while passable[index]:
+            if index == self.target:
+                return index
+            if self.straight(index + step_x, step_x, 1) >= 0 or \
+                    self.straight(index + step_y, step_y, self.stride) >= 0:
+                return index
+            if not passable[index + step_x] or not passable[index + step_y]:
+                return -1  # the next diagonal step would cut a corner
+            index += step_x + step_y
+        return -1
+
+    def jump(self, index: int, step_x: int, step_y: int) -> int:
+        """Jump from `index` moving by (step_x, step_y); -1 if no jump point."""
+        if step_x and step_y:
+            return self.diagonal_8(index, step_x, step_y)
+        if step_x:
+            return self.straight(index, step_x, 1)
+        if self.diagonal:
+            return self.straight(index, step_y, self.stride)
+        return self.vertical_4(index, step_y)
+
+    def directions(self, current: int, came_from: int) -> List[Tuple[int, int]]:
+        """Pruned (step_x, step_y) directions to scan from `current`."""
+        stride = self.stride
+        moves_x, moves_y = (-stride, stride), (-1, 1)
+        if came_from < 0:
+            dirs = [(mx, 0) for mx in moves_x] + [(0, my) for my in moves_y]
+            if self.diagonal:
+                dirs += [(mx, my) for mx in moves_x for my in moves_y]
+            return [(mx, my) for mx, my in dirs if self._can_step(current, mx, my)]
+
+        cx, cy = divmod(current, stride)
+        px, py = divmod(came_from, stride)
+        dx = (cx > px) - (cx < px)
+        dy = (cy > py) - (cy < py)
+        sx, sy = dx * stride, dy
+
+        if not self.diagonal:
+            if sx:
+                dirs = [(sx, 0), (0, 1), (0, -1)]
+            else:
+                dirs = [(0, sy), (stride, 0), (-stride, 0)]
+        elif sx and sy:
+            dirs = [(sx, 0), (0, sy), (sx, sy)]
+        elif sx:
+            dirs = [(sx, 0), (0, 1), (0, -1), (sx, 1), (sx, -1)]
+        else:
+            dirs = [(0, sy), (stride, 0), (-stride, 0), (stride, sy), (-stride, sy)]
+        return [(mx, my) for mx, my in dirs if self._can_step(current, mx, my)]
+
+    def _can_step(self, index: int, step_x: int, step_y: int) -> bool:
+        passable = self.passable
+        if not passable[index + step_x + step_y]:
+            return False
+        return not (step_x and step_y) or (passable[index + step_x] and passable[index + step_y])
+
+
+def _interpolate(jump_points: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    path = [jump_points[0]]
+    for x1, y1 in jump_points[1:]:
+        x, y = path[-1]
+        dx, dy = (x1 > x) - (x1 < x), (y1 > y) - (y1 < y)
+        while (x, y) != (x1, y1):
+            # Diagonal first, then the straight remainder (matches the jump geometry)
+            x += dx if x != x1 else 0
+            y += dy if y != y1 else 0
+            path.append((x, y))
+    return path
+
+
+def jps_search(grid: GridMap,
+               start: Tuple[int, int],
+               goal: Tuple[int, int],
+               cancel: Optional[threading.Event] = None,
+               diagonal: bool = False) -> Tuple[Path, int]:
+    if start == goal:
+        return [start], 0
+    if not grid.in_bounds(*start) or grid.is_occupied(*goal):
+        return None, 0
+
+    stride = grid.height + 2
+    source, target = to_flat(grid, start, stride), to_flat(grid, goal, stride)
+    jps = _JumpPointSearch(grid, target, diagonal)
+    distance = octile if diagonal else _manhattan
+    gx, gy = divmod(target, stride)
+
+    g_cost = {source: 0.0}
+    parent = {source: -1}
+    closed = set()
+    open_set = [(0.0, source)]
+    explored_nodes = 0
+    push, pop = heapq.heappush, heapq.heappop
+
+    while open_set:
+        _, current = pop(open_set)
+        if current == target:
+            jump_points = []
+            while current >= 0:
+                jump_points.append(from_flat(grid, current, stride))
+                current = parent[current]
+            return _interpolate(jump_points[::-1]), explored_nodes
+        if current in closed:
+            continue
+        closed.add(current)
+        explored_nodes += 1
+        if cancel is not None and explored_nodes % CANCEL_CHECK_INTERVAL == 0 and cancel.is_set():
+            return None, explored_nodes
+
+        cx, cy = divmod(current, stride)
+        for step_x, step_y in jps.directions(current, parent[current]):
+            jump_point = jps.jump(current + step_x + step_y, step_x, step_y)
+            if jump_point < 0 or jump_point in closed:
+                continue
+            jx, jy = divmod(jump_point, stride)
+            tentative_g = g_cost[current] + distance(jx - cx, jy - cy)
+            if tentative_g < g_cost.get(jump_point, float("inf")):
+                g_cost[jump_point] = tentative_g
+                parent[jump_point] = current
+                push(open_set, (tentative_g + distance(gx - jx, gy - jy), jump_point))
+
+    return None, explored_nodes  # No path found
@@ -0,0 +1,453 @@
+"""
+Long-running planning service over a small asyncio HTTP/JSON API.
+
+Maps are loaded once and stay hot, each with its own GridWorkerPool (shared
+memory process pool) for the A* work. Plan requests go through:
+
+  admission      at most `max_pending` requests in flight, else 503 (backpressure)
+  LLM waypoints  identical in-flight queries (map, start, goal, model) share one
+                 call; at most `max_llm_calls` Ollama calls run at once, and
+                 answers are kept in a WaypointCache
+  segments       answered from the map's PathCache when possible, else searched
+                 on its worker pool, at most `max_searches` queued at once; a
+                 failed segment falls back to one full search
+
+Endpoints:
+  GET  /health, /maps, /stats (queue depth, counters, latency percentiles)
+  POST /maps  {"name": "maze", "path": "maze.png"}
+  POST /plan  {"map": "maze", "start": [x, y], "goal": [x, y],
+               "planner": "llm_astar" | "astar", "model": "mistral", "diagonal": false}
+
+Example (with a stub LLM, no Ollama needed):
+    python service.py maze=maze.png --port 8080 --stub
+    curl -d '{"map": "maze", "start": [1, 1], "goal": [39, 39]}' localhost:8080/plan
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+from batch import GridWorkerPool
+from instrumentation import Tracer
+from llm_astar import refine_waypoints
+from llm_cache import WaypointCache
+from llm_interface import get_llm_waypoints
+from path_cache import PathCache
+from ollama_client import DEFAULT_OLLAMA_URL, OllamaClient
+from rendering import load_map
+
+# Latencies kept for the percentiles reported by /stats
+LATENCY_WINDOW = 2048
+MAX_BODY_BYTES = 1 << 20
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class MapEntry:
+    name: str
+    grid: GridMap
+    pool: GridWorkerPool
+    source: str = ""
+    loaded_at: float = field(default_factory=time.time)
+    path_caches: Dict[bool, PathCache] = field(default_factory=dict)  # keyed by `diagonal`
+
+    def path_cache(self, diagonal: bool) -> PathCache:
+        if diagonal not in self.path_caches:
+            self.path_caches[diagonal] = PathCache(self.grid, diagonal=diagonal)
+        return self.path_caches[diagonal]
+
+    def describe(self) -> Dict:
+        return {"name": self.name, "source": self.source, "width": self.grid.width,
+                "height": self.grid.height, "version": self.grid.version,
+                "workers": self.pool.workers,
+                "path_cache": {str(diagonal).lower(): cache.stats()
+                               for diagonal, cache in self.path_caches.items()}}
+
+
+def latency_percentiles(samples: Deque[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    p50, p90, p99 = np.percentile(np.fromiter(samples, dtype=float), [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99), "max": max(samples)}
+
+
+class PlanningService:
+    """
+    Map registry plus the plan pipeline; serve() exposes it over HTTP.
+    All public coroutines must run on one event loop.
+    """
+
+    def __init__(self,
+                 client: Optional[OllamaClient] = None,
+                 cache: Optional[WaypointCache] = None,
+                 workers: int = 2,
+                 max_pending: int = 64,
+                 max_llm_calls: int = 4,
+                 max_searches: Optional[int] = None,
+                 engine: str = "array"):
+        self.client = client if client is not None else OllamaClient(pool_size=max_llm_calls)
+        self.cache = cache if cache is not None else WaypointCache()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.engine = engine
+        self.maps: Dict[str, MapEntry] = {}
+        self._llm_slots = asyncio.Semaphore(max_llm_calls)
+        # Own threads for blocking LLM calls, so they never queue behind other to_thread work
+        self._llm_executor = ThreadPoolExecutor(max_workers=max_llm_calls, thread_name_prefix="llm")
+        self._search_slots = asyncio.Semaphore(max_searches or 2 * workers)
+        self._inflight_llm: Dict[Tuple, asyncio.Future] = {}
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0,
+                         "llm_calls": 0, "coalesced": 0, "searches": 0, "path_cache_hits": 0, "fallbacks": 0}
+        self.in_flight = 0
+        self.waiting_llm = 0
+        self.waiting_search = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.llm_latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    # -------------------------
+    # Map registry
+    # -------------------------
+    def add_map(self, name: str, grid: GridMap, source: str = "") -> MapEntry:
+        if name in self.maps:
+            self.maps.pop(name).pool.close(wait=False)
+        entry = MapEntry(name, grid, GridWorkerPool(grid, self.workers), source)
+        self.maps[name] = entry
+        print(f"🗺️ Loaded map '{name}' ({grid.width}x{grid.height}) with {self.workers} workers")
+        return entry
+
+    async def load_map(self, name: str, path: str) -> MapEntry:
+        if not os.path.exists(path):
+            raise ServiceError(404, f"No such map file: {path}")
+        grid = await asyncio.to_thread(load_map, path)
+        grid.component_labels()  # warm the reachability labels once, not per request
+        return self.add_map(name, grid, path)
+
+    def close(self):
+        for entry in self.maps.values():
+            entry.pool.close(wait=False)
+        self.maps.clear()
+        self._llm_executor.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------
+    # Plan pipeline
+    # -------------------------
+    async def plan(self, request: Dict) -> Dict:
+        if self.in_flight >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise ServiceError(503, f"Busy: {self.in_flight} requests in flight")
+        entry = self.maps.get(request.get("map", ""))
+        if entry is None:
+            raise ServiceError(404, f"Unknown map '{request.get('map')}'")
+        try:
+            start = tuple(int(v) for v in request["start"])
+            goal = tuple(int(v) for v in request["goal"])
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError(400, "start and goal must be [x, y] pairs") from None
+        grid = entry.grid
+        for point in (start, goal):
+            if len(point) != 2 or not grid.in_bounds(*point) or grid.is_occupied(*point):
+                raise ServiceError(400, f"{list(point)} is not a free cell of map '{entry.name}'")
+        planner = request.get("planner", "llm_astar")
+        if planner not in ("astar", "llm_astar"):
+            raise ServiceError(400, "planner must be 'astar' or 'llm_astar'")
+        diagonal = bool(request.get("diagonal", False))
+
+        self.counters["requests"] += 1
+        self.in_flight += 1
+        began = time.perf_counter()
+        try:
+            result = {"path": None, "waypoints": [], "explored_nodes": 0, "fallback": False,
+                      "coalesced": False}
+            if not grid.is_reachable(start, goal):
+                pass  # nothing to search; same answer as llm_astar
+            elif planner == "astar":
+                result["path"], result["explored_nodes"] = await self._search(entry, start, goal, diagonal)
+            else:
+                await self._plan_llm_astar(entry, start, goal, request.get("model", "mistral"),
+                                           diagonal, result)
+            self.counters["completed"] += 1
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        result["elapsed"] = time.perf_counter() - began
+        self.latencies.append(result["elapsed"])
+        return result
+
+    async def _plan_llm_astar(self, entry: MapEntry, start: Tuple[int, int], goal: Tuple[int, int],
+                              model: str, diagonal: bool, result: Dict):
+        raw, result["coalesced"] = await self._waypoints(entry, start, goal, model)
+        grid = entry.grid
+        waypoints = refine_waypoints(grid, raw, start, goal) if raw else []
+        result["waypoints"] = waypoints
+        targets = [start] + waypoints + [goal]
+        segments = await asyncio.gather(*(self._search(entry, a, b, diagonal)
+                                          for a, b in zip(targets, targets[1:])))
+        result["explored_nodes"] = sum(explored for _, explored in segments)
+        if any(path is None for path, _ in segments):
+            self.counters["fallbacks"] += 1
+            result["fallback"] = True
+            result["waypoints"] = []
+            result["path"], explored = await self._search(entry, start, goal, diagonal)
+            result["explored_nodes"] += explored
+            return
+        full_path = list(segments[0][0])
+        for path, _ in segments[1:]:
+            full_path.extend(path[1:])
+        result["path"] = full_path
+
+    async def _waypoints(self, entry: MapEntry, start: Tuple[int, int], goal: Tuple[int, int],
+                         model: str) -> Tuple[List[Tuple[int, int]], bool]:
+        """Raw LLM waypoints, sharing one call between identical in-flight queries."""
+        key = (entry.name, entry.grid.version, start, goal, model)
+        task = self._inflight_llm.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.counters["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._ask_llm(entry, start, goal, model))
+            self._inflight_llm[key] = task
+            task.add_done_callback(lambda _: self._inflight_llm.pop(key, None))
+        # Shielded: a client that disconnects must not cancel the call for the others
+        return await asyncio.shield(task), coalesced
+
+    async def _ask_llm(self, entry: MapEntry, start: Tuple[int, int], goal: Tuple[int, int],
+                       model: str) -> List[Tuple[int, int]]:
+        grid = entry.grid
+        self.waiting_llm += 1
+        try:
+            await self._llm_slots.acquire()
+        finally:
+            self.waiting_llm -= 1
+        try:
+            self.counters["llm_calls"] += 1
+            began = time.perf_counter()
+            waypoints = await asyncio.get_running_loop().run_in_executor(self._llm_executor, partial(
+                get_llm_waypoints, start, goal, grid.horizontal_barriers, grid.vertical_barriers,
+                grid, model=model, cache=self.cache, client=self.client, tracer=Tracer(quiet=True)))
+            self.llm_latencies.append(time.perf_counter() - began)
+            return waypoints
+        finally:
+            self._llm_slots.release()
+
+    async def _search(self, entry: MapEntry, start: Tuple[int, int], goal: Tuple[int, int],
+                      diagonal: bool) -> Tuple[Optional[List[Tuple[int, int]]], int]:
+        cache = entry.path_cache(diagonal)
+        path = cache.lookup(start, goal)
+        if path is not None:
+            self.counters["path_cache_hits"] += 1
+            return path, 0
+        self.waiting_search += 1
+        try:
+            await self._search_slots.acquire()
+        finally:
+            self.waiting_search -= 1
+        try:
+            self.counters["searches"] += 1
+            future = entry.pool.submit_search(start, goal, self.engine, diagonal=diagonal)
+            path, explored = await asyncio.wrap_future(future)
+            if path is None:
+                return None, explored
+            path = [tuple(p) for p in path]
+            cache.store(start, goal, path)
+            return path, explored
+        finally:
+            self._search_slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting_llm + self.waiting_search,
+            "waiting_llm": self.waiting_llm,
+            "waiting_search": self.waiting_search,
+            "llm_in_flight": len(self._inflight_llm),
+            "counters": dict(self.counters),
+            "latency": latency_percentiles(self.latencies),
+            "llm_latency": latency_percentiles(self.llm_latencies),
+            "cache": {"hits": self.cache.hits, "misses": self.cache.misses},
+            "maps": [entry.describe() for entry in self.maps.values()],
+        }
+
+    # -------------------------
+    # HTTP front end
+    # -------------------------
+    async def _route(self, method: str, path: str, body: Dict) -> Dict:
+        if method == "GET" and path == "/health":
+            return {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return self.stats()
+        if method == "GET" and path == "/maps":
+            return {"maps": [entry.describe() for entry in self.maps.values()]}
+        if method == "POST" and not isinstance(body, dict):
+            raise ServiceError(400, "Body must be a JSON object")
+        if method == "POST" and path == "/maps":
+            if "name" not in body or "path" not in body:
+                raise ServiceError(400, "name and path are required")
+            return (await self.load_map(body["name"], body["path"])).describe()
+        if method == "POST" and path == "/plan":
+            return await self.plan(body)
+        raise ServiceError(404, f"No route for {method} {path}")
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        """(method, path, headers) of the next request, or None at EOF; ServiceError(400) if malformed."""
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return None
+            try:
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            except ValueError:
+                raise ServiceError(400, "Malformed request line") from None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:  # a line longer than the reader's limit
+            raise ServiceError(400, "Request line or header too long") from None
+        return method, path, headers
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> int:
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ServiceError(400, "Invalid Content-Length") from None
+        if length < 0:
+            raise ServiceError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ServiceError(413, "Request body too large")
+        return length
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool):
+        data = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write((head + "\r\n").encode() + data)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                # A bad head or an oversized body is answered and the connection
+                # closed without reading the body
+                try:
+                    request = await self._read_head(reader)
+                    if request is None:
+                        break
+                    method, path, headers = request
+                    length = self._content_length(headers)
+                except ServiceError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                status, payload = 200, {}
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    payload = await self._route(method, path.split("?", 1)[0],
+                                                json.loads(raw) if raw else {})
+                except json.JSONDecodeError:
+                    status, payload = 400, {"error": "Body is not valid JSON"}
+                except ServiceError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    print(f"❌ Service error on {method} {path}: {e}")
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        except asyncio.CancelledError:
+            pass  # server shutting down while the client kept an idle connection open
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        """Start listening; the returned server keeps running until closed."""
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        bound = server.sockets[0].getsockname()
+        print(f"🚦 Planning service listening on http://{bound[0]}:{bound[1]}")
+        return server
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the LLM-A* planning service")
+    parser.add_argument("maps", nargs="*", help="maps to preload, as name=path or path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="search processes per map")
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--max-llm-calls", type=int, default=4)
+    parser.add_argument("--engine", default="array")
+    parser.add_argument("--ollama-url", default=DEFAULT_OLLAMA_URL)
+    parser.add_argument("--cache", help="SQLite file for the waypoint cache")
+    parser.add_argument("--stub", action="store_true",
+                        help="answer LLM queries from an in-process stub server (no Ollama needed)")
+    args = parser.parse_args(argv)
+
+    async def run():
+        stub = None
+        url = args.ollama_url
+        if args.stub:
+            from benchmark import MockOllamaClient
+            from ollama_stub import StubOllamaServer
+            mocks: Dict[int, MockOllamaClient] = {}
+
+            def respond(prompt: str, model: str) -> str:
+                # Snaps waypoints on the first map; good enough for load tests
+                grid = next(iter(service.maps.values())).grid
+                return mocks.setdefault(id(grid), MockOllamaClient(grid)).generate(prompt, model)
+
+            stub = StubOllamaServer(responder=respond).start()
+            url = stub.url
+            print(f"🧪 Stub LLM at {url}")
+        service = PlanningService(client=OllamaClient(url, pool_size=args.max_llm_calls),
+                                  cache=WaypointCache(path=args.cache), workers=args.workers,
+                                  max_pending=args.max_pending, max_llm_calls=args.max_llm_calls,
+                                  engine=args.engine)
+        try:
+            for spec in args.maps:
+                name, _, path = spec.rpartition("=")
+                await service.load_map(name or os.path.splitext(os.path.basename(path))[0], path)
+            server = await service.serve(args.host, args.port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+            if stub is not None:
+                stub.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from grid_map import GridMap
+from a_star import get_search_engine
+from batch import worker_context
+from flat_grid import octile, path_cost
+from instrumentation import Tracer
+from llm_astar import llm_astar, manhattan
+
+
+@dataclass
+class SpeculativeResult:
+    path: Optional[List[Tuple[int, int]]]
+    waypoints: List[Tuple[int, int]] = field(default_factory=list)
+    source: str = "none"  # "astar", "llm_astar" or "none" (nothing usable before the deadline)
+    elapsed: float = 0.0
+    explored_nodes: Optional[int] = None  # baseline A* expansions, when it finished
+
+
+def path_stretch(path: List[Tuple[int, int]],
+                 start: Tuple[int, int],
+                 goal: Tuple[int, int],
+                 diagonal: bool = False) -> float:
+    """
+    Path cost relative to the open-grid lower bound (1.0 = provably optimal):
+    Manhattan distance for 4-connected paths, octile distance with `diagonal`.
+    """
+    if not diagonal:
+        return (len(path) - 1) / max(1, manhattan(start, goal))
+    return path_cost(path) / max(1.0, octile(goal[0] - start[0], goal[1] - start[1]))
+
+
+def _astar_process(conn, grid: GridMap, start: Tuple[int, int], goal: Tuple[int, int],
+                   engine: str, diagonal: bool):
+    conn.send(get_search_engine(engine)(grid, start, goal, diagonal=diagonal))
+    conn.close()
+
+
+def speculative_plan(grid: GridMap,
+                     start: Tuple[int, int],
+                     goal: Tuple[int, int],
+                     model: str = "mistral",
+                     engine: str = "array",
+                     deadline: Optional[float] = None,
+                     max_stretch: Optional[float] = None,
+                     use_process: bool = False,
+                     **llm_kwargs) -> SpeculativeResult:
+    """
+    Run baseline A* and LLM-A* concurrently and keep whichever wins.
+
+    - A* is optimal, so its answer (including "no path") is taken as soon as it arrives.
+    - An LLM-A* path is taken as soon as it arrives if `max_stretch` is None or
+      its path_stretch is within it; otherwise it is held while A* keeps going.
+    - At `deadline` seconds the held LLM-A* path is returned if there is one.
+    The losing side is cancelled: A* stops at its next cancel check and a
+    streaming LLM request is hung up. Extra keyword arguments go to llm_astar.
+
+    With `use_process=True` baseline A* runs in a child process (terminated if
+    it loses), so it does not compete with LLM-A*'s segment searches for the GIL.
+    The child starts from batch.worker_context(), not a fork of this threaded
+    process. Messages go through the `tracer` in `llm_kwargs`, if any.
+    """
+    t0 = time.time()
+    diagonal = llm_kwargs.get("diagonal", False)
+    log = (llm_kwargs.get("tracer") or Tracer()).log
+    results: "queue.Queue[Tuple[str, Optional[List[Tuple[int, int]]], object]]" = queue.Queue()
+    astar_cancel = threading.Event()
+    llm_cancel = threading.Event()
+
+    process = None
+    if use_process:
+        context = worker_context()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_astar_process,
+                                          args=(sender, grid, start, goal, engine, diagonal),
+                                          daemon=True)
+
+    def run_astar():
+        try:
+            if process is None:
+                path, explored = get_search_engine(engine)(grid, start, goal,
+                                                           cancel=astar_cancel, diagonal=diagonal)
+            else:
+                process.start()
+                sender.close()
+                path, explored = receiver.recv()
+            results.put(("astar", path, explored))
+        except EOFError:
+            if not astar_cancel.is_set():  # else it was terminated after losing
+                log("❌ Speculative A* process died before answering")
+                results.put(("astar_error", None, None))
+        except Exception as e:
+            log(f"❌ Speculative A* error: {e}")
+            results.put(("astar_error", None, None))
+
+    def run_llm_astar():
+        try:
+            path, waypoints = llm_astar(grid, start, goal, model=model, engine=engine,
+                                        fallback=False, cancel=llm_cancel, **llm_kwargs)
+            results.put(("llm_astar", path, waypoints))
+        except Exception as e:
+            log(f"❌ Speculative LLM-A* error: {e}")
+            results.put(("llm_astar", None, []))
+
+    # Daemon threads: a losing request still blocked on the network must not hold up exit
+    threading.Thread(target=run_astar, daemon=True).start()
+    threading.Thread(target=run_llm_astar, daemon=True).start()
+
+    end = None if deadline is None else t0 + deadline
+    held: Optional[Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]] = None
+    pending = 2
+    while pending:
+        timeout = None if end is None else max(0.0, end - time.time())
+        try:
+            source, path, extra = results.get(timeout=timeout)
+        except queue.Empty:
+            log("⏰ Speculative planning deadline reached")
+            break
+        pending -= 1
+
+        if source == "astar":
+            llm_cancel.set()
+            return SpeculativeResult(path, [], "astar", time.time() - t0, extra)
+        if source == "astar_error":
+            continue  # no baseline answer is coming; wait for LLM-A* alone
+        if source == "llm_astar" and path is not None:
+            held = (path, extra)
+            if max_stretch is None or path_stretch(path, start, goal, diagonal) <= max_stretch:
+                break
+
+    astar_cancel.set()
+    llm_cancel.set()
+    if process is not None and process.is_alive():
+        process.terminate()
+    if held is not None:
+        return SpeculativeResult(held[0], held[1], "llm_astar", time.time() - t0)
+    return SpeculativeResult(None, [], "none", time.time() - t0)
@@ -0,0 +1,45 @@
+import json
+import numpy as np
+from benchmark import (MockOllamaClient, find_regressions, generate_maze, generate_random_map, main,
+                       pick_query, run_benchmark)
+from llm_interface import extract_waypoints_from_response
+
+
+def test_generated_maps_are_deterministic_and_queries_connected():
+    assert np.array_equal(generate_maze(31, 5, braid=0.2).grid, generate_maze(31, 5, braid=0.2).grid)
+    assert np.array_equal(generate_random_map(30, 0.25, 5).grid, generate_random_map(30, 0.25, 5).grid)
+    grid = generate_random_map(30, 0.25, 5)
+    start, goal = pick_query(grid)
+    assert grid.is_reachable(start, goal)
+
+
+def test_mock_llm_proposes_free_waypoints():
+    grid = generate_maze(31, 2)
+    start, goal = pick_query(grid)
+    answer = MockOllamaClient(grid).generate(f"Start Point: {list(start)}\nGoal Point: {list(goal)}")
+    waypoints = extract_waypoints_from_response(answer)
+    assert waypoints and not any(grid.is_occupied(*wp) for wp in waypoints)
+
+
+def test_benchmark_records_both_planners():
+    results = run_benchmark([21], ["maze", "random"], [0.2], [0], ["astar", "llm_astar"], measure_memory=False)
+    assert len(results) == 4
+    for astar, llm in zip(results[::2], results[1::2]):
+        assert (astar["planner"], llm["planner"]) == ("astar", "llm_astar")
+        assert astar["path_found"] and llm["path_found"]
+        assert llm["path_cost"] >= astar["path_cost"]
+        assert astar["explored_nodes"] > 0 and astar["heap_pushes"] >= astar["explored_nodes"]
+
+
+def test_regressions_are_reported_against_a_baseline(tmp_path):
+    baseline = run_benchmark([21], ["maze"], [0.0], [0], ["astar"], measure_memory=False)
+    assert find_regressions(baseline, baseline, 0.25) == []
+    worse = [dict(record, explored_nodes=record["explored_nodes"] * 2) for record in baseline]
+    assert any("explored_nodes" in line for line in find_regressions(worse, baseline, 0.25))
+
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps([dict(record, explored_nodes=1) for record in baseline]))
+    args = ["--sizes", "21", "--kinds", "maze", "--planners", "astar", "--skip-memory", "--baseline", str(path)]
+    assert main(args) == 1
+    path.write_text(json.dumps(baseline))
+    assert main(args) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from a_star import array_a_star_search
+from benchmark import generate_maze, generate_random_map
+from distance_field import distance_matrix, one_to_many
+from flat_grid import path_cost
+from incremental import path_is_valid
+
+
+def pairwise_cost(grid, a, b, diagonal):
+    path, _ = array_a_star_search(grid, a, b, diagonal=diagonal)
+    return np.inf if path is None else path_cost(path)
+
+
+def free_cells(grid, count, seed):
+    free = np.argwhere(grid.grid == 0)
+    rng = np.random.default_rng(seed)
+    return [tuple(int(v) for v in free[i]) for i in rng.integers(len(free), size=count)]
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+@pytest.mark.parametrize("grid", [generate_maze(41, 2, braid=0.3), generate_random_map(40, 0.35, 6)],
+                         ids=["maze", "random"])
+def test_one_to_many_matches_pairwise_a_star(grid, diagonal):
+    source, *targets = free_cells(grid, 9, seed=3)
+    targets.append((-5, -5))  # out of bounds
+    costs, paths = one_to_many(grid, source, targets, diagonal, return_paths=True)
+    for target, cost, path in zip(targets, costs, paths):
+        assert cost == pytest.approx(pairwise_cost(grid, source, target, diagonal))
+        if np.isinf(cost):
+            assert path is None
+        else:
+            assert path[0] == source and path[-1] == target and path_is_valid(grid, path)
+            assert path_cost(path) == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+@pytest.mark.parametrize("shape", [(3, 6), (6, 3)], ids=["fewer_sources", "fewer_targets"])
+def test_distance_matrix_matches_pairwise_a_star(diagonal, shape):
+    grid = generate_random_map(40, 0.35, 6)
+    points = free_cells(grid, sum(shape), seed=4)
+    sources, targets = points[:shape[0]], points[shape[0]:]
+    costs, paths = distance_matrix(grid, sources, targets, diagonal, return_paths=True)
+    assert costs.shape == shape
+    for i, source in enumerate(sources):
+        for j, target in enumerate(targets):
+            assert costs[i, j] == pytest.approx(pairwise_cost(grid, source, target, diagonal))
+            if not np.isinf(costs[i, j]):
+                assert paths[i][j][0] == source and paths[i][j][-1] == target
+                assert path_cost(paths[i][j]) == pytest.approx(costs[i, j])
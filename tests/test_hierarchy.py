@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from a_star import array_a_star_search
+from benchmark import generate_maze, generate_random_map
+from hierarchy import HierarchicalMap
+from incremental import path_is_valid
+
+# HPA* paths run through border transitions, so they may be a little longer than optimal
+MAX_STRETCH = 1.35
+
+
+def check_queries(grid, hierarchy, rng, count=30):
+    free = np.argwhere(grid.grid == 0)
+    for _ in range(count):
+        start, goal = (tuple(map(int, free[i])) for i in rng.integers(len(free), size=2))
+        path, _ = hierarchy.find_path(start, goal)
+        reference, _ = array_a_star_search(grid, start, goal)
+        if reference is None:
+            assert path is None
+            continue
+        assert path[0] == start and path[-1] == goal and path_is_valid(grid, path)
+        assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+        assert len(path) - 1 <= MAX_STRETCH * (len(reference) - 1)
+
+
+@pytest.mark.parametrize("grid", [generate_random_map(128, 0.25, 3), generate_maze(127, 2, braid=0.3)],
+                         ids=["random", "maze"])
+def test_paths_stay_valid_and_near_optimal_after_local_updates(grid):
+    rng = np.random.default_rng(1)
+    with HierarchicalMap(grid, cluster_size=16) as hierarchy:
+        check_queries(grid, hierarchy, rng)
+        for _ in range(3):
+            free, walls = np.argwhere(grid.grid == 0), np.argwhere(grid.grid == 1)
+            for x, y in free[rng.integers(len(free), size=40)]:
+                grid.set_occupied(int(x), int(y))
+            for x, y in walls[rng.integers(len(walls), size=40)]:
+                grid.set_free(int(x), int(y))
+            check_queries(grid, hierarchy, rng)
+        assert hierarchy.updates > 0
+
+
+def test_unreachable_goal_has_no_path():
+    grid = generate_maze(63, 4)
+    grid.add_vertical_barrier(31, 0, 62)
+    with HierarchicalMap(grid, cluster_size=16) as hierarchy:
+        assert hierarchy.find_path((1, 1), (61, 61)) == (None, 0)
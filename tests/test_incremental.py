@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from a_star import array_a_star_search
+from benchmark import generate_maze, generate_random_map
+from flat_grid import path_cost
+from incremental import DStarLite, path_is_valid
+
+
+def assert_optimal(grid, path, start, goal, diagonal):
+    reference, _ = array_a_star_search(grid, start, goal, diagonal=diagonal)
+    if reference is None:
+        assert path is None
+        return
+    assert path[0] == start and path[-1] == goal and path_is_valid(grid, path)
+    assert path_cost(path) == pytest.approx(path_cost(reference))
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_replanning_after_edits_matches_a_star(diagonal):
+    grid = generate_maze(41, 7, braid=0.3)
+    rng = np.random.default_rng(7)
+    start, goal = (1, 1), (39, 39)
+    with DStarLite(grid, start, goal, diagonal=diagonal) as planner:
+        path, _ = planner.plan()
+        assert_optimal(grid, path, start, goal, diagonal)
+        walls = np.argwhere(grid.grid == 1)
+        for step in range(12):
+            if path is not None and len(path) > 4:
+                blocked = path[len(path) // 2]
+                grid.set_occupied(*blocked)  # cut the current route
+            x, y = map(int, walls[rng.integers(len(walls))])
+            if 0 < x < 40 and 0 < y < 40:
+                grid.set_free(x, y)  # open a shortcut somewhere
+            if step % 4 == 3 and path is not None and len(path) > 3:
+                start = path[2]
+                planner.move_to(start)
+            path, repaired = planner.plan()
+            assert_optimal(grid, path, start, goal, diagonal)
+        assert planner.stats()["replans"] == 13
+
+
+def test_edit_near_the_robot_is_repaired_locally():
+    grid = generate_random_map(80, 0.2, 5)
+    free = np.argwhere(grid.grid == 0)
+    start, goal = tuple(map(int, free[0])), tuple(map(int, free[-1]))
+    with DStarLite(grid, start, goal) as planner:
+        path, first = planner.plan()
+        grid.set_occupied(*path[3])  # D* Lite searches from the goal: edits near the start are cheap
+        path, repaired = planner.plan()
+        assert_optimal(grid, path, start, goal, False)
+        assert repaired < first / 4
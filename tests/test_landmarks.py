@@ -0,0 +1,24 @@
+import numpy as np
+from a_star import SearchContext, a_star_search, array_a_star_search
+from benchmark import generate_maze
+from distance_field import UNREACHABLE, bfs_distance_field
+from landmarks import LandmarkTable
+
+
+def test_alt_heuristic_is_admissible_and_keeps_paths_optimal():
+    grid = generate_maze(61, 4, braid=0.3)
+    table = LandmarkTable.build(grid, 6)
+    context = SearchContext(grid)
+    rng = np.random.default_rng(0)
+    free = [tuple(map(int, c)) for c in np.argwhere(grid.grid == 0)]
+    for _ in range(10):
+        start, goal = (free[i] for i in rng.integers(len(free), size=2))
+        exact = bfs_distance_field(grid, goal)
+        for cell in (free[i] for i in rng.integers(len(free), size=20)):
+            if exact[cell] != UNREACHABLE:
+                assert table.heuristic(cell, goal) <= exact[cell]
+        plain, plain_nodes = array_a_star_search(grid, start, goal, context=context)
+        alt, alt_nodes = array_a_star_search(grid, start, goal, context=context, landmarks=table)
+        classic, _ = a_star_search(grid, start, goal, heuristic_fn=table.heuristic)
+        assert len(alt) == len(plain) == len(classic)
+        assert alt_nodes <= plain_nodes
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+import pytest
+from llm_interface import IncrementalWaypointParser
+from ollama_client import AsyncOllamaClient, OllamaClient
+from ollama_stub import StubOllamaServer
+
+ANSWER = "Generated Path: [[5, 5], [10, 10], [15, 12]]\n" + "The path hugs the left wall. " * 60
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_streaming_stops_once_the_waypoints_are_complete():
+    with StubOllamaServer(responder=lambda prompt, model: ANSWER, chunk_size=8, chunk_delay=0.002) as stub:
+        client = OllamaClient(stub.url)
+        parser = IncrementalWaypointParser()
+        text = client.generate("plan", stream=True, stop_when=parser.feed)
+        client.close()
+        assert parser.waypoints == [(5, 5), (10, 10), (15, 12)]
+        assert len(text) < len(ANSWER) // 4
+        assert wait_for(lambda: stub.aborted == 1)
+
+
+def test_full_stream_and_plain_answers_match():
+    with StubOllamaServer(responder=lambda prompt, model: ANSWER, chunk_size=16) as stub:
+        client = OllamaClient(stub.url)
+        assert client.generate("plan", stream=True) == ANSWER
+        assert client.generate("plan") == ANSWER
+        client.close()
+        assert stub.aborted == 0
+
+
+def test_sequential_requests_reuse_one_connection():
+    with StubOllamaServer() as stub:
+        client = OllamaClient(stub.url)
+        for _ in range(5):
+            client.generate("plan")
+        client.close()
+        assert stub.requests == 5
+        assert stub.connections == 1
+
+
+def test_cancel_event_hangs_up_the_stream():
+    cancel = threading.Event()
+
+    def stop_after_first_chunk(chunk):
+        cancel.set()
+
+    with StubOllamaServer(responder=lambda prompt, model: ANSWER, chunk_size=8, chunk_delay=0.002) as stub:
+        client = OllamaClient(stub.url)
+        text = client.generate("plan", stream=True, stop_when=stop_after_first_chunk, cancel=cancel)
+        client.close()
+        assert len(text) < len(ANSWER) // 4
+        assert wait_for(lambda: stub.aborted == 1)
+
+
+@pytest.mark.parametrize("max_concurrency", [2, 4])
+def test_async_client_bounds_concurrency(max_concurrency):
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def slow_answer(prompt, model):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        return f"echo {prompt}"
+
+    with StubOllamaServer(responder=slow_answer) as stub:
+        client = AsyncOllamaClient(OllamaClient(stub.url, pool_size=max_concurrency), max_concurrency)
+        prompts = [f"p{i}" for i in range(8)]
+        began = time.perf_counter()
+        answers = asyncio.run(client.generate_many(prompts))
+        elapsed = time.perf_counter() - began
+        client.client.close()
+    assert answers == [f"echo {p}" for p in prompts]
+    assert active[1] == max_concurrency
+    # 8 requests in waves of max_concurrency, 0.2 s each
+    assert elapsed < 8 / max_concurrency * 0.2 + 0.5
+    assert stub.connections <= max_concurrency
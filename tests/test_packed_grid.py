@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from a_star import array_a_star_search, a_star_search
+from benchmark import generate_random_map
+from grid_map import PackedGridMap
+from map_store import open_map, save_map
+
+
+def packed_copy(grid):
+    return PackedGridMap.from_bits(np.packbits(grid.grid != 0, axis=1), grid.height, grid.x_min, grid.y_min)
+
+
+def assert_same_answers(dense, other, rng):
+    assert np.array_equal(other.grid, dense.grid)
+    assert other.occupied_count() == int(dense.grid.sum())
+    for x in range(dense.x_min - 1, dense.x_max + 1):
+        for y in range(dense.y_min - 1, dense.y_max + 1):
+            assert other.is_occupied(x, y) == dense.is_occupied(x, y)
+    for _ in range(50):
+        x = int(rng.integers(dense.x_min, dense.x_max))
+        y0, y1 = sorted(int(v) for v in rng.integers(dense.y_min, dense.y_max, size=2))
+        assert other.any_occupied(x, y0, y1) == bool(dense.grid[x - dense.x_min, y0 - dense.y_min:y1 - dense.y_min + 1].any())
+    free = np.argwhere(dense.grid == 0)
+    for _ in range(10):
+        start, goal = (tuple(int(v) for v in free[i]) for i in rng.integers(len(free), size=2))
+        for search in (a_star_search, array_a_star_search):
+            assert search(other, start, goal) == search(dense, start, goal)
+        assert other.is_reachable(start, goal) == dense.is_reachable(start, goal)
+
+
+def edit_both(grids, rng):
+    for _ in range(30):
+        x, y = (int(v) for v in rng.integers(0, 61, size=2))
+        occupy = rng.random() < 0.5
+        for grid in grids:
+            grid.set_occupied(x, y) if occupy else grid.set_free(x, y)
+    for grid in grids:
+        grid.add_vertical_barrier(13, 2, 50)
+        grid.add_horizontal_barrier(45, 20, 58)
+
+
+def test_packed_grid_answers_like_the_dense_grid():
+    dense = generate_random_map(61, 0.3, 4)  # height not a multiple of 8
+    packed = packed_copy(dense)
+    rng = np.random.default_rng(0)
+    assert packed.nbytes < dense.grid.nbytes / 4
+    assert_same_answers(dense, packed, rng)
+    edit_both([dense, packed], np.random.default_rng(1))  # edits go through the bits
+    assert_same_answers(dense, packed, rng)
+
+
+def test_memmapped_map_files_answer_like_the_dense_grid(tmp_path):
+    dense = generate_random_map(61, 0.3, 5)
+    path = str(tmp_path / "random.map")
+    save_map(dense, path)
+    rng = np.random.default_rng(2)
+    assert_same_answers(dense, open_map(path), rng)
+
+    read_only = open_map(path)
+    with pytest.raises(ValueError):
+        read_only.set_occupied(*map(int, np.argwhere(dense.grid == 0)[0]))
+
+    private = open_map(path, "c")
+    edit_both([private], np.random.default_rng(3))
+    assert_same_answers(dense, open_map(path), rng)  # copy-on-write left the file alone
+
+    shared = open_map(path, "r+")
+    edit_both([shared, dense], np.random.default_rng(3))
+    shared.bits.flush()
+    assert_same_answers(dense, open_map(path), rng)
+
+
+def test_map_files_reject_foreign_and_truncated_files(tmp_path):
+    path = tmp_path / "bad.map"
+    path.write_bytes(b"not a map")
+    with pytest.raises(ValueError):
+        open_map(str(path))
+    save_map(generate_random_map(20, 0.3, 1), str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        open_map(str(path))
@@ -0,0 +1,66 @@
+import pytest
+from a_star import array_a_star_search
+from benchmark import generate_maze
+from flat_grid import path_cost
+from incremental import path_is_valid
+from path_cache import PathCache
+
+
+def assert_optimal(grid, path, start, goal, diagonal=False):
+    reference, _ = array_a_star_search(grid, start, goal, diagonal=diagonal)
+    assert path[0] == start and path[-1] == goal and path_is_valid(grid, path)
+    assert path_cost(path) == pytest.approx(path_cost(reference))
+
+
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_every_tier_answers_optimally(diagonal):
+    grid = generate_maze(41, 6, braid=0.3)
+    cache = PathCache(grid, diagonal=diagonal, tree_threshold=2)
+    start, goal = (1, 1), (39, 39)
+    path, explored = cache.find_path(start, goal)
+    assert explored > 0 and cache.misses == 1
+    assert_optimal(grid, path, start, goal, diagonal)
+
+    assert cache.find_path(goal, start) == (path[::-1], 0)  # reversed hit
+    middle = path[len(path) // 3], path[2 * len(path) // 3]
+    sub, explored = cache.find_path(*middle)
+    assert explored == 0 and cache.subpath_hits == 1
+    assert_optimal(grid, sub, *middle, diagonal)
+
+    # A second miss from the same endpoint makes it a tree source, which answers it
+    assert cache.find_path(start, (39, 1))[1] == 0 and cache.tree_hits == 1
+    hub_queries = [(start, (1, 39)), ((21, 21), start)]
+    for a, b in hub_queries:
+        tree_path, explored = cache.find_path(a, b)
+        assert explored == 0
+        assert_optimal(grid, tree_path, a, b, diagonal)
+    assert cache.tree_hits == 1 + len(hub_queries)
+
+
+def test_grid_edits_invalidate_the_cache():
+    grid = generate_maze(41, 8, braid=0.5)
+    cache = PathCache(grid, tree_threshold=1)
+    start, goal = (1, 1), (39, 39)
+    path, _ = cache.find_path(start, goal)
+    assert cache.lookup(start, goal) == path and cache.stats()["trees"] > 0
+
+    blocked = path[len(path) // 2]
+    grid.set_occupied(*blocked)
+    assert cache.lookup(start, goal) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1 and stats["paths"] == 0 and stats["trees"] == 0
+
+    path, _ = cache.find_path(start, goal)  # rebuilt tree or search, on the edited grid
+    assert blocked not in path
+    assert_optimal(grid, path, start, goal)
+
+    grid.set_cost_zone(0, 5, 0, 5, 3.0)
+    assert cache.lookup(start, goal) is None and cache.stats()["invalidations"] == 2
+
+
+def test_unreachable_queries_are_answered_without_search():
+    grid = generate_maze(41, 9)
+    grid.add_vertical_barrier(20, 0, 40)
+    cache = PathCache(grid)
+    assert cache.find_path((1, 1), (39, 39)) == (None, 0)
+    assert cache.find_path((5, 5), (5, 5)) == ([(5, 5)], 0)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from benchmark import generate_maze, pick_query
+from grid_map import GridMap
+from prompt_compression import coarsen, compress_map, corridor, merge_rectangles
+
+
+def covered(rects, shape, origin=(0, 0)) -> np.ndarray:
+    mask = np.zeros(shape, dtype=bool)
+    for x0, y0, x1, y1 in rects:
+        mask[x0 - origin[0]:x1 - origin[0] + 1, y0 - origin[1]:y1 - origin[1] + 1] = True
+    return mask
+
+
+def test_merged_rectangles_cover_exactly_the_walls():
+    occupied = generate_maze(41, 2).grid != 0
+    assert np.array_equal(covered(merge_rectangles(occupied), occupied.shape), occupied)
+
+
+def test_coarsening_keeps_one_cell_walls():
+    occupied = np.zeros((8, 8), dtype=bool)
+    occupied[3, :] = True  # a one-cell wall: half of each 2x2 block it crosses
+    coarse = coarsen(occupied, 2)
+    assert coarse[1, :].all() and coarse.sum() == 4
+    assert coarsen(occupied, 4)[0, :].all()
+
+
+@pytest.mark.parametrize("budget", [300, 600, 1500])
+def test_compressed_maze_never_hides_a_wall(budget):
+    grid = generate_maze(101, 3)
+    start, goal = pick_query(grid)
+    compressed = compress_map(grid, start, goal, budget)
+    x0, y0, x1, y1 = compressed.region
+    walls = grid.grid[x0:x1 + 1, y0:y1 + 1] != 0
+    shown = covered(compressed.rectangles, walls.shape, (x0, y0))
+    assert compressed.scale > 1  # the full maze does not fit these budgets
+    assert not (walls & ~shown).any()
+
+
+def test_zero_margin_corridor_is_the_bounding_box():
+    grid = GridMap((0, 100), (0, 100))
+    assert corridor(grid, (20, 30), (40, 35), margin_fraction=0.0, min_margin=0) == (20, 30, 40, 35)
+    assert corridor(grid, (20, 30), (40, 35)) == (12, 22, 48, 43)
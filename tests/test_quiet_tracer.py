@@ -0,0 +1,50 @@
+import pytest
+from benchmark import MockOllamaClient, generate_maze, pick_query
+from grid_map import GridMap
+from incremental import path_is_valid
+from instrumentation import Tracer
+from llm_astar import llm_astar, repair_llm_path
+from ollama_client import OllamaClient
+from ollama_stub import StubOllamaServer
+
+
+@pytest.fixture
+def maze():
+    return generate_maze(31, 6, braid=0.2)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_quiet_tracer_silences_unparseable_answers(maze, stream, capsys):
+    start, goal = pick_query(maze)
+    messages = []
+    tracer = Tracer(quiet=True, callback=lambda kind, event: messages.append(event.get("message")))
+    with StubOllamaServer(responder=lambda prompt, model: "Generated Path: [[1, x]]\nno idea") as stub:
+        path, _ = llm_astar(maze, start, goal, client=OllamaClient(stub.url), stream=stream,
+                            prompt_token_budget=None, tracer=tracer)
+    assert path is not None  # fell back to A*
+    assert capsys.readouterr().out == ""
+    assert any(message and "No valid waypoints" in message for message in messages)
+
+
+def test_quiet_tracer_silences_connection_errors(maze, capsys):
+    start, goal = pick_query(maze)
+    path, _ = llm_astar(maze, start, goal, client=OllamaClient("http://127.0.0.1:9", timeout=1),
+                        tracer=Tracer(quiet=True))
+    assert path is not None
+    assert capsys.readouterr().out == ""
+
+
+def test_quiet_tracer_silences_path_repair(capsys):
+    # Open room with one wall: blocking a single path cell always leaves a detour
+    grid = GridMap((0, 30), (0, 30))
+    grid.add_vertical_barrier(15, 0, 24)
+    start, goal = (2, 2), (28, 2)
+    path, waypoints = llm_astar(grid, start, goal, client=MockOllamaClient(grid), tracer=Tracer(quiet=True))
+    blocked = next(cell for cell in path[len(path) // 2:] if cell not in waypoints and cell != goal)
+    grid.set_occupied(*blocked)
+    stats = {}
+    repaired, _ = repair_llm_path(grid, path, waypoints, stats=stats, tracer=Tracer(quiet=True))
+    assert capsys.readouterr().out == ""
+    assert stats["replanned_segments"] >= 1 or stats["fallback"]
+    assert repaired[0] == start and repaired[-1] == goal
+    assert blocked not in repaired and path_is_valid(grid, repaired)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from a_star import SEARCH_ENGINES, array_a_star_search
+from benchmark import generate_maze, generate_random_map
+from flat_grid import path_cost
+from grid_map import GridMap
+from incremental import path_is_valid
+
+
+def queries(grid, count, seed):
+    rng = np.random.default_rng(seed)
+    free = [tuple(map(int, c)) for c in np.argwhere(grid.grid == 0)]
+    return [tuple(free[i] for i in rng.integers(len(free), size=2)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("engine", sorted(SEARCH_ENGINES))
+@pytest.mark.parametrize("diagonal", [False, True])
+@pytest.mark.parametrize("grid", [generate_maze(41, 1, braid=0.3), generate_random_map(40, 0.3, 2)],
+                         ids=["maze", "random"])
+def test_engines_agree_on_optimal_cost(engine, diagonal, grid):
+    search = SEARCH_ENGINES[engine]
+    for start, goal in queries(grid, 12, seed=7):
+        reference, _ = array_a_star_search(grid, start, goal, diagonal=diagonal)
+        path, explored = search(grid, start, goal, diagonal=diagonal)
+        if reference is None:
+            assert path is None
+            continue
+        assert path[0] == start and path[-1] == goal
+        assert path_is_valid(grid, path)
+        if not diagonal:
+            assert all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 for a, b in zip(path, path[1:]))
+        assert path_cost(path) == pytest.approx(path_cost(reference))
+        assert explored >= 0
+
+
+@pytest.mark.parametrize("engine", sorted(SEARCH_ENGINES))
+def test_engines_handle_trivial_and_blocked_queries(engine):
+    grid = GridMap((0, 10), (0, 10))
+    grid.add_vertical_barrier(5, 0, 9)  # splits the map in two
+    search = SEARCH_ENGINES[engine]
+    assert search(grid, (1, 1), (1, 1))[0] == [(1, 1)]
+    assert search(grid, (1, 1), (8, 8))[0] is None
+    assert search(grid, (1, 1), (5, 5))[0] is None  # goal inside the wall
+
+
+@pytest.mark.parametrize("engine", sorted(SEARCH_ENGINES))
+@pytest.mark.parametrize("diagonal", [False, True])
+def test_engines_accept_numpy_endpoints(engine, diagonal):
+    grid = generate_maze(21, 4, braid=0.3)
+    free = np.argwhere(grid.grid == 0)
+    start, goal = tuple(free[0]), tuple(free[-1])
+    reference, _ = array_a_star_search(grid, tuple(map(int, start)), tuple(map(int, goal)), diagonal=diagonal)
+    path, _ = SEARCH_ENGINES[engine](grid, start, goal, diagonal=diagonal)
+    assert path_cost(path) == pytest.approx(path_cost(reference))
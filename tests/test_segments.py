@@ -0,0 +1,127 @@
+import time
+import numpy as np
+import pytest
+from anytime import ara_star_search
+from batch import CANCEL_SLOTS, close_shared_pools, plan_many, shared_pool
+from benchmark import generate_maze
+from flat_grid import path_cost
+from grid_map import GridMap
+from landmarks import LandmarkTable
+from llm_astar import llm_astar, plan_segments_parallel
+from path_cache import PathCache
+
+SIZE = 800
+
+
+def walled_in_goal_map():
+    """An open map whose centre cell is free but unreachable, so reaching it explores everything."""
+    occupancy = np.zeros((SIZE, SIZE), dtype=np.int8)
+    centre = SIZE // 2
+    occupancy[centre - 2:centre + 3, centre - 2:centre + 3] = 1
+    occupancy[centre, centre] = 0
+    return GridMap.from_occupancy(occupancy), (centre, centre)
+
+
+@pytest.fixture
+def pool():
+    grid, _ = walled_in_goal_map()
+    pool = shared_pool(grid, 2)
+    pool.submit_search((0, 0), (1, 1)).result()  # start the workers
+    yield pool
+    close_shared_pools(wait=True)
+
+
+def test_shared_pool_is_reused_and_follows_edits():
+    grid = GridMap.from_occupancy(np.zeros((20, 20), dtype=np.int8))
+    try:
+        pool = shared_pool(grid, 2)
+        assert shared_pool(grid, 2) is pool
+        assert shared_pool(GridMap.from_occupancy(np.zeros((20, 20), dtype=np.int8)), 2) is not pool
+        grid.grid[5, :19] = 1
+        grid.version += 1
+        path, _ = pool.submit_search((0, 0), (10, 0)).result()
+        assert (5, 19) in path
+    finally:
+        close_shared_pools(wait=True)
+
+
+def test_cancel_flag_stops_a_running_worker_search(pool):
+    _, enclosed = walled_in_goal_map()
+    flag = pool.cancel_flag()
+    future = pool.submit_search((0, 0), enclosed, "classic", cancel_flag=flag)
+    time.sleep(0.3)
+    flag.set()
+    path, explored = future.result()
+    assert path is None
+    assert explored < SIZE * SIZE - 25
+    pool.release_cancel_flag(flag, [future])
+    assert len(pool._free_slots) == CANCEL_SLOTS
+
+
+def test_failed_segment_stops_running_segments(pool):
+    _, enclosed = walled_in_goal_map()
+    blocked = (enclosed[0] - 2, enclosed[1])
+    # 0 → enclosed explores the whole map; enclosed → blocked fails at once
+    targets = [(0, 0), enclosed, blocked]
+    paths, _, failed = plan_segments_parallel(pool, targets, "classic")
+    assert paths is None and failed == 1
+    # The long segment gives its cancel slot back once its worker stops
+    deadline = time.perf_counter() + 1.5
+    while len(pool._free_slots) < CANCEL_SLOTS and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    assert len(pool._free_slots) == CANCEL_SLOTS
+
+
+def test_llm_astar_rejects_mismatched_pools_and_landmarks_on_workers():
+    grid = generate_maze(21, 2)
+    other = generate_maze(21, 3)
+    try:
+        with pytest.raises(ValueError, match="segment_pool"):
+            llm_astar(grid, (1, 1), (19, 19), segment_pool=shared_pool(other, 1))
+        with pytest.raises(ValueError, match="Landmark"):
+            llm_astar(grid, (1, 1), (19, 19), segment_workers=2, landmarks=LandmarkTable.build(grid, 2))
+    finally:
+        close_shared_pools(wait=True)
+
+
+def test_parallel_segments_use_the_path_cache_and_report_counters():
+    grid = generate_maze(41, 5, braid=0.2)
+    targets = [(1, 1), (1, 39), (39, 39), (39, 1)]
+    cache = PathCache(grid)
+    counters = {}
+    try:
+        pool = shared_pool(grid, 2)
+        paths, explored, failed = plan_segments_parallel(pool, targets, "array", path_cache=cache, counters=counters)
+        assert failed == -1 and explored > 0
+        assert counters["expanded"] == explored and counters["heap_pushes"] >= explored
+        assert [cache.lookup(a, b) for a, b in zip(targets, targets[1:])] == paths
+
+        again, explored, _ = plan_segments_parallel(pool, targets, "array", path_cache=cache, counters=counters)
+        assert again == paths and explored == 0
+    finally:
+        close_shared_pools(wait=True)
+
+
+def test_workers_plan_on_the_cost_layer_and_follow_its_edits():
+    grid = GridMap.from_occupancy(np.zeros((30, 30), dtype=np.int8))
+    start, goal = (0, 15), (29, 15)
+
+    def best_cost(pool):
+        path, _ = pool.submit_search(start, goal, "ara").result()
+        return path_cost(path, grid)
+
+    try:
+        pool = shared_pool(grid, 1)
+        assert best_cost(pool) == pytest.approx(29.0)
+        grid.set_cost_zone(10, 20, 5, 25, 5.0)  # expensive block on the straight line
+        reference, _ = ara_star_search(grid, start, goal)
+        assert path_cost(reference, grid) < path_cost([(x, 15) for x in range(30)], grid)
+        assert best_cost(pool) == pytest.approx(path_cost(reference, grid))
+        grid.set_cost_layer(None)
+        assert best_cost(pool) == pytest.approx(29.0)
+
+        grid.set_cost_zone(10, 20, 5, 25, 5.0)
+        result = next(plan_many(grid, [(start, goal)], workers=2, engine="ara"))
+        assert path_cost(result["path"], grid) == pytest.approx(path_cost(reference, grid))
+    finally:
+        close_shared_pools(wait=True)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from benchmark import MockOllamaClient, generate_maze, pick_query
+from ollama_client import OllamaClient
+from ollama_stub import StubOllamaServer
+from service import PlanningService, ServiceError
+
+# Worker processes start on the first search; leave room for that
+TIMEOUT = 60
+
+
+@pytest.fixture
+def maze():
+    return generate_maze(41, 3, braid=0.2)
+
+
+@pytest.fixture
+def stub(maze):
+    mock = MockOllamaClient(maze)
+    with StubOllamaServer(responder=lambda prompt, model: mock.generate(prompt, model), latency=0.3) as server:
+        yield server
+
+
+def make_service(stub, maze, **options) -> PlanningService:
+    service = PlanningService(client=OllamaClient(stub.url), workers=1, **options)
+    service.add_map("maze", maze)
+    return service
+
+
+async def http(port: int, method: str, path: str, body: bytes = b"") -> (int, object):
+    """One request on a fresh connection with Connection: close, read until EOF."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await asyncio.wait_for(reader.read(), TIMEOUT)  # returns only at EOF
+    writer.close()
+    head, _, data = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def test_connection_close_reaches_eof_after_search(stub, maze):
+    async def scenario():
+        service = make_service(stub, maze)
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            start, goal = pick_query(maze)
+            body = json.dumps({"map": "maze", "start": list(start), "goal": list(goal), "planner": "astar"})
+            # The first search starts the worker processes while this client's socket is open
+            status, payload = await http(port, "POST", "/plan", body.encode())
+            assert status == 200 and payload["path"][0] == list(start)
+            assert (await http(port, "GET", "/health"))[0] == 200
+        finally:
+            server.close()
+            service.close()
+    asyncio.run(scenario())
+
+
+def test_non_object_body_is_rejected(stub, maze):
+    async def scenario():
+        service = make_service(stub, maze)
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            for path in ("/plan", "/maps"):
+                status, payload = await http(port, "POST", path, b"[1, 2]")
+                assert status == 400 and "object" in payload["error"]
+            assert (await http(port, "POST", "/plan", b"{bad"))[0] == 400
+        finally:
+            server.close()
+            service.close()
+    asyncio.run(scenario())
+
+
+def test_identical_requests_share_one_llm_call(stub, maze):
+    async def scenario():
+        service = make_service(stub, maze)
+        try:
+            start, goal = pick_query(maze)
+            request = {"map": "maze", "start": list(start), "goal": list(goal)}
+            results = await asyncio.gather(*(service.plan(dict(request)) for _ in range(6)))
+            return service, results
+        finally:
+            service.close()
+    service, results = asyncio.run(scenario())
+    assert stub.requests == 1
+    assert service.counters["llm_calls"] == 1
+    assert sum(result["coalesced"] for result in results) == 5
+    assert len({tuple(map(tuple, result["path"])) for result in results}) == 1
+
+
+def test_requests_over_capacity_get_503(stub, maze):
+    async def scenario():
+        service = make_service(stub, maze, max_pending=2)
+        try:
+            start, _ = pick_query(maze)
+            free = np.argwhere(maze.grid == 0)[::37][:5]
+            requests = [{"map": "maze", "start": list(start), "goal": [int(x), int(y)]} for x, y in free]
+            return service, await asyncio.gather(*(service.plan(r) for r in requests), return_exceptions=True)
+        finally:
+            service.close()
+    service, results = asyncio.run(scenario())
+    rejected = [r for r in results if isinstance(r, ServiceError)]
+    assert len(rejected) == 3 and all(r.status == 503 for r in rejected)
+    assert service.counters["rejected"] == 3 and service.counters["completed"] == 2
+
+
+async def raw_request(port: int, data: bytes) -> (int, object):
+    """Send `data` as is and read the response until the server closes the connection."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    raw = await asyncio.wait_for(reader.read(), TIMEOUT)
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    assert b"Connection: close" in head
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_bad_heads_and_oversized_bodies_are_refused_unread(stub, maze):
+    async def scenario():
+        service = make_service(stub, maze)
+        server = await service.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # The body is never sent: reading it would leave the request hanging
+            oversized = b"POST /plan HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n"
+            assert (await raw_request(port, oversized))[0] == 413
+            for length in (b"ten", b"-5"):
+                status, payload = await raw_request(port, b"POST /plan HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                assert status == 400 and "Content-Length" in payload["error"]
+            long_header = b"GET /health HTTP/1.1\r\nX-Pad: " + b"a" * 100_000 + b"\r\n\r\n"
+            assert (await raw_request(port, long_header))[0] == 400
+            assert (await http(port, "GET", "/health"))[0] == 200
+        finally:
+            server.close()
+            service.close()
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import os
+import threading
+import speculative
+from benchmark import MockOllamaClient, generate_maze, pick_query
+from instrumentation import Tracer
+from speculative import path_stretch, speculative_plan
+
+
+class SilentClient:
+    """LLM stand-in whose answers contain no waypoints."""
+
+    def generate(self, prompt, model="mistral", **kwargs):
+        return "I cannot help with that."
+
+
+def _dying_astar_process(conn, *args):
+    os._exit(1)  # e.g. OOM-killed: the pipe closes without an answer
+
+
+def run_with_timeout(fn, timeout=60):
+    box = {}
+    thread = threading.Thread(target=lambda: box.setdefault("result", fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "speculative_plan did not return"
+    return box["result"]
+
+
+def test_astar_wins_when_the_llm_has_nothing():
+    grid = generate_maze(31, 1)
+    start, goal = pick_query(grid)
+    result = run_with_timeout(lambda: speculative_plan(grid, start, goal, client=SilentClient()))
+    assert result.source == "astar" and result.path[0] == start and result.path[-1] == goal
+
+
+def test_dead_astar_process_does_not_hang_the_race(monkeypatch):
+    monkeypatch.setattr(speculative, "_astar_process", _dying_astar_process)
+    grid = generate_maze(31, 1)
+    start, goal = pick_query(grid)
+
+    result = run_with_timeout(lambda: speculative_plan(grid, start, goal, use_process=True,
+                                                       client=SilentClient()))
+    assert result.source == "none" and result.path is None
+
+    result = run_with_timeout(lambda: speculative_plan(grid, start, goal, use_process=True, max_stretch=1.0,
+                                                       client=MockOllamaClient(grid)))
+    assert result.source == "llm_astar" and result.path is not None
+
+
+def test_path_stretch_uses_octile_bound_for_diagonal_paths():
+    straight = [(i, i) for i in range(6)]
+    assert path_stretch(straight, (0, 0), (5, 5), diagonal=True) == 1.0
+    # 4-connected staircase: optimal under Manhattan, not with diagonal moves
+    staircase = [(0, 0)] + [(i // 2 + i % 2, i // 2) for i in range(1, 11)]
+    assert path_stretch(staircase, (0, 0), (5, 5)) == 1.0
+    assert path_stretch(staircase, (0, 0), (5, 5), diagonal=True) > 1.0
+    # Fewer steps than Manhattan, but one detour: must not look optimal
+    detour = [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4), (5, 3), (6, 4), (5, 5)]
+    assert path_stretch(detour, (0, 0), (5, 5), diagonal=True) > 1.0
+
+
+def test_astar_child_process_answers_and_quiet_tracer_silences_the_race(monkeypatch, capsys):
+    grid = generate_maze(31, 1)
+    start, goal = pick_query(grid)
+    result = run_with_timeout(lambda: speculative_plan(grid, start, goal, use_process=True,
+                                                       client=SilentClient()))
+    assert result.source == "astar" and result.path[-1] == goal
+
+    monkeypatch.setattr(speculative, "_astar_process", _dying_astar_process)
+    messages = []
+    tracer = Tracer(quiet=True, callback=lambda kind, data: messages.append(data.get("message", "")))
+    capsys.readouterr()
+    run_with_timeout(lambda: speculative_plan(grid, start, goal, use_process=True,
+                                              client=SilentClient(), tracer=tracer))
+    assert capsys.readouterr().out == ""
+    assert any("Speculative A* process died" in message for message in messages)
@@ -0,0 +1,19 @@
+import math
+from grid_map import GridMap
+from waypoint_scoring import CandidateScore, SamplingSpec, exact_leg_costs, score_candidate
+
+
+def test_unreachable_leg_never_outranks_a_reachable_detour():
+    grid = GridMap((0, 40), (0, 40))
+    grid.add_vertical_barrier(30, 0, 39)  # x > 30 is cut off from the start
+    start, goal = (0, 0), (0, 39)
+    long_way = CandidateScore(SamplingSpec(), [(29, 0), (29, 39)])
+    cut_off = CandidateScore(SamplingSpec(), [(35, 20)])
+    routes = [[start] + c.waypoints + [goal] for c in (long_way, cut_off)]
+    leg_costs = exact_leg_costs(grid, routes)
+    for candidate in (long_way, cut_off):
+        score_candidate(grid, start, goal, candidate, leg_costs=leg_costs)
+
+    assert long_way.score == 29 + 39 + 29
+    assert cut_off.score == math.inf
+    assert min((long_way, cut_off), key=lambda c: c.score) is long_way
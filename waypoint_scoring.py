@@ -0,0 +1,174 @@
+"""
+Multi-candidate LLM sampling with cheap waypoint scoring.
+
+Several waypoint sets are requested concurrently, each with its own model
+and/or temperature. Before any segment search they are ranked by a score
+that needs no search at all:
+
+  score = heuristic route length (start -> waypoints -> goal)
+          + WALL_CROSSING_PENALTY * walls crossed by the straight legs
+          + UNREACHABLE_PENALTY * waypoints cut off from the start
+
+Lower is better; llm_astar segment-plans only the best candidate.
+
+With exact scoring the heuristic legs are replaced by true path costs from
+distance_field.one_to_many (one early-stopping wavefront per distinct leg
+start, shared by all candidates), and the wall penalty is dropped since the
+costs already include every detour. A candidate with an unreachable leg
+scores infinity, so it never outranks one that can be planned.
+"""
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from grid_map import GridMap
+from instrumentation import Tracer
+from a_star import octile_heuristic
+from distance_field import one_to_many, padded_free_mask
+from flat_grid import manhattan
+from llm_cache import WaypointCache
+from llm_interface import DEFAULT_PROMPT_TOKEN_BUDGET, format_repe_prompt, get_llm_waypoints
+from ollama_client import OllamaClient
+from prompt_compression import compress_map, estimate_tokens
+
+# Extra route length charged per wall a straight leg passes through (a detour is likely)
+WALL_CROSSING_PENALTY = 10.0
+# Charged per proposed waypoint that turned out unreachable (a sign of a confused answer)
+UNREACHABLE_PENALTY = 25.0
+
+
+@dataclass
+class SamplingSpec:
+    model: str = "mistral"
+    temperature: Optional[float] = None
+
+
+def default_sampling(model: str = "mistral",
+                     temperatures: Tuple[float, ...] = (0.2, 0.7, 1.0)) -> List[SamplingSpec]:
+    return [SamplingSpec(model, t) for t in temperatures]
+
+
+@dataclass
+class CandidateScore:
+    spec: SamplingSpec
+    waypoints: List[Tuple[int, int]] = field(default_factory=list)
+    estimate: float = 0.0
+    wall_crossings: int = 0
+    unreachable: int = 0
+    score: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return {"model": self.spec.model, "temperature": self.spec.temperature,
+                "waypoints": len(self.waypoints), "estimate": self.estimate,
+                "wall_crossings": self.wall_crossings, "unreachable": self.unreachable,
+                "score": self.score}
+
+
+def wall_crossings(grid: GridMap, points: List[Tuple[int, int]]) -> int:
+    """Number of times the straight legs between consecutive points enter an obstacle."""
+    crossings = 0
+    for (ax, ay), (bx, by) in zip(points, points[1:]):
+        steps = max(abs(bx - ax), abs(by - ay)) + 1
+        xs = np.rint(np.linspace(ax, bx, steps)).astype(np.int64) - grid.x_min
+        ys = np.rint(np.linspace(ay, by, steps)).astype(np.int64) - grid.y_min
+        inside = (xs >= 0) & (xs < grid.width) & (ys >= 0) & (ys < grid.height)
+        blocked = ~inside
+        blocked[inside] = grid.grid[xs[inside], ys[inside]] != 0
+        crossings += int(blocked[0]) + int((blocked[1:] & ~blocked[:-1]).sum())
+    return crossings
+
+
+def exact_leg_costs(grid: GridMap,
+                    routes: List[List[Tuple[int, int]]],
+                    diagonal: bool = False) -> Dict[Tuple[Tuple[int, int], Tuple[int, int]], float]:
+    """
+    True path cost of every leg (a, b) of `routes`, np.inf if b is unreachable.
+    Legs are grouped by their start, so each distinct start costs one wavefront.
+    """
+    legs: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    for route in routes:
+        for a, b in zip(route, route[1:]):
+            if b not in legs.setdefault(a, []):
+                legs[a].append(b)
+    free = padded_free_mask(grid)
+    costs = {}
+    for source, targets in legs.items():
+        row, _ = one_to_many(grid, source, targets, diagonal, free=free)
+        costs.update(((source, target), float(cost)) for target, cost in zip(targets, row))
+    return costs
+
+
+def score_candidate(grid: GridMap,
+                    start: Tuple[int, int],
+                    goal: Tuple[int, int],
+                    candidate: CandidateScore,
+                    diagonal: bool = False,
+                    heuristic_fn: Optional[Callable[[Tuple[int, int], Tuple[int, int]], float]] = None,
+                    leg_costs: Optional[Dict[Tuple[Tuple[int, int], Tuple[int, int]], float]] = None
+                    ) -> CandidateScore:
+    """
+    Fill in the candidate's estimate, wall crossings and score (`unreachable` is set by the caller).
+    With `leg_costs` (see exact_leg_costs) the estimate is the true route cost; an
+    unreachable leg makes the score infinite.
+    """
+    route = [start] + candidate.waypoints + [goal]
+    legs = list(zip(route, route[1:]))
+    candidate.wall_crossings = wall_crossings(grid, route)
+    if leg_costs is not None:
+        costs = [leg_costs[leg] for leg in legs]
+        candidate.estimate = float(sum(c for c in costs if np.isfinite(c)))
+        if not all(np.isfinite(c) for c in costs):
+            candidate.score = math.inf
+        else:
+            candidate.score = candidate.estimate + UNREACHABLE_PENALTY * candidate.unreachable
+        return candidate
+    h = heuristic_fn or (octile_heuristic if diagonal else manhattan)
+    candidate.estimate = float(sum(h(a, b) for a, b in legs))
+    candidate.score = (candidate.estimate + WALL_CROSSING_PENALTY * candidate.wall_crossings +
+                       UNREACHABLE_PENALTY * candidate.unreachable)
+    return candidate
+
+
+def sample_waypoint_candidates(start: Tuple[int, int],
+                               goal: Tuple[int, int],
+                               grid: GridMap,
+                               specs: List[SamplingSpec],
+                               cache: Optional[WaypointCache] = None,
+                               client: Optional[OllamaClient] = None,
+                               stream: bool = False,
+                               cancel: Optional[threading.Event] = None,
+                               map_description: Optional[str] = None,
+                               token_budget: Optional[int] = DEFAULT_PROMPT_TOKEN_BUDGET,
+                               stats: Optional[Dict] = None,
+                               tracer: Optional[Tracer] = None) -> List[List[Tuple[int, int]]]:
+    """
+    Request one waypoint set per spec, all concurrently, from the same prompt.
+    Returns the parsed and validated waypoints per spec (possibly empty).
+    If a `stats` dict is given, prompt_tokens is the total over all requests.
+    The `tracer` is shared by all requests (see get_llm_waypoints).
+    """
+    if stats is None:
+        stats = {}
+    if tracer is None:
+        tracer = Tracer()
+    if map_description is None and token_budget is not None:
+        # Compress once for all candidates instead of once per request
+        with tracer.stage("prompt_build"):
+            base_tokens = estimate_tokens(format_repe_prompt(start, goal, [], [], ""))
+            map_description = compress_map(grid, start, goal, token_budget - base_tokens).description
+    request_stats = [{} for _ in specs]
+
+    def request(i: int) -> List[Tuple[int, int]]:
+        return get_llm_waypoints(start, goal, grid.horizontal_barriers, grid.vertical_barriers, grid,
+                                 model=specs[i].model, cache=cache, client=client, stream=stream,
+                                 cancel=cancel, map_description=map_description,
+                                 token_budget=token_budget, stats=request_stats[i],
+                                 temperature=specs[i].temperature, tracer=tracer)
+
+    tracer.log(f"🎲 Sampling {len(specs)} waypoint candidates...")
+    with ThreadPoolExecutor(max_workers=max(1, len(specs))) as executor:
+        results = list(executor.map(request, range(len(specs))))
+    stats["prompt_tokens"] = sum(s.get("prompt_tokens", 0) for s in request_stats)
+    return results